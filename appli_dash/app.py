@@ -402,6 +402,9 @@ swagger = Swagger(server, template=template)
 # Enregistrement du blueprint de l'API
 server.register_blueprint(api, url_prefix='/api/v1')
 
+# Écoute des invalidations du cache des tables de référence (écritures admin)
+start_invalidation_listener()
+
 
 # Layout de base de l'application Dash
 # ------------------------------------
@@ -458,8 +461,7 @@ def display_page(pathname):
     # Page "stats-page"
     elif pathname == "/stats-page":
         global_data_dynamic = None
-        if global_statistics_df is None:
-            global_statistics_df = get_data_statistics()
+        global_statistics_df = get_data_statistics_cached()
         return display_stats_page(global_statistics_df)
     
     elif pathname == '/stats-map-page':
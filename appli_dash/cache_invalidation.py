@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+import os
+import json
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+load_dotenv()
+
+# Redis est optionnel : sans Redis, seul le cache du processus courant est invalidé
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Importer le cache des tables de référence MySQL
+from reference_cache import reference_cache
+
+# Credentials Redis (invalidation désactivée entre processus si REDIS_HOST est vide)
+REDIS_HOST = os.environ.get("REDIS_HOST")
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
+# Canal pub/sub des invalidations du cache des tables de référence
+CACHE_INVALIDATION_CHANNEL = os.environ.get("CACHE_INVALIDATION_CHANNEL", "reference_cache_invalidation")
+# Délai (en secondes) avant reconnexion de l'écoute après une erreur Redis
+CACHE_INVALIDATION_RETRY_DELAY = float(os.environ.get("CACHE_INVALIDATION_RETRY_DELAY", 5))
+
+# Identifiant du processus émetteur (ses propres messages sont ignorés)
+_instance_id = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def get_instance_id():
+    """ Identifiant unique du processus courant (recréé après un fork) """
+    global _instance_id
+    if _instance_id is None or not _instance_id.startswith(f"{os.getpid()}-"):
+        _instance_id = f"{os.getpid()}-{uuid.uuid4().hex}"
+    return _instance_id
+
+
+def get_redis_client():
+    """
+    Retourne un client Redis (None si Redis n'est pas configuré ou pas installé)
+    """
+    if redis is None or not REDIS_HOST:
+        return None
+    return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, socket_connect_timeout=2)
+
+
+def publish_invalidation(table, pk_values):
+    """
+    Invalide les lignes modifiées d'une table de référence
+        - dans le cache du processus courant
+        - dans le cache des autres processus (Dash, workers API) via Redis pub/sub
+    Args:
+        table (str): Nom de la table modifiée
+        pk_values (array): Valeurs de clé primaire des lignes modifiées
+    """
+    pk_values = [value for value in pk_values if value is not None]
+    if len(pk_values) == 0:
+        return
+
+    try:
+        reference_cache.evict(table, pk_values)
+    except Exception as ex:
+        # Le cache sera rechargé à la prochaine vérification de version
+        print(f"\nCACHE INVALIDATION - Erreur d'invalidation locale : \n{ex}\n")
+        reference_cache.expire()
+
+    client = get_redis_client()
+    if client is None:
+        return
+    message = json.dumps({'table': table, 'keys': pk_values, 'sender': get_instance_id()})
+    try:
+        client.publish(CACHE_INVALIDATION_CHANNEL, message)
+    except Exception as ex:
+        print(f"\nCACHE INVALIDATION - Erreur de publication Redis : \n{ex}\n")
+
+
+def handle_message(message):
+    """
+    Traite un message d'invalidation reçu sur le canal Redis
+    Args:
+        message (dict): Message pub/sub Redis
+    """
+    if message.get('type') != 'message':
+        return
+    try:
+        data = json.loads(message['data'])
+    except (TypeError, ValueError):
+        print(f"CACHE INVALIDATION - Message invalide ignoré : {message['data']}")
+        return
+    if data.get('sender') == get_instance_id():
+        return
+    try:
+        reference_cache.evict(data['table'], data['keys'])
+    except Exception as ex:
+        print(f"\nCACHE INVALIDATION - Erreur d'invalidation : \n{ex}\n")
+        reference_cache.expire()
+
+
+def listen_invalidations():
+    """
+    Boucle d'écoute du canal d'invalidation (thread de fond)
+        Après une reconnexion, des messages ont pu être perdus :
+        le cache vérifie alors sa version au prochain accès
+    """
+    first_connection = True
+    while True:
+        try:
+            pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            if not first_connection:
+                reference_cache.expire()
+            first_connection = False
+            print(f"CACHE INVALIDATION - Écoute du canal {CACHE_INVALIDATION_CHANNEL}")
+            for message in pubsub.listen():
+                handle_message(message)
+
+        except Exception as ex:
+            print(f"\nCACHE INVALIDATION - Erreur d'écoute Redis : \n{ex}\n")
+            first_connection = False
+            time.sleep(CACHE_INVALIDATION_RETRY_DELAY)
+
+
+def start_invalidation_listener():
+    """
+    Démarre le thread d'écoute des invalidations (un par processus)
+    Returns:
+        bool: True si l'écoute est active, False si Redis n'est pas configuré
+    """
+    global _listener_pid
+
+    if get_redis_client() is None:
+        return False
+    with _listener_lock:
+        if _listener_pid != os.getpid():
+            thread = threading.Thread(target=listen_invalidations, name="cache-invalidation", daemon=True)
+            thread.start()
+            _listener_pid = os.getpid()
+    return True
@@ -6,10 +6,13 @@ from pprint import pprint
 import pandas as pd
 import numpy as np
 import re
-from time import sleep
+import time
+import threading
+from time import sleep, perf_counter
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+import pytz
 from models import Airline, Aircraft, Airport, City, Country
 from dotenv import load_dotenv
 load_dotenv()
@@ -21,23 +24,87 @@ sys.path.append(f"{parent_dir}/live_api")
 
 # Importer la fonction de connexion à MongoDB
 from connection_mongodb import get_connection as connection_mongodb
+from connection_mongodb import get_pool_stats as mongodb_pool_stats
 
 # Importer la fonction de connexion à MySQL
 from connection_sql import get_connection as connection_mysql
+from connection_sql import get_pool_stats as mysql_pool_stats
 
 # Importer la fonction d'appel à l'API OpenSky
 from fetch_opensky_data import query_opensky_api
 from fetch_airlabs_data import query_airlabs_api
+from flights_matcher import match_flights, format_match_stats
+from opensky_storage import OpenskyStorage
 
 # Importer le module properties
 import properties as pr
 
+# Importer le cache des tables de référence MySQL
+from reference_cache import reference_cache, normalize_code
+from cache_invalidation import publish_invalidation, start_invalidation_listener
+
+# Importer le snapshot partagé des vols en cours
+from live_snapshot import live_snapshot
+
+# Importer le cache des données statistiques
+from statistics_cache import StatisticsCache, get_aggregation_version
+
 # CREDENTIALS
 MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME")
 MONGO_COL_OPENSKY = os.environ.get("MONGO_COL_OPENSKY")
 MONGO_COL_AIRLABS = os.environ.get("MONGO_COL_AIRLABS")
+MONGO_COL_OPENSKY_LATEST = os.environ.get("MONGO_COL_OPENSKY_LATEST", "opensky_latest")
 MONGO_COL_DATA_AGGREGATED = os.environ.get("MONGO_COL_DATA_AGGREGATED")
 
+# Stockage des documents OpenSky ('single' : une collection, 'daily' : une collection par jour,
+# 'bucket' : un document par callsign et par heure)
+OPENSKY_STORAGE_LAYOUT = os.environ.get("OPENSKY_STORAGE_LAYOUT", "single")
+
+# Âge maximal (en secondes) du dernier enregistrement MongoDB utilisé pour initialiser la map live
+LIVE_MAP_INITIAL_MAX_AGE = float(os.environ.get("LIVE_MAP_INITIAL_MAX_AGE", 3600))
+
+# Durée (en secondes) de mise en cache des aéroports les plus desservis (Map Stat)
+TOP_DESTINATIONS_CACHE_TTL = float(os.environ.get("TOP_DESTINATIONS_CACHE_TTL", 900))
+
+# Zone géographique des aéroports de la Map Stat (Europe)
+MAP_STAT_LATITUDE_MIN = 35.93302587741835
+MAP_STAT_LATITUDE_MAX = 71.40896420697621
+MAP_STAT_LONGITUDE_MIN = -11.360649771804841
+MAP_STAT_LONGITUDE_MAX = 32.017698096436696
+
+# Champs de la collection data_aggregated filtrés par MongoDB pour chaque type de données de l'API statistique
+STATISTICS_MONGO_FIELDS = {
+    'callsign': ['callsign'],
+    'dep_iata': ['dep_iata'],
+    'arr_iata': ['arr_iata'],
+    'airline_iata': ['airline_iata'],
+    'aircraft_iata': ['aircraft_icao'],
+    'city_iata': ['dep_iata', 'arr_iata'],
+    'country_iso2': ['dep_iata', 'arr_iata'],
+}
+
+
+
+def get_data_initial_mongodb():
+    """
+    Récupère l'état courant des vols stocké dans MongoDB (collection opensky_latest),
+    avec les données Airlabs dénormalisées
+        (uniquement les vols avec une correspondance Airlabs)
+    Returns:
+        Array: Liste de dict des données initiales (vide si aucun enregistrement récent)
+    """
+    client = connection_mongodb()
+    if client is None:
+        return []
+    db = client[MONGO_DB_NAME]
+    collection_latest = db[MONGO_COL_OPENSKY_LATEST]
+
+    # Date du dernier appel OpenSky
+    last_document = collection_latest.find_one({}, {'_id': 0, 'time': 1}, sort=[('time', -1)])
+    if last_document is None or time.time() - last_document['time'] > LIVE_MAP_INITIAL_MAX_AGE:
+        return []
+
+    return list(collection_latest.find({"airlabs_id": {"$ne": None}}, {"_id": 0, "airlabs_id": 0, "time_date": 0, "stored_position": 0, "airlabs_doc.time_date": 0}))
 
 
 def get_data_initial():
@@ -45,10 +112,20 @@ def get_data_initial():
     S'effectue lors de l'ouverture de la page de la map Dash
     Récupère les données initiales depuis MongoDB pour la page de la map Dash
         -> les donnéees qui matchent entre data Airlabs et dernier enregistrement OpenSky
+        Les APIs OpenSky et Airlabs ne sont appelées que si MongoDB ne contient
+        aucun enregistrement récent
     Returns:
         Array: Liste de dict des données initiales
     """
 
+    start = perf_counter()
+    results = get_data_initial_mongodb()
+    if len(results) > 0:
+        print(f"MAP LIVE - {len(results)} vols chargés depuis MongoDB en {perf_counter() - start:.2f}s")
+        return results
+
+    print("MAP LIVE - Aucun enregistrement récent dans MongoDB, appel des APIs")
+
     # Appel API OpenSky
     opensky_data = query_opensky_api()
     sleep(1)
@@ -56,35 +133,30 @@ def get_data_initial():
     # Appel API Airlabs
     airlabs_data = query_airlabs_api()
 
-    # convertir les deux listes en dictionnaires
-    dict_opensky = {d['callsign']: d for d in opensky_data if d['callsign']!= '' and d['callsign'] is not None}
-    dict_airlabs = {d['flight_icao']: d for d in airlabs_data if d['flight_icao']!= '' and d['flight_icao'] is not None}
+    # Rapprochement des callsigns OpenSky et des vols Airlabs
+    matches, stats = match_flights(opensky_data, airlabs_data)
+    print(f"MAP LIVE - {format_match_stats(stats)}")
 
     # créer une nouvelle liste pour stocker le résultat
     results = []
-
-    # itérer sur chaque clé dans dict_opensky
-    for key in dict_opensky:
-        # si la clé est aussi dans dict_airlabs
-        if key in dict_airlabs:
-            dic = dict_opensky[key]
-            dic['airlabs_doc'] = dict_airlabs[key]
-            results.append(dic)
+    for opensky_doc, airlabs_doc in matches:
+        opensky_doc['airlabs_doc'] = airlabs_doc
+        results.append(opensky_doc)
     return results
 
 
 def get_data_dynamic_updated(old_data):
     """
-    Quand refresh de la page map Dash, appel à l'API OpenSky
-    On ne va garder que les old_data dont le callsign est présent dans le nouvel appel API
+    Quand refresh de la page map Dash, lecture du snapshot OpenSky partagé par toutes les sessions
+    On ne va garder que les old_data dont le callsign est présent dans le snapshot
     Args:
         old_data (Array): Array des dict des data dynamiques actuellement affichés
     Returns:
         Array: Array d'update des data dynamiques des avions en vols
     """
 
-    opensky_data = query_opensky_api()
-    old_callsigns = [list(d.keys())[0] for d in old_data]
+    opensky_data = live_snapshot.get().data
+    old_callsigns = {list(d.keys())[0] for d in old_data}
     return [data for data in opensky_data if data['callsign'] in old_callsigns]
 
 
@@ -110,29 +182,19 @@ def get_sql_data(df):
 
     tables = ['aircrafts', 'airlines', 'view_airports']
     keys_sql = ['aircraft_icao', 'airline_iata', 'airport_iata']
-    engine = connection_mysql()
 
     for i,table in enumerate(tables):
         list_mongo = lists_for_sql[table]
-        sql = f'''
-        SELECT * FROM {table};
-        '''
-        with engine.connect() as conn:
-            query = conn.execute(text(sql))
-        df_sql = pd.DataFrame(query.fetchall())
 
         if table != 'view_airports':
             key_sql = keys_sql[i]
-            df_sql = df_sql[df_sql[key_sql].isin(list_mongo)]
-            df_sql = df_sql.reset_index(drop=True)
-            df_sql = df_sql.dropna(subset=[key_sql]).drop_duplicates(subset=[key_sql]).reset_index(drop=True)
+            df_sql = reference_cache.get_dataframe(table, key_sql, list_mongo)
             df = df.merge(df_sql, how='left', on=key_sql)
         
         else:
-            for j,list_airport in enumerate(lists_for_sql['view_airports']):
-                df_airport = df_sql.copy()
+            for j,list_airport in enumerate(list_mongo):
+                df_airport = reference_cache.get_dataframe(table, 'airport_iata', list_airport)
                 airport = 'dep_iata' if j == 0 else 'arr_iata'
-                key_sql = airport
                 new_cols = []
                 for col in list(df_airport.columns):
                     if col != 'airport_iata':
@@ -140,10 +202,6 @@ def get_sql_data(df):
                     else:
                         new_cols.append(airport)
                 df_airport.columns = new_cols
-
-                df_airport = df_airport[df_airport[key_sql].isin(list_airport)]
-                df_airport = df_airport.reset_index(drop=True)
-                df_airport = df_airport.dropna(subset=[key_sql]).drop_duplicates(subset=[key_sql]).reset_index(drop=True)
                 df = df.merge(df_airport, how='left', on=airport)
     return df
 
@@ -197,7 +255,7 @@ def get_data_statistics(date_data=None):
     db = client[MONGO_DB_NAME]
     data = db['data_aggregated']
 
-    cursor = data.find()
+    cursor = data.find({}, {'time_start_date': 0})
     df_temp = pd.DataFrame(list(cursor))
 
     client.close()
@@ -220,15 +278,41 @@ def get_data_statistics(date_data=None):
         cond3 = df_temp['time_end'] < max_time
         df_temp = df_temp[cond1 & cond2 & cond3].reset_index(drop=True)
 
-    df = get_sql_data(df_temp)
-    df['datetime_start'] = pd.to_datetime(df['datetime_start'])
-    df['datetime_end'] = pd.to_datetime(df['datetime_end'])
+    df = enrich_data_statistics(df_temp)
 
     if date_data is None:
         last_day = df['datetime_start'].max().date()
         condition = df['datetime_start'].dt.date < last_day
         df = df[condition].reset_index(drop=True)
 
+    return df
+
+
+def enrich_data_statistics(df_temp):
+    """
+    Ajoute les données des tables de référence aux enregistrements agrégés et convertit les dates
+        Les documents enrichis par le job d'agrégation (reference_enriched) ne sont pas joints
+        aux tables MySQL : seuls les documents antérieurs passent par get_sql_data
+    Args:
+        df_temp (DataFrame): Enregistrements de la collection data_aggregated
+    Returns:
+        DataFrame: Dataframe des données statistiques
+    """
+    if 'reference_enriched' in df_temp.columns:
+        enriched = df_temp['reference_enriched'] == True
+        df = df_temp[enriched]
+        if not enriched.all():
+            # Les colonnes de référence absentes des documents non enrichis sont ajoutées par la jointure
+            df_raw = df_temp[~enriched].dropna(axis=1, how='all')
+            for col in ['dep_iata', 'arr_iata', 'airline_iata', 'aircraft_icao']:
+                if col not in df_raw.columns:
+                    df_raw = df_raw.assign(**{col: None})
+            df = pd.concat([df, get_sql_data(df_raw)], ignore_index=True)
+        df = df.drop('reference_enriched', axis=1).reset_index(drop=True)
+    else:
+        df = get_sql_data(df_temp)
+    df['datetime_start'] = pd.to_datetime(df['datetime_start'])
+    df['datetime_end'] = pd.to_datetime(df['datetime_end'])
     df = df.astype({
         'dep_airport_latitude': 'float64',
         'dep_airport_longitude': 'float64',
@@ -238,6 +322,161 @@ def get_data_statistics(date_data=None):
     return df
 
 
+def get_statistics_version():
+    """
+    Version des données statistiques : versions des données agrégées (globale et par jour)
+    et génération du cache des tables de référence
+    Returns:
+        tuple: (version globale, dict jour -> version, génération du cache de référence)
+    """
+    client = connection_mongodb()
+    if client is None:
+        return None
+    version, day_versions = get_aggregation_version(client[MONGO_DB_NAME])
+    return (version, day_versions, reference_cache.generation)
+
+
+def get_statistics_key(version, date_data=None):
+    """
+    Version des données statistiques d'une date (clé du cache des statistiques)
+        - avec date_data : version du jour demandé, les autres jours n'invalident pas l'entrée
+        - sans date_data : versions des jours clos uniquement (la journée en cours est
+          exclue des données, ses mises à jour par l'ingestion n'invalident pas l'entrée)
+    Args:
+        version (tuple): Version renvoyée par get_statistics_version
+        date_data (str, optional): Date de recherche (exemple 2023-10-01)
+    Returns:
+        tuple: Version des données de la date
+    """
+    if version is None:
+        return None
+    aggregation_version, day_versions, generation = version
+    if date_data is not None:
+        return (aggregation_version, day_versions.get(date_data, 0), generation)
+    today = datetime.now(pytz.timezone("Europe/Paris")).strftime("%Y-%m-%d")
+    closed_days = tuple(sorted((day, day_version) for day, day_version in day_versions.items() if day < today))
+    return (aggregation_version, closed_days, generation)
+
+
+# Cache des DataFrames statistiques des pages Dash
+#   (l'API /statistic_data filtre directement dans MongoDB, cf. get_data_statistics_filtered)
+statistics_cache = StatisticsCache(get_data_statistics, get_statistics_version, get_statistics_key)
+
+
+def get_data_statistics_cached(date_data=None):
+    """
+    Retourne le DataFrame statistique depuis le cache (calculé une fois par version des données et par date)
+        Le DataFrame retourné est partagé : ne pas le modifier
+    Arguments:
+        date_data (str, optionnal): date de recherche (pour API - exemple 2023-10-01)
+    Returns:
+        DataFrame: Dataframe des données statistiques
+    """
+    return statistics_cache.get(date_data)
+
+
+def get_statistics_mongo_values(type_data, elements):
+    """
+    Convertit les valeurs recherchées en valeurs des champs de la collection data_aggregated
+        - aircraft_iata : codes ICAO des aéronefs correspondants
+        - city_iata / country_iso2 : codes IATA des aéroports de la ville / du pays
+    Args:
+        type_data (str): Type de données recherché
+        elements (array): Valeur(s) recherchée(s)
+    Returns:
+        array: Valeurs à rechercher dans les champs STATISTICS_MONGO_FIELDS[type_data]
+    """
+    elements = {normalize_code(element) for element in elements}
+
+    if type_data == 'aircraft_iata':
+        rows = reference_cache.get_rows('aircrafts')
+        return list({row['aircraft_icao'] for row in rows if row['aircraft_icao'] and normalize_code(row['aircraft_iata']) in elements})
+
+    if type_data in ['city_iata', 'country_iso2']:
+        column = 'fk_city_iata' if type_data == 'city_iata' else 'country_iso2'
+        rows = reference_cache.get_rows('view_airports')
+        return list({row['airport_iata'] for row in rows if row['airport_iata'] and normalize_code(row[column]) in elements})
+
+    return list(elements)
+
+
+def get_statistics_time_filter(collection, date_data=None):
+    """
+    Construit le filtre temporel des données agrégées (sur le champ numérique time_start)
+        - avec date_data : journée demandée (heure de Paris)
+        - sans date_data : mêmes bornes que get_data_statistics (premier et dernier vols
+          exclus, journée en cours exclue)
+    Args:
+        collection (Collection): Collection data_aggregated
+        date_data (str, optional): Date de recherche (exemple 2023-10-01)
+    Returns:
+        dict: Filtre MongoDB (None si la collection est vide)
+    """
+    if date_data is not None:
+        start, end = get_paris_day_bounds(date_data)
+        return {"time_start": {"$gte": start, "$lt": end}}
+
+    first = collection.find_one({}, {"time_start": 1}, sort=[("time_start", 1)])
+    last_end = collection.find_one({}, {"time_end": 1}, sort=[("time_end", -1)])
+    last_start = collection.find_one({"count": {"$gt": 1}}, {"time_start": 1}, sort=[("time_start", -1)])
+    if first is None or last_start is None:
+        return None
+
+    last_day = convert_time_unix_utc_to_datetime_fr(last_start['time_start']).split(' ')[0]
+    last_day_start, _ = get_paris_day_bounds(last_day)
+    return {
+        "time_start": {"$gt": first['time_start'], "$lt": last_day_start},
+        "time_end": {"$lt": last_end['time_end']},
+    }
+
+
+def get_data_statistics_filtered(type_data, elements, date_data=None):
+    """
+    Récupère les données agrégées filtrées par date et par type de données (API /statistic_data)
+        La date, count > 1 et les éléments sont filtrés par MongoDB : seuls les
+        enregistrements retenus sont enrichis avec les tables de référence
+    Args:
+        type_data (str): Type de données à récupérer
+        elements (array): Valeur(s) de la variable "type_data" à récupérer
+        date_data (str, optional): Date de recherche (exemple 2023-10-01)
+    Returns:
+        Dict: Dictionnaires des données agrégées filtrés (None si aucun enregistrement)
+    """
+    values = get_statistics_mongo_values(type_data, elements)
+    if len(values) == 0:
+        return None
+
+    client = connection_mongodb()
+    db = client[MONGO_DB_NAME]
+    collection = db['data_aggregated']
+
+    time_filter = get_statistics_time_filter(collection, date_data)
+    if time_filter is None:
+        client.close()
+        return None
+
+    query = {"count": {"$gt": 1}, **time_filter}
+    fields = STATISTICS_MONGO_FIELDS[type_data]
+    if len(fields) == 1:
+        query[fields[0]] = {"$in": values}
+    else:
+        query["$or"] = [{field: {"$in": values}} for field in fields]
+
+    df_temp = pd.DataFrame(list(collection.find(query, {'time_start_date': 0})))
+    client.close()
+
+    if len(df_temp) == 0:
+        return None
+
+    if date_data is not None:
+        df_temp['date_data'] = df_temp['datetime_start'].str.split(' ').str[0]
+    else:
+        df_temp = df_temp.drop('_id', axis=1)
+
+    df = enrich_data_statistics(df_temp)
+    return get_data_statistics_type_data_api(df, type_data, elements)
+
+
 def get_global_stats(df):
     """
     Etablit les statistiques agrégées journalières
@@ -479,40 +718,76 @@ def get_table_callsign(df, dep_iata, arr_iata, callsign):
             df.loc[0, col] = "-" if col != 'N° de vol' else callsign
     return df
 
+# Aéroports de la zone de la Map Stat, triés par nom
+def get_airports_map_stat():
+    """
+    Retourne les aéroports (en Europe) de la Map Stat depuis le cache des tables de référence
+    Returns:
+        Array: Liste de dict des aéroports (airport_name, airport_iata, airport_latitude, airport_longitude)
+    """
+    airports = []
+    for airport in reference_cache.get_rows('airports'):
+        latitude = airport['airport_latitude']
+        longitude = airport['airport_longitude']
+        if latitude is None or longitude is None:
+            continue
+        if MAP_STAT_LATITUDE_MIN <= latitude <= MAP_STAT_LATITUDE_MAX and MAP_STAT_LONGITUDE_MIN <= longitude <= MAP_STAT_LONGITUDE_MAX:
+            airports.append(airport)
+    return sorted(airports, key=lambda airport: (airport['airport_name'] is not None, str(airport['airport_name'] or '').lower()))
+
 # Liste de tous les aéroports en base de données SQL pour dropdown de la Map stat
 def get_airports():
     """
     Retourne la liste de tous les aéroports de la Map Stat (en Europe), pour le dropdown 'Aéroport de départ'
     """
     
-    AIRPORT_NAME_INDEX = 0
-    AIRPORT_IATA_INDEX = 1
-
-    engine = connection_mysql()
-    sql = """
-            SELECT airport_name, airport_iata, airport_latitude, airport_longitude FROM airports 
-            WHERE airport_latitude BETWEEN 35.93302587741835 AND 71.40896420697621
-            AND airport_longitude BETWEEN -11.360649771804841 AND 32.017698096436696 
-            ORDER BY airport_name;
-        """
-    
-    with engine.connect() as conn:
-        query = conn.execute(text(sql))
-        airports = query.all()
-    
-    airports = [{'label': airport[AIRPORT_NAME_INDEX], 'value': airport[AIRPORT_IATA_INDEX]} for airport in airports]
+    airports = get_airports_map_stat()
+    airports = [{'label': airport['airport_name'], 'value': airport['airport_iata']} for airport in airports]
     
     return airports
 
+# Cache des aéroports les plus desservis par aéroport de départ : (dep_airport, jour) -> (date de calcul, résultat)
+_top_destinations_cache = {}
+_top_destinations_lock = threading.Lock()
+
 # Liste de tous les aéroports à afficher sur la MAP STAT
 def get_datas(dep_airport):
     """
     Retourne la liste de toutes les coordonnées des aéroports les plus désservis à partir de l'aéroport de départ (dep_airport) de la Map Stat
+        Le résultat est mis en cache par (aéroport, jour) pendant TOP_DESTINATIONS_CACHE_TTL secondes
+    Args:
+        dep_airport (str): Code IATA de l'aéroport de départ
+    Returns:
+        Array: Liste de dict (airport_iata, airport_latitude, airport_longitude), l'aéroport de départ en premier
     """
+    key = (dep_airport, datetime.now(pytz.timezone("Europe/Paris")).strftime("%Y-%m-%d"))
 
-    AIRPORT_IATA_INDEX = 0
-    AIRPORT_LATITUDE_INDEX = 1
-    AIRPORT_LONGITUDE_INDEX = 2
+    with _top_destinations_lock:
+        cached = _top_destinations_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < TOP_DESTINATIONS_CACHE_TTL:
+        # Copie : l'appelant peut modifier la liste (create_patterns)
+        return [dict(airport) for airport in cached[1]]
+
+    airports_with_coordinates = get_top_destinations(dep_airport)
+
+    with _top_destinations_lock:
+        # Seules les entrées du jour en cours sont conservées
+        for old_key in [old_key for old_key in _top_destinations_cache if old_key[1] != key[1]]:
+            _top_destinations_cache.pop(old_key)
+        _top_destinations_cache[key] = (time.monotonic(), airports_with_coordinates)
+
+    return [dict(airport) for airport in airports_with_coordinates]
+
+
+def get_top_destinations(dep_airport):
+    """
+    Calcule les 15 aéroports les plus desservis à partir de l'aéroport de départ,
+    coordonnées issues du cache des tables de référence
+    Args:
+        dep_airport (str): Code IATA de l'aéroport de départ
+    Returns:
+        Array: Liste de dict (airport_iata, airport_latitude, airport_longitude), l'aéroport de départ en premier
+    """
 
     client = connection_mongodb()
     db = client[MONGO_DB_NAME]
@@ -552,82 +827,93 @@ def get_datas(dep_airport):
     ]
 
     airports_without_coordinates = list(datas_collection.aggregate(pipeline))
-    airports_with_coordinates = []
-    engine = connection_mysql()
+    client.close()
 
-    for airport in airports_without_coordinates:
-        sql_request = f"""
-            SELECT airport_iata, airport_latitude, airport_longitude FROM airports 
-            WHERE airport_iata = '{airport['_id']}';
-        """
+    # Coordonnées des aéroports depuis le cache des tables de référence
+    dep_airport_row = reference_cache.get('airports', 'airport_iata', dep_airport)
+    if dep_airport_row is None:
+        raise ValueError(f"Aéroport inconnu : {dep_airport}")
 
-        with engine.connect() as conn:
+    airports_with_coordinates = []
+    for airport in [dep_airport_row] + [reference_cache.get('airports', 'airport_iata', airport['_id']) for airport in airports_without_coordinates]:
+        # Les destinations absentes de la table airports sont ignorées
+        if airport is not None:
+            airports_with_coordinates.append({'airport_iata': airport['airport_iata'], 'airport_latitude': airport['airport_latitude'],
+                     'airport_longitude': airport['airport_longitude']})
 
-            query = conn.execute(text(sql_request))
-            airport = query.all()
-            airports_with_coordinates.append({'airport_iata': airport[0][AIRPORT_IATA_INDEX], 'airport_latitude': airport[0][AIRPORT_LATITUDE_INDEX],
-                     'airport_longitude': airport[0][AIRPORT_LONGITUDE_INDEX]})
+    return airports_with_coordinates
 
-    sql_request_dep_airport = f"""
-            SELECT airport_iata, airport_latitude, airport_longitude FROM airports 
-            WHERE airport_iata = '{dep_airport}';
+def get_paris_day_bounds(day_date=None):
     """
-
-    with engine.connect() as conn:
-        query = conn.execute(text(sql_request_dep_airport))
-        dep_airport = query.first()
-
-    dep_airport = dict(airport_iata=dep_airport[0], airport_latitude=dep_airport[1], airport_longitude=dep_airport[2])
-    airports_with_coordinates.insert(0, dep_airport)
-
-    client.close()
-
-    return airports_with_coordinates
+    Retourne les bornes (temps unix) d'une journée à l'heure de Paris
+    Args:
+        day_date (str, optional): Date au format YYYY-MM-DD (jour en cours par défaut)
+    Returns:
+        tuple: (temps unix du début de la journée, temps unix du début du lendemain)
+    """
+    paris_tz = pytz.timezone("Europe/Paris")
+    if day_date is None:
+        day = datetime.now(paris_tz).date()
+    else:
+        day = datetime.strptime(day_date, "%Y-%m-%d").date()
+    start = paris_tz.localize(datetime(day.year, day.month, day.day))
+    next_day = day + timedelta(days=1)
+    end = paris_tz.localize(datetime(next_day.year, next_day.month, next_day.day))
+    return int(start.timestamp()), int(end.timestamp())
 
 # Retourne toutes les positions (latitude et longitude) du vol pendant la journée en cours
 def get_flight_positions(flight_number, api=False):
     """
-    Retourne les positions du vol donné par le numéro de vol en entré
+    Retourne les positions du jour (heure de Paris) du ou des vols donnés par leur numéro de vol
+        Une seule agrégation : $match sur l'index (callsign, time), $lookup des données Airlabs
+    Args:
+        flight_number (str | array): Callsign du vol, ou liste de callsigns
+        api (bool, optional): Positions détaillées avec données Airlabs (False par défaut)
+    Returns:
+        Array: Liste de dict des positions triées par date
+            (dict callsign -> liste des positions si une liste de callsigns est donnée)
     """
 
-    day_date = datetime.now().strftime("%Y-%m-%d")
-    day_date_after = (datetime.now() + timedelta(days= 1)).strftime('%Y-%m-%d')
+    callsigns = [flight_number] if isinstance(flight_number, str) else list(flight_number)
+    time_start, time_end = get_paris_day_bounds()
 
     client = connection_mongodb()
     db = client[MONGO_DB_NAME]
-    datas_collection = db[MONGO_COL_OPENSKY]
+    opensky_storage = OpenskyStorage(db, MONGO_COL_OPENSKY, OPENSKY_STORAGE_LAYOUT)
 
-    airplane_datas = datas_collection.find({'callsign': flight_number, 'datatime': {'$gte': day_date, '$lte': day_date_after}}).sort("datatime", 1)
+    pipeline = [
+        {'$match': {'callsign': {'$in': callsigns}, 'time': {'$gte': time_start, '$lt': time_end}}},
+        {'$sort': {'time': 1}},
+    ]
     
     if api:
-        cleaned_airplane_datas = []
-        for airplane in airplane_datas:
-
-            client = connection_mongodb()
-            db = client[MONGO_DB_NAME]
-            airlabs_col = db[MONGO_COL_AIRLABS]
-
-            if airplane['airlabs_id'] is not None:
-                airlabs_data = airlabs_col.find_one({'_id': airplane['airlabs_id']}, {'_id': 0, 'flag': 1, 'arr_iata': 1, 'flight_iata': 1, 
-                                                                                      'dep_iata': 1, 'airline_iata': 1})
-                airplane.update(airlabs_data)
-
-            airplane.pop('_id')
-            airplane.pop('airlabs_id')
-            airplane.pop('time_position')
-            airplane.pop('time')
-            airplane.pop('last_contact')
-            airplane.pop('icao_24')
-            
-            cleaned_airplane_datas.append(airplane)
-
-        return list(cleaned_airplane_datas)
-    
-    airplane_positions = [{'latitude': airplane ['latitude'], 'longitude': airplane['longitude']} for airplane in airplane_datas]
+        pipeline += [
+            {'$lookup': {
+                'from': MONGO_COL_AIRLABS,
+                'localField': 'airlabs_id',
+                'foreignField': '_id',
+                'pipeline': [{'$project': {'_id': 0, 'flag': 1, 'arr_iata': 1, 'flight_iata': 1, 'dep_iata': 1, 'airline_iata': 1}}],
+                'as': 'airlabs_doc'
+            }},
+            {'$replaceRoot': {'newRoot': {'$mergeObjects': ['$$ROOT', {'$ifNull': [{'$first': '$airlabs_doc'}, {}]}]}}},
+            {'$project': {'_id': 0, 'airlabs_doc': 0, 'airlabs_id': 0, 'time_position': 0, 'time': 0, 'time_date': 0, 'last_contact': 0, 'icao_24': 0}},
+        ]
+    else:
+        pipeline.append({'$project': {'_id': 0, 'callsign': 1, 'latitude': 1, 'longitude': 1}})
+
+    airplane_datas = list(opensky_storage.aggregate(pipeline, time_start, time_end))
 
     client.close()
 
-    return airplane_positions
+    # Positions regroupées par callsign (seuls latitude et longitude sont conservés hors API)
+    positions = {callsign: [] for callsign in callsigns}
+    for airplane in airplane_datas:
+        callsign = airplane['callsign'] if api else airplane.pop('callsign')
+        positions[callsign].append(airplane)
+
+    if isinstance(flight_number, str):
+        return positions[flight_number]
+    return positions
 
 
 ##########################################################
@@ -654,22 +940,13 @@ def get_static_data_api(table, elements=[]):
         "cities": "city_iata",
     }
 
-    # Récupération de la connexion à la base de données
-    engine = connection_mysql()
-
-    sql = f'''
-    SELECT * FROM {table}
-    '''
     if len(elements) > 0:
-        pk = dic_primary_keys[table]
-        placeholders = ', '.join(['%s'] * len(elements))
-        sql += f'''
-        WHERE {pk} IN ({placeholders})
-        '''
-    with engine.connect() as conn:
-        query = conn.execute(str(sql), elements)
+        # Recherche dans l'index de clé primaire du cache (une ligne par code)
+        rows = {id(row): row for row in reference_cache.get_many(table, dic_primary_keys[table], elements).values()}.values()
+    else:
+        rows = reference_cache.get_rows(table)
 
-    return [dict(row) for row in query.fetchall()]
+    return [dict(row) for row in rows]
 
 def get_data_statistics_type_data_api(df, type_data, elements):
     """
@@ -870,6 +1147,9 @@ def admin_api(table, action, data=None, pk_value=None):
     # Fermer la session
     session.close()
 
+    # Invalidation des lignes modifiées dans les caches de tous les processus
+    publish_invalidation(table, [pk_value, dict_values.get(pk)])
+
     return {'success': True}
 
 
@@ -920,57 +1200,59 @@ def get_value_pk_airports(pk_value):
 ##########################################################
 
 def get_flights_api(callsign=None, dep_airport=None, arr_airport=None, airline_company=None, origin_country=None):
+    """
+    Retourne les vols en cours (état courant des vols, collection opensky_latest)
+        Les filtres sont appliqués par MongoDB ($match) sur les champs dénormalisés :
+        si au moins un filtre est renseigné, les autres champs filtrables doivent être renseignés
+    Args:
+        callsign (str, optional): Callsign du vol
+        dep_airport (str, optional): Code IATA de l'aéroport de départ
+        arr_airport (str, optional): Code IATA de l'aéroport d'arrivée
+        airline_company (str, optional): Code IATA de la compagnie
+        origin_country (str, optional): Pays d'origine de l'appareil
+    Returns:
+        Array: Liste de dict des vols ('404' si aucun vol ne correspond aux filtres)
+    """
 
     client = connection_mongodb()
     db = client[MONGO_DB_NAME]
-    opensky_col = db[MONGO_COL_OPENSKY]
-    airlabs_col = db[MONGO_COL_AIRLABS]
+    latest_col = db[MONGO_COL_OPENSKY_LATEST]
+
+    # Champs filtrables du document de l'état courant
+    filters = {
+        'callsign': callsign,
+        'airlabs_doc.dep_iata': dep_airport,
+        'airlabs_doc.arr_iata': arr_airport,
+        'airlabs_doc.airline_iata': airline_company,
+        'origin_country': origin_country,
+    }
+    is_filtered = any(filters.values())
 
-    flights_aggr = []
+    match = {}
+    if is_filtered:
+        match['airlabs_id'] = {'$ne': None}
+        for field, value in filters.items():
+            match[field] = value if value is not None else {'$nin': [None, '']}
 
-    last_time = opensky_col.find().sort("datatime", -1)[0]['datatime']
-    flights_dyn = opensky_col.find({"datatime": last_time})
-    
-    for flight in flights_dyn:
-        if flight['airlabs_id'] is not None:
-            flight_stat = airlabs_col.find({'_id': flight['airlabs_id']})[0]
-            flight_dict = {
-                'flight_number': flight_stat['flight_number'],
-                'depart_airport': flight_stat['dep_iata'],
-                'arrival_airport': flight_stat['arr_iata'],
-                'airline_company': flight_stat['airline_iata'],
-                'origin_country_code': flight_stat['flag']
-            }
-            flight.update(flight_dict)
-        
-        flight.pop('_id')
-        flight.pop('airlabs_id')
-        flight.pop('icao_24')
-        flight.pop('time')
-        flight.pop('last_contact')
-        flight.pop('time_position')
-
-        flights_aggr.append(flight)
+    pipeline = [
+        {'$match': match},
+        {'$addFields': {
+            'flight_number': '$airlabs_doc.flight_number',
+            'depart_airport': '$airlabs_doc.dep_iata',
+            'arrival_airport': '$airlabs_doc.arr_iata',
+            'airline_company': '$airlabs_doc.airline_iata',
+            'origin_country_code': '$airlabs_doc.flag'
+        }},
+        {'$project': {
+            '_id': 0, 'airlabs_id': 0, 'airlabs_doc': 0, 'icao_24': 0,
+            'time': 0, 'time_date': 0, 'last_contact': 0, 'time_position': 0, 'stored_position': 0
+        }}
+    ]
+    flights_aggr = list(latest_col.aggregate(pipeline))
 
     client.close()
 
-    test_flight_by_filter = lambda flight_value, filter_value: flight_value == filter_value if filter_value is not None else flight_value
-    
-    if callsign or dep_airport or arr_airport or airline_company or origin_country:
-        filtered_flights = [flight for flight in flights_aggr if
-            (test_flight_by_filter(flight.get('depart_airport'), dep_airport))
-            and
-            (test_flight_by_filter(flight.get('arrival_airport'), arr_airport))
-            and
-            (test_flight_by_filter(flight.get('airline_company'), airline_company))
-            and
-            (test_flight_by_filter(flight.get('origin_country'), origin_country))
-            and
-            (test_flight_by_filter(flight.get('callsign'), callsign))]
-        
-        if not filtered_flights:
-            return '404'
-        
-        return filtered_flights
-        
-    return flights_aggr
\ No newline at end of file
+    if is_filtered and not flights_aggr:
+        return '404'
+
+    return flights_aggr
@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+from types import MappingProxyType
+from dotenv import load_dotenv
+load_dotenv()
+
+# Ajout du path du projet
+parent_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(f"{parent_dir}/live_api")
+
+# Importer la fonction d'appel à l'API OpenSky
+from fetch_opensky_data import query_opensky_api
+
+# Âge (en secondes) au-delà duquel le snapshot est rafraîchi en arrière-plan
+LIVE_SNAPSHOT_REFRESH_INTERVAL = float(os.environ.get("LIVE_SNAPSHOT_REFRESH_INTERVAL", 20))
+
+# Snapshot immuable des state vectors OpenSky
+#   data: tuple de dict en lecture seule, fetched_at: time.monotonic(), fetched_at_unix: time.time()
+Snapshot = namedtuple('Snapshot', ['data', 'fetched_at', 'fetched_at_unix'])
+
+
+class LiveSnapshot:
+    """
+    Snapshot des vols en cours partagé par toutes les sessions Dash du processus
+        - un seul appel à l'API en cours à la fois (single-flight)
+        - un snapshot trop ancien est servi pendant son rafraîchissement en
+          arrière-plan (stale-while-revalidate)
+        - seul le premier accès attend la réponse de l'API
+    """
+
+    def __init__(self, fetch_function, refresh_interval=LIVE_SNAPSHOT_REFRESH_INTERVAL):
+        self._fetch_function = fetch_function
+        self._refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._snapshot = None
+        self._refreshing = False
+        self._refreshes = 0
+        self._errors = 0
+        self._last_error = None
+
+    def _refresh(self):
+        """
+        Appel à l'API et remplacement du snapshot (exécuté par un seul thread à la fois)
+        """
+        try:
+            start = time.perf_counter()
+            data = tuple(MappingProxyType(dict(state)) for state in self._fetch_function())
+            snapshot = Snapshot(data, time.monotonic(), time.time())
+            print(f"LIVE SNAPSHOT - {len(data)} vols récupérés en {time.perf_counter() - start:.2f}s")
+            with self._lock:
+                self._snapshot = snapshot
+                self._refreshes += 1
+
+        except Exception as ex:
+            print(f"\nLIVE SNAPSHOT - Erreur de rafraîchissement : \n{ex}\n")
+            with self._lock:
+                self._errors += 1
+                self._last_error = str(ex)
+
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._done.notify_all()
+
+    def get(self):
+        """
+        Retourne le snapshot courant, en déclenchant son rafraîchissement si nécessaire
+        Returns:
+            Snapshot: Snapshot des vols en cours
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            expired = snapshot is None or time.monotonic() - snapshot.fetched_at > self._refresh_interval
+            if expired and not self._refreshing:
+                self._refreshing = True
+                # Le premier chargement est fait par le thread appelant, les suivants en arrière-plan
+                if snapshot is None:
+                    first_load = True
+                else:
+                    first_load = False
+                    threading.Thread(target=self._refresh, name="live-snapshot", daemon=True).start()
+            else:
+                first_load = False
+
+        if first_load:
+            self._refresh()
+
+        if snapshot is None:
+            with self._lock:
+                while self._snapshot is None and self._refreshing:
+                    self._done.wait()
+                snapshot = self._snapshot
+                if snapshot is None:
+                    raise Exception(f"Status: error\nAucun snapshot OpenSky disponible : {self._last_error}")
+
+        return snapshot
+
+    def get_stats(self):
+        """
+        Retourne l'état du snapshot (âge, nb de vols, rafraîchissements)
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                'refresh_interval_s': self._refresh_interval,
+                'age_s': round(time.monotonic() - snapshot.fetched_at, 1) if snapshot is not None else None,
+                'fetched_at': int(snapshot.fetched_at_unix) if snapshot is not None else None,
+                'nb_flights': len(snapshot.data) if snapshot is not None else 0,
+                'refreshing': self._refreshing,
+                'refreshes': self._refreshes,
+                'errors': self._errors,
+                'last_error': self._last_error,
+            }
+
+
+# Snapshot partagé du processus
+live_snapshot = LiveSnapshot(query_opensky_api)
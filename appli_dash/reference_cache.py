@@ -0,0 +1,271 @@
+#!/usr/bin/python3
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+import pandas as pd
+from sqlalchemy import text, bindparam
+from dotenv import load_dotenv
+load_dotenv()
+
+# Ajout du path du projet
+parent_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(f"{parent_dir}/connect_database")
+
+# Importer la fonction de connexion à MySQL
+from connection_sql import get_connection as connection_mysql
+
+# Durée (en secondes) entre deux vérifications de la version des tables MySQL
+REFERENCE_CACHE_CHECK_INTERVAL = float(os.environ.get("REFERENCE_CACHE_CHECK_INTERVAL", 60))
+# Durée (en secondes) au-delà de laquelle les tables sont rechargées, même sans changement détecté
+REFERENCE_CACHE_TTL = float(os.environ.get("REFERENCE_CACHE_TTL", 3600))
+
+# Tables de référence et clés d'indexation (la première clé est la clé primaire)
+REFERENCE_TABLES = {
+    'airports': ['airport_iata', 'airport_icao'],
+    'airlines': ['airline_iata', 'airline_icao'],
+    'aircrafts': ['aircraft_iata', 'aircraft_icao'],
+    'cities': ['city_iata'],
+    'countries': ['country_iso2', 'country_iso3'],
+    'view_airports': ['airport_iata', 'airport_icao'],
+}
+
+# Tables MySQL dont le checksum (CHECKSUM TABLE) sert de version du cache
+#   (UPDATE_TIME d'information_schema n'est pas fiable : mis en cache par MySQL 8 pendant
+#   information_schema_stats_expiry et non conservé au redémarrage)
+VERSIONED_TABLES = ['airports', 'airlines', 'aircrafts', 'cities', 'countries']
+
+
+def normalize_code(value):
+    """ Normalise un code IATA / ICAO / ISO pour la recherche dans le cache """
+    return str(value).strip().upper() if value is not None else None
+
+
+class ReferenceCache:
+    """
+    Cache en mémoire des tables de référence MySQL, indexées par code IATA / ICAO
+        - chargement complet des tables au premier accès
+        - rechargement si le contenu des tables a changé (checksum vérifié toutes les
+          REFERENCE_CACHE_CHECK_INTERVAL secondes) ou après REFERENCE_CACHE_TTL secondes
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tables = {}
+        self._version = None
+        self._loaded_at = None
+        self._checked_at = None
+        # Incrémenté à chaque modification des données en cache
+        self.generation = 0
+
+    def _get_version(self, conn):
+        """
+        Version des tables de référence : checksum du contenu de chaque table
+            (lecture complète des tables, de petite taille, toutes les REFERENCE_CACHE_CHECK_INTERVAL secondes)
+        """
+        query = conn.execute(text(f"CHECKSUM TABLE {', '.join(VERSIONED_TABLES)};"))
+        return tuple(sorted((row[0], row[1]) for row in query.fetchall()))
+
+    def _load_table(self, conn, table):
+        """
+        Charge une table complète et construit ses index
+        Returns:
+            dict: colonnes, lignes et index {clé: {valeur: ligne}} de la table
+        """
+        query = conn.execute(text(f'SELECT * FROM {table};'))
+        columns = list(query.keys())
+        rows = [dict(zip(columns, row)) for row in query.fetchall()]
+        return self._build_table(table, columns, rows)
+
+    def _build_table(self, table, columns, rows):
+        """
+        Construit les index d'une table à partir de ses lignes
+        Returns:
+            dict: colonnes, lignes et index {clé: {valeur: ligne}} de la table
+        """
+        indexes = {}
+        for key in REFERENCE_TABLES[table]:
+            index = {}
+            for row in rows:
+                value = normalize_code(row.get(key))
+                # Comme drop_duplicates : la première ligne rencontrée est conservée
+                if value is not None and value not in index:
+                    index[value] = row
+            indexes[key] = index
+        return {'columns': columns, 'rows': rows, 'indexes': indexes}
+
+    def refresh(self, force=False):
+        """
+        Recharge les tables si nécessaire (premier accès, changement de version ou TTL dépassé)
+        Args:
+            force (bool, optional): Forcer le rechargement (False par défaut)
+        """
+        now = time.monotonic()
+        if not force and self._loaded_at is not None:
+            if now - self._checked_at < REFERENCE_CACHE_CHECK_INTERVAL:
+                return
+
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._loaded_at is not None and now - self._checked_at < REFERENCE_CACHE_CHECK_INTERVAL:
+                return
+
+            try:
+                engine = connection_mysql()
+                with engine.connect() as conn:
+                    version = self._get_version(conn)
+                    expired = self._loaded_at is None or now - self._loaded_at > REFERENCE_CACHE_TTL
+                    if force or expired or version != self._version:
+                        print("REFERENCE CACHE - Chargement des tables de référence")
+                        self._tables = {table: self._load_table(conn, table) for table in REFERENCE_TABLES}
+                        self._version = version
+                        self._loaded_at = now
+                        self.generation += 1
+
+            except Exception as ex:
+                # Sans chargement initial, l'erreur est remontée à l'appelant
+                if self._loaded_at is None:
+                    raise
+                # Sinon les données en cache continuent d'être servies
+                print(f"\nREFERENCE CACHE - Erreur de rafraîchissement, données en cache conservées : \n{ex}\n")
+
+            self._checked_at = now
+
+    def evict(self, table, pk_values):
+        """
+        Recharge uniquement les lignes modifiées d'une table (clés primaires données)
+            Les lignes supprimées en base sont retirées du cache
+            Une modification de la table airports est répercutée sur view_airports
+        Args:
+            table (str): Nom de la table modifiée
+            pk_values (array): Valeurs de clé primaire des lignes modifiées
+        """
+        if table not in REFERENCE_TABLES:
+            return
+        values = {normalize_code(value) for value in pk_values if value is not None}
+        if len(values) == 0:
+            return
+        tables = [table, 'view_airports'] if table == 'airports' else [table]
+
+        with self._lock:
+            # Rien à invalider tant que le cache n'a pas été chargé
+            if self._loaded_at is None:
+                return
+
+            engine = connection_mysql()
+            with engine.connect() as conn:
+                updated_tables = {}
+                for name in tables:
+                    pk = REFERENCE_TABLES[name][0]
+                    sql = text(f'SELECT * FROM {name} WHERE {pk} IN :values').bindparams(bindparam('values', expanding=True))
+                    query = conn.execute(sql, {'values': list(values)})
+                    columns = list(query.keys())
+                    fresh_rows = {}
+                    for row in query.fetchall():
+                        row = dict(zip(columns, row))
+                        fresh_rows.setdefault(normalize_code(row[pk]), []).append(row)
+
+                    # Les lignes rechargées remplacent les anciennes à la même position
+                    rows = []
+                    for row in self._tables[name]['rows']:
+                        value = normalize_code(row[pk])
+                        if value not in values:
+                            rows.append(row)
+                        elif value in fresh_rows:
+                            rows.extend(fresh_rows.pop(value))
+                    for new_rows in fresh_rows.values():
+                        rows.extend(new_rows)
+                    updated_tables[name] = self._build_table(name, columns, rows)
+
+                # La modification est déjà prise en compte : pas de rechargement complet
+                self._version = self._get_version(conn)
+
+            # Remplacement atomique : les lectures en cours conservent l'ancien état
+            self._tables = {**self._tables, **updated_tables}
+            self.generation += 1
+            print(f"REFERENCE CACHE - Invalidation {table} : {', '.join(sorted(values))}")
+
+    def expire(self):
+        """
+        Force la vérification de version au prochain accès
+            (ex : notifications d'invalidation potentiellement perdues)
+        """
+        with self._lock:
+            self._version = None
+            self._checked_at = None if self._loaded_at is None else self._checked_at - REFERENCE_CACHE_CHECK_INTERVAL
+
+    def get(self, table, key, value):
+        """
+        Retourne la ligne d'une table correspondant à un code
+        Args:
+            table (str): Nom de la table
+            key (str): Colonne indexée (ex : 'airport_iata')
+            value (str): Code recherché
+        Returns:
+            dict: Ligne de la table (None si absente)
+        """
+        self.refresh()
+        return self._tables[table]['indexes'][key].get(normalize_code(value))
+
+    def get_many(self, table, key, values):
+        """
+        Retourne les lignes d'une table correspondant à une liste de codes
+        Args:
+            table (str): Nom de la table
+            key (str): Colonne indexée
+            values (array): Codes recherchés
+        Returns:
+            dict: Dict {code: ligne} des codes présents dans la table
+        """
+        self.refresh()
+        index = self._tables[table]['indexes'][key]
+        result = {}
+        for value in values:
+            row = index.get(normalize_code(value))
+            if row is not None:
+                result[value] = row
+        return result
+
+    def get_rows(self, table):
+        """
+        Retourne toutes les lignes d'une table (dans l'ordre de la base de données)
+        """
+        self.refresh()
+        return self._tables[table]['rows']
+
+    def get_dataframe(self, table, key, values):
+        """
+        Retourne un DataFrame des lignes d'une table correspondant à une liste de codes
+            (une ligne par code, colonnes de la table MySQL)
+        Args:
+            table (str): Nom de la table
+            key (str): Colonne indexée
+            values (array): Codes recherchés
+        Returns:
+            DataFrame: Lignes de la table
+        """
+        self.refresh()
+        rows = []
+        seen = set()
+        for row in self.get_many(table, key, values).values():
+            if id(row) not in seen:
+                seen.add(id(row))
+                rows.append(row)
+        return pd.DataFrame(rows, columns=self._tables[table]['columns'])
+
+    def get_stats(self):
+        """
+        Retourne l'état du cache (nombre de lignes par table, âge du chargement)
+        """
+        now = time.monotonic()
+        return {
+            'loaded_age_s': round(now - self._loaded_at, 1) if self._loaded_at is not None else None,
+            'checked_age_s': round(now - self._checked_at, 1) if self._checked_at is not None else None,
+            'generation': self.generation,
+            'tables': {table: len(content['rows']) for table, content in self._tables.items()},
+        }
+
+
+# Cache partagé du processus
+reference_cache = ReferenceCache()
@@ -12,6 +12,9 @@ from typing import Optional
 # ----------------------------------------------
 api = Blueprint('api', __name__)
 
+# Nb maximal de callsigns d'une requête de positions de vols
+MAX_CALLSIGNS_POSITIONS = 50
+
 
 # ----------------------------------------------
 # Gestion automatisée des erreurs
@@ -627,11 +630,8 @@ def statistic_data(query: DataStatistic):
                     raise BadRequest("La date n'est pas une date valide")
                 elif test_date == "date_out_of_range":
                     raise BadRequest("La date est antérieure à 7 jours ou postérieure à la date actuelle")
-            df_stats = get_data_statistics(date_data=query.date_data)
-        else:
-            df_stats = get_data_statistics()
 
-        data = get_data_statistics_type_data_api(df_stats, dic_var_stats[query.type_data], list_elements)
+        data = get_data_statistics_filtered(dic_var_stats[query.type_data], list_elements, date_data=query.date_data)
         if data is None:
             raise NotFound("Aucun enregistrement correspondant à la requête n'a été trouvé. Modifier la requête et essayer à nouveau")
 
@@ -1801,13 +1801,14 @@ def get_positions(query: Callsign):
         - name: callsign
           in: query
           description: |
-            Callsign de l'appareil
-            Exemple: AFR1234
+            Callsign de l'appareil, ou liste de callsigns séparés par des virgules (50 maximum)
+            Exemple: AFR1234 ou AFR1234,EZY5678
           required: true
     responses:
         200:
             description: |
                 Retourne les positions de vol d'un aéronef
+                (pour plusieurs callsigns : dictionnaire callsign -> liste des positions)
                 - airline_iata, code iata de la compagnie aérienne (3 caractères alphabétiques)
                 - arr_iata, aéroport d'arrivé
                 - baro_altitude, l'altitude barométrique
@@ -1832,8 +1833,15 @@ def get_positions(query: Callsign):
     if not query.callsign:
         raise BadRequest("Veuillez entrer un callsign valide, et réessayer.")
 
+    callsigns = [callsign.strip() for callsign in query.callsign.split(',') if callsign.strip()]
+    if not callsigns or len(callsigns) > MAX_CALLSIGNS_POSITIONS:
+        raise BadRequest("Veuillez entrer un callsign valide, et réessayer.")
 
-    positions = get_flight_positions(query.callsign, api=True)
+    if len(callsigns) == 1:
+        positions = get_flight_positions(callsigns[0], api=True)
+    else:
+        positions = get_flight_positions(callsigns, api=True)
+        positions = {callsign: values for callsign, values in positions.items() if values}
     if not positions:
         raise NotFound("Aucun vol n'a été trouvé dans notre base de données.")
     
@@ -1880,3 +1888,56 @@ def get_airports(query: Airport):
         raise BadRequest("Veuillez entrer un code aéroport valide, et réessayer.")
 
     return jsonify(airports), 200
+
+
+# ----------------------------------------------
+# Route de monitoring
+# ----------------------------------------------
+
+# Statistiques des pools de connexions du processus
+@api.get('/monitoring')
+def get_monitoring():
+    """
+    Retourne les statistiques de connexion du processus de l'application
+    ---
+    tags:
+        - Monitoring
+    responses:
+        200:
+            description: |
+                Statistiques du pool de connexions MongoDB du processus :
+                - pid, identifiant du processus
+                - max_pool_size, min_pool_size, taille du pool configurée
+                - health_check_age_s, âge du dernier test de connexion (en secondes)
+                - checked_out, connexions actuellement empruntées
+                - checkouts, checkout_failed, nombre d'emprunts réussis / échoués
+                - connections_created, connections_closed, connexions ouvertes / fermées
+                - wait_time_avg_ms, wait_time_max_ms, temps d'attente moyen / maximum d'un emprunt
+
+                Statistiques du pool de connexions MySQL du processus :
+                - pool_size, max_overflow, taille du pool configurée
+                - checked_out, checked_in, overflow, connexions empruntées / disponibles / en overflow
+                - checkouts, nombre d'emprunts
+                - checkout_time_avg_ms, checkout_time_max_ms, latence moyenne / maximum d'un emprunt
+                - overflow_checkouts, overflow_max, emprunts servis par l'overflow / overflow maximum atteint
+                - timeouts, emprunts abandonnés faute de connexion disponible
+
+                État du cache des tables de référence MySQL :
+                - loaded_age_s, âge du dernier chargement des tables (en secondes)
+                - checked_age_s, âge de la dernière vérification de version (en secondes)
+                - tables, nombre d'enregistrements en cache par table
+
+                État du snapshot partagé des vols en cours (map live) :
+                - refresh_interval_s, âge maximal du snapshot avant rafraîchissement (en secondes)
+                - age_s, fetched_at, âge (en secondes) et date (unix) du snapshot courant
+                - nb_flights, nombre de vols du snapshot
+                - refreshing, rafraîchissement en cours
+                - refreshes, errors, last_error, nombre de rafraîchissements réussis / en erreur
+
+                État du cache des données statistiques :
+                - version, version des données agrégées et génération du cache des tables de référence
+                - entries, nombre de DataFrames en cache
+                - hits, misses, build_time_avg_s, lectures servies par le cache / calculs et durée moyenne d'un calcul
+    """
+    return jsonify(mongodb=mongodb_pool_stats(), mysql=mysql_pool_stats(), reference_cache=reference_cache.get_stats(),
+                   live_snapshot=live_snapshot.get_stats(), statistics_cache=statistics_cache.get_stats()), 200
@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+import os
+import threading
+import time
+from dotenv import load_dotenv
+load_dotenv()
+
+# Collection des métadonnées (version des données agrégées, mise à jour par le job d'agrégation)
+MONGO_COL_METADATA = os.environ.get("MONGO_COL_METADATA", "metadata")
+# Identifiant du document de version des données agrégées
+AGGREGATION_VERSION_ID = "data_aggregated"
+# Durée (en secondes) entre deux lectures de la version des données agrégées
+STATISTICS_CACHE_CHECK_INTERVAL = float(os.environ.get("STATISTICS_CACHE_CHECK_INTERVAL", 30))
+
+# Valeur stockée pour un résultat None (date absente des données)
+_NO_DATA = object()
+
+
+def get_aggregation_version(db):
+    """
+    Retourne les versions des données agrégées
+        - version globale : publiée par la réconciliation et l'enrichissement (toutes les dates)
+        - versions par jour : publiées par l'ingestion OpenSky pour les jours des vols mis à jour
+    Args:
+        db (Database): Base de données MongoDB
+    Returns:
+        tuple: (version globale (0 si aucune version publiée), dict jour (YYYY-MM-DD, heure de Paris) -> version)
+    """
+    document = db[MONGO_COL_METADATA].find_one({"_id": AGGREGATION_VERSION_ID}, {"version": 1, "day_versions": 1})
+    if document is None:
+        return 0, {}
+    return document.get("version", 0), document.get("day_versions", {})
+
+
+class StatisticsCache:
+    """
+    Cache des DataFrames statistiques des pages Dash
+        - clé : (version des données de la date demandée, date demandée)
+        - la version est relue toutes les STATISTICS_CACHE_CHECK_INTERVAL secondes,
+          une nouvelle version invalide les entrées dont la version de la date a changé
+        - les requêtes simultanées sur une même clé attendent un seul calcul
+    Args:
+        build_function (function): Calcul du DataFrame d'une date
+        version_function (function): Lecture de la version des données
+        key_function (function, optional): Version des données d'une date, à partir de la version
+            des données et de la date (version des données par défaut)
+        check_interval (float, optional): Durée (en secondes) entre deux lectures de la version
+    """
+
+    def __init__(self, build_function, version_function, key_function=None, check_interval=STATISTICS_CACHE_CHECK_INTERVAL):
+        self._build_function = build_function
+        self._version_function = version_function
+        self._key_function = key_function or (lambda version, date_data: version)
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._entries = {}
+        self._version = None
+        self._checked_at = None
+        self._hits = 0
+        self._misses = 0
+        self._build_time_total = 0.0
+
+    def _get_version(self):
+        """
+        Retourne la version courante des données (relue au plus toutes les check_interval secondes)
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self._check_interval:
+                return self._version
+
+        version = self._version_function()
+
+        with self._lock:
+            if version != self._version:
+                # Les entrées dont la version de la date a changé ne seront plus lues
+                self._entries = {key: value for key, value in self._entries.items() if key[0] == self._key_function(version, key[1])}
+                self._key_locks = {key: lock for key, lock in self._key_locks.items() if key[0] == self._key_function(version, key[1])}
+                self._version = version
+            self._checked_at = now
+        return version
+
+    def get(self, date_data=None):
+        """
+        Retourne le DataFrame statistique (calculé une seule fois par version et par date)
+            Le DataFrame retourné est partagé : ne pas le modifier
+        Args:
+            date_data (str, optional): Date de recherche (exemple 2023-10-01)
+        Returns:
+            DataFrame: Dataframe des données statistiques (None si la date est absente des données)
+        """
+        key = (self._key_function(self._get_version(), date_data), date_data)
+
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._hits += 1
+                return None if value is _NO_DATA else value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Un seul calcul par clé, les autres requêtes attendent son résultat
+        with key_lock:
+            with self._lock:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._hits += 1
+                    return None if value is _NO_DATA else value
+
+            start = time.perf_counter()
+            value = self._build_function(date_data)
+            build_time = time.perf_counter() - start
+            print(f"STATS CACHE - DataFrame statistique (version {key[0]}, date {date_data}) calculé en {build_time:.2f}s")
+
+            with self._lock:
+                self._misses += 1
+                self._build_time_total += build_time
+                if key[0] == self._key_function(self._version, date_data):
+                    self._entries[key] = _NO_DATA if value is None else value
+                self._key_locks.pop(key, None)
+            return value
+
+    def get_stats(self):
+        """
+        Retourne l'état du cache (version, entrées, hits / misses)
+        """
+        with self._lock:
+            return {
+                'version': self._version,
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'build_time_avg_s': round(self._build_time_total / self._misses, 3) if self._misses else 0.0,
+            }
@@ -0,0 +1,160 @@
+import os, sys
+from pathlib import Path
+from datetime import datetime
+import dotenv
+dotenv.load_dotenv()
+
+# Ajout du path du projet
+parent_dir = str(Path(__file__).resolve().parent.parent.parent)
+
+# Importer la fonction de connexion à MongoDB
+sys.path.append(f"{parent_dir}/connect_database")
+from connection_mongodb import get_connection as connection_mongodb
+
+
+# Credentials
+MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME")
+
+# Fichier de log des tests
+LOG_FILE = 'logs/tests_indexes.log'
+
+global recap
+recap = {
+    "nb_tests": 0,
+    "nb_tests_ok": 0,
+    "nb_tests_ko": 0,
+    "nb_tests_skipped": 0,
+    "test_failed": [],
+    "test_skipped": []
+}
+
+with open(LOG_FILE, 'a', encoding='utf-8') as file:
+    file.write(f'''
+####################################################
+#  Tests réalisés le {datetime.today().strftime("%Y-%m-%d %H:%M:%S")}
+####################################################
+''')
+
+
+def get_database():
+    """ Retourne la base de données MongoDB testée """
+    return connection_mongodb()[MONGO_DB_NAME]
+
+
+def get_stages(plan):
+    """
+    Retourne tous les stages d'un plan d'exécution (recherche récursive dans le résultat de explain)
+    Args:
+        plan (dict): Résultat de explain
+    Returns:
+        array: Liste des stages (ex : ['FETCH', 'IXSCAN'])
+    """
+    stages = []
+    if isinstance(plan, dict):
+        for key, value in plan.items():
+            # Les plans rejetés par l'optimiseur ne sont pas exécutés
+            if key == 'rejectedPlans':
+                continue
+            if key == 'stage' and isinstance(value, str):
+                stages.append(value)
+            else:
+                stages.extend(get_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(get_stages(value))
+    return stages
+
+
+def explain_find(db, collection, query, sort=None, limit=0):
+    """ Plan d'exécution d'un find """
+    cursor = db[collection].find(query)
+    if sort is not None:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor.explain()
+
+
+def explain_aggregate(db, collection, pipeline):
+    """ Plan d'exécution d'une agrégation (un éventuel $merge final n'est pas expliqué) """
+    pipeline = [stage for stage in pipeline if '$merge' not in stage]
+    return db.command('explain', {'aggregate': collection, 'pipeline': pipeline, 'cursor': {}}, verbosity='queryPlanner')
+
+
+def explain_distinct(db, collection, key, query):
+    """ Plan d'exécution d'un distinct """
+    return db.command('explain', {'distinct': collection, 'key': key, 'query': query}, verbosity='queryPlanner')
+
+
+def explain_update(db, collection, query, update, multi=True):
+    """ Plan d'exécution d'un update_one / update_many """
+    return db.command('explain', {'update': collection, 'updates': [{'q': query, 'u': update, 'multi': multi}]}, verbosity='queryPlanner')
+
+
+def explain_delete(db, collection, query):
+    """ Plan d'exécution d'un delete_many """
+    return db.command('explain', {'delete': collection, 'deletes': [{'q': query, 'limit': 0}]}, verbosity='queryPlanner')
+
+
+def test_index(name, plan):
+    """
+    Vérifie qu'une requête n'entraîne pas de parcours complet de la collection (COLLSCAN)
+        Sur une collection absente ou vide, le plan (EOF) ne vérifie aucun index : test non concluant (SKIP)
+    Args:
+        name (str): Nom de la requête testée (fonction d'origine)
+        plan (dict): Résultat de explain
+    """
+    global recap
+
+    stages = get_stages(plan)
+    recap['nb_tests'] += 1
+    if 'COLLSCAN' in stages:
+        result = 'KO'
+        recap['nb_tests_ko'] += 1
+        recap['test_failed'].append(name)
+    elif 'EOF' in stages or len(stages) == 0:
+        result = 'SKIP'
+        recap['nb_tests_skipped'] += 1
+        recap['test_skipped'].append(name)
+    else:
+        result = 'OK'
+        recap['nb_tests_ok'] += 1
+
+    output = f"[{result}] {name} : {' > '.join(stages)}\n"
+    print(output, end='')
+    with open(LOG_FILE, 'a', encoding='utf-8') as file:
+        file.write(output)
+
+
+def recap_tests():
+    """
+    Récapitulatif des tests
+    Returns:
+        bool: True si aucune requête testée ne parcourt toute la collection (les tests ignorés ne sont pas des échecs)
+    """
+
+    global recap
+    output = f'''
+===========================================
+|    Récapitulatif des tests
+===========================================
+| Nombre de tests effectués : {recap['nb_tests']}
+| Nombre de tests réussis   : {recap['nb_tests_ok']}
+| Nombre de tests échoués   : {recap['nb_tests_ko']}
+| Nombre de tests ignorés   : {recap['nb_tests_skipped']} (collection absente ou vide)
+'''
+    if recap['nb_tests_ko'] > 0:
+        output += f'''
+| Tests échoués : {recap['test_failed']}
+'''
+    if recap['nb_tests_skipped'] > 0:
+        output += f'''
+| Tests ignorés : {recap['test_skipped']}
+'''
+    output += '''===========================================
+'''
+    print(output)
+    with open(LOG_FILE, 'a', encoding='utf-8') as file:
+        file.write(output)
+
+    return recap['nb_tests_ko'] == 0
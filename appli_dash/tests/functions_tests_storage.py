@@ -0,0 +1,136 @@
+import os, sys
+from pathlib import Path
+from datetime import datetime
+import dotenv
+dotenv.load_dotenv()
+
+# Ajout du path du projet
+parent_dir = str(Path(__file__).resolve().parent.parent.parent)
+
+# Importer la fonction de connexion à MongoDB
+sys.path.append(f"{parent_dir}/connect_database")
+from connection_mongodb import get_connection as connection_mongodb
+
+
+# Credentials
+MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME")
+
+# Fichier de log des tests
+LOG_FILE = 'logs/tests_storage.log'
+
+global recap
+recap = {
+    "nb_tests": 0,
+    "nb_tests_ok": 0,
+    "nb_tests_ko": 0,
+    "test_failed": []
+}
+
+with open(LOG_FILE, 'a', encoding='utf-8') as file:
+    file.write(f'''
+####################################################
+#  Tests réalisés le {datetime.today().strftime("%Y-%m-%d %H:%M:%S")}
+####################################################
+''')
+
+
+def get_database():
+    """ Retourne la base de données MongoDB testée """
+    return connection_mongodb()[MONGO_DB_NAME]
+
+
+def sort_documents(documents):
+    """
+    Documents OpenSky sans _id, triés par (time, callsign)
+        L'_id n'est pas reconstitué par la lecture des documents bucket (un document par position)
+    Args:
+        documents (array): Documents renvoyés par OpenskyStorage.find
+    Returns:
+        array: Documents comparables d'un mode de stockage à l'autre
+    """
+    documents = [{key: value for key, value in document.items() if key != "_id"} for document in documents]
+    return sorted(documents, key=lambda document: (document["time"], document["callsign"]))
+
+
+def get_differences(expected, result):
+    """
+    Différences entre deux listes de documents triées
+    Args:
+        expected (array): Documents de référence (stockage 'single')
+        result (array): Documents du mode de stockage testé
+    Returns:
+        array: Liste des différences (vide si les documents sont identiques)
+    """
+    if len(expected) != len(result):
+        return [f"{len(result)} documents au lieu de {len(expected)}"]
+    differences = []
+    for expected_doc, result_doc in zip(expected, result):
+        for key in sorted(set(expected_doc) | set(result_doc)):
+            if expected_doc.get(key, "<absent>") != result_doc.get(key, "<absent>"):
+                differences.append(
+                    f"{expected_doc['callsign']} {expected_doc['time']} {key} : "
+                    f"{result_doc.get(key, '<absent>')!r} au lieu de {expected_doc.get(key, '<absent>')!r}"
+                )
+    return differences
+
+
+def test_round_trip(name, expected, result):
+    """
+    Vérifie qu'un mode de stockage restitue les mêmes documents que le stockage 'single' (hors _id)
+    Args:
+        name (str): Nom du test (mode de stockage et requête)
+        expected (array): Documents lus en stockage 'single'
+        result (array): Documents lus dans le mode de stockage testé
+    """
+    global recap
+
+    differences = get_differences(sort_documents(expected), sort_documents(result))
+    recap['nb_tests'] += 1
+    if len(differences) > 0:
+        result = 'KO'
+        recap['nb_tests_ko'] += 1
+        recap['test_failed'].append(name)
+    elif len(expected) == 0:
+        result = 'KO'
+        recap['nb_tests_ko'] += 1
+        recap['test_failed'].append(name)
+        differences = ["aucun document lu en stockage 'single'"]
+    else:
+        result = 'OK'
+        recap['nb_tests_ok'] += 1
+
+    output = f"[{result}] {name} : {len(expected)} documents\n"
+    for difference in differences[:10]:
+        output += f"    - {difference}\n"
+    print(output, end='')
+    with open(LOG_FILE, 'a', encoding='utf-8') as file:
+        file.write(output)
+
+
+def recap_tests():
+    """
+    Récapitulatif des tests
+    Returns:
+        bool: True si tous les modes de stockage restituent les documents du stockage 'single'
+    """
+
+    global recap
+    output = f'''
+===========================================
+|    Récapitulatif des tests
+===========================================
+| Nombre de tests effectués : {recap['nb_tests']}
+| Nombre de tests réussis   : {recap['nb_tests_ok']}
+| Nombre de tests échoués   : {recap['nb_tests_ko']}
+'''
+    if recap['nb_tests_ko'] > 0:
+        output += f'''
+| Tests échoués : {recap['test_failed']}
+'''
+    output += '''===========================================
+'''
+    print(output)
+    with open(LOG_FILE, 'a', encoding='utf-8') as file:
+        file.write(output)
+
+    return recap['nb_tests_ko'] == 0
@@ -0,0 +1,223 @@
+import sys
+import time
+from datetime import datetime, timezone
+from bson import ObjectId
+from functions_tests_indexes import *
+
+########################################################################
+#
+#   Vérification des index MongoDB (manifest : init_db/indexes_mongodb.py)
+#   explain() de chaque requête fréquente de get_data / live_api / cronjobs :
+#   le test échoue si une requête parcourt toute la collection (COLLSCAN)
+#
+#   A exécuter sur une base alimentée : sur une collection absente ou vide,
+#   le plan (EOF) ne vérifie aucun index et le test est signalé SKIP
+#
+#########################################################################
+
+# Importer les pipelines des cronjobs (modules partagés de live_api)
+sys.path.append(f"{parent_dir}/cronjobs")
+sys.path.append(f"{parent_dir}/live_api")
+from aggregation_pipeline import build_aggregation_pipeline
+# Importer la reconstitution des positions du stockage OpenSky 'bucket'
+from opensky_storage import OpenskyStorage, get_bucket_filter, BUCKET_POINTS_STAGES
+
+# Noms des collections
+MONGO_COL_OPENSKY = os.environ.get("MONGO_COL_OPENSKY")
+MONGO_COL_AIRLABS = os.environ.get("MONGO_COL_AIRLABS")
+MONGO_COL_OPENSKY_LATEST = os.environ.get("MONGO_COL_OPENSKY_LATEST", "opensky_latest")
+MONGO_COL_OPENSKY_UNMATCHED = os.environ.get("MONGO_COL_OPENSKY_UNMATCHED", "opensky_unmatched")
+MONGO_COL_OPENSKY_BUCKETS = f"{MONGO_COL_OPENSKY}_buckets"
+MONGO_COL_DATA_AGGREGATED = os.environ.get("MONGO_COL_DATA_AGGREGATED", "data_aggregated")
+
+db = get_database()
+now = int(time.time())
+day_start = now - 86400
+
+
+# --------------------------------------
+# COLLECTION OPENSKY
+# --------------------------------------
+
+# get_data.get_flight_positions
+test_index("get_flight_positions", explain_aggregate(db, MONGO_COL_OPENSKY, [
+    {'$match': {'callsign': {'$in': ['AFR1234', 'EZY5678']}, 'time': {'$gte': day_start, '$lt': now}}},
+    {'$sort': {'time': 1}},
+]))
+
+# cronjobs.aggregation_pipeline.aggregate - vols à réconcilier
+test_index("aggregate (distinct des vols)", explain_distinct(db, MONGO_COL_OPENSKY, "airlabs_id", {
+    "time": {"$gt": day_start, "$lte": now},
+    "on_ground": False,
+    "airlabs_id": {"$nin": [None, ""]},
+}))
+
+# cronjobs.aggregation_pipeline.aggregate - recalcul des vols
+test_index("aggregate (recalcul des vols)", explain_aggregate(
+    db, MONGO_COL_OPENSKY, build_aggregation_pipeline({"airlabs_id": {"$in": [ObjectId()]}}, MONGO_COL_AIRLABS, "merge")
+))
+
+# live_api.fetch_airlabs_data.build_reconciliation_operations
+test_index("build_reconciliation_operations", explain_update(
+    db, MONGO_COL_OPENSKY, {"callsign": "AFR1234", "airlabs_id": {"$type": "null"}}, {"$set": {"airlabs_id": ObjectId()}}
+))
+
+# live_api.fetch_airlabs_data.lauch_script - suppression des documents non rapprochés
+test_index("lauch_script airlabs (suppression)", explain_delete(db, MONGO_COL_OPENSKY, {"airlabs_id": {"$type": "null"}}))
+
+
+# --------------------------------------
+# COLLECTION OPENSKY JOURNALIERE (OPENSKY_STORAGE_LAYOUT=daily)
+# --------------------------------------
+
+# Collection du dernier jour (absente : tests signalés SKIP)
+daily_collections = OpenskyStorage(db, MONGO_COL_OPENSKY, "daily").get_daily_collections()
+MONGO_COL_OPENSKY_DAILY = list(daily_collections.values())[-1] if daily_collections else f"{MONGO_COL_OPENSKY}_{datetime.now(timezone.utc).strftime('%Y%m%d')}"
+
+# get_data.get_flight_positions
+test_index("get_flight_positions (daily)", explain_aggregate(db, MONGO_COL_OPENSKY_DAILY, [
+    {'$match': {'callsign': {'$in': ['AFR1234', 'EZY5678']}, 'time': {'$gte': day_start, '$lt': now}}},
+    {'$sort': {'time': 1}},
+]))
+
+# cronjobs.aggregation_pipeline.aggregate - vols à réconcilier
+test_index("aggregate (distinct des vols, daily)", explain_distinct(db, MONGO_COL_OPENSKY_DAILY, "airlabs_id", {
+    "time": {"$gt": day_start, "$lte": now},
+    "on_ground": False,
+    "airlabs_id": {"$nin": [None, ""]},
+}))
+
+# cronjobs.aggregation_pipeline.aggregate - recalcul des vols
+test_index("aggregate (recalcul des vols, daily)", explain_aggregate(
+    db, MONGO_COL_OPENSKY_DAILY, build_aggregation_pipeline({"airlabs_id": {"$in": [ObjectId()]}}, MONGO_COL_AIRLABS, "merge")
+))
+
+# live_api.fetch_airlabs_data.build_reconciliation_operations
+test_index("build_reconciliation_operations (daily)", explain_update(
+    db, MONGO_COL_OPENSKY_DAILY, {"callsign": "AFR1234", "airlabs_id": {"$type": "null"}}, {"$set": {"airlabs_id": ObjectId()}}
+))
+
+# live_api.fetch_airlabs_data.lauch_script - suppression des documents non rapprochés
+test_index("lauch_script airlabs (suppression, daily)", explain_delete(db, MONGO_COL_OPENSKY_DAILY, {"airlabs_id": {"$type": "null"}}))
+
+
+# --------------------------------------
+# COLLECTION OPENSKY_BUCKETS (OPENSKY_STORAGE_LAYOUT=bucket)
+# --------------------------------------
+
+# live_api.opensky_storage.build_bucket_operations
+test_index("build_bucket_operations", explain_update(
+    db, MONGO_COL_OPENSKY_BUCKETS, {"callsign": "AFR1234", "hour": now - now % 3600, "airlabs_id": None}, {"$inc": {"count": 1}}, multi=False
+))
+
+# get_data.get_flight_positions
+match = {'callsign': {'$in': ['AFR1234', 'EZY5678']}, 'time': {'$gte': day_start, '$lt': now}}
+test_index("get_flight_positions (bucket)", explain_aggregate(db, MONGO_COL_OPENSKY_BUCKETS, [
+    {'$match': get_bucket_filter(match)}, *BUCKET_POINTS_STAGES, {'$match': match}, {'$sort': {'time': 1}},
+]))
+
+# cronjobs.aggregation_pipeline.aggregate - vols à réconcilier
+match = {"time": {"$gt": day_start, "$lte": now}, "on_ground": False, "airlabs_id": {"$nin": [None, ""]}}
+test_index("aggregate (distinct des vols, bucket)", explain_aggregate(db, MONGO_COL_OPENSKY_BUCKETS, [
+    {'$match': get_bucket_filter(match)}, *BUCKET_POINTS_STAGES, {'$match': match}, {'$group': {'_id': '$airlabs_id'}},
+]))
+
+# cronjobs.aggregation_pipeline.aggregate - recalcul des vols
+match = {"on_ground": False, "airlabs_id": {"$in": [ObjectId()]}}
+test_index("aggregate (recalcul des vols, bucket)", explain_aggregate(db, MONGO_COL_OPENSKY_BUCKETS, [
+    {'$match': get_bucket_filter(match)}, *BUCKET_POINTS_STAGES, {'$match': match},
+]))
+
+# live_api.fetch_airlabs_data.lauch_script - suppression des documents non rapprochés
+test_index("lauch_script airlabs (suppression, bucket)", explain_delete(db, MONGO_COL_OPENSKY_BUCKETS, {"airlabs_id": {"$type": "null"}}))
+
+
+# --------------------------------------
+# COLLECTION AIRLABS
+# --------------------------------------
+
+# cronjobs.aggregation_pipeline.get_upper_bound
+test_index("get_upper_bound", explain_find(db, MONGO_COL_AIRLABS, {}, sort=[("time", -1)], limit=1))
+
+
+# --------------------------------------
+# COLLECTION OPENSKY_LATEST
+# --------------------------------------
+
+# get_data.get_data_initial_mongodb - vols rapprochés
+#   (live_api.opensky_latest.load_latest_state lit toute la collection, un document par vol en cours)
+test_index("get_data_initial_mongodb (vols rapprochés)", explain_find(db, MONGO_COL_OPENSKY_LATEST, {"airlabs_id": {"$ne": None}}))
+
+# live_api.fetch_airlabs_data.lauch_script - vols non rapprochés
+test_index("lauch_script airlabs (vols non rapprochés)", explain_find(db, MONGO_COL_OPENSKY_LATEST, {"airlabs_id": None}))
+
+# get_data.get_data_initial_mongodb - dernier appel OpenSky
+test_index("get_data_initial_mongodb", explain_find(db, MONGO_COL_OPENSKY_LATEST, {}, sort=[("time", -1)], limit=1))
+
+# live_api.opensky_latest.update_latest - vols absents du dernier appel
+test_index("update_latest (suppression)", explain_delete(db, MONGO_COL_OPENSKY_LATEST, {"time": {"$ne": now}}))
+
+# live_api.opensky_latest.build_latest_reconciliation_operations
+test_index("build_latest_reconciliation_operations", explain_update(
+    db, MONGO_COL_OPENSKY_LATEST, {"callsign": "AFR1234", "airlabs_id": None}, {"$set": {"airlabs_id": ObjectId()}}, multi=False
+))
+
+# get_data.get_flights_api (filtre sur l'aéroport de départ)
+test_index("get_flights_api", explain_aggregate(db, MONGO_COL_OPENSKY_LATEST, [
+    {'$match': {
+        'airlabs_id': {'$ne': None},
+        'callsign': {'$nin': [None, '']},
+        'airlabs_doc.dep_iata': 'CDG',
+        'airlabs_doc.arr_iata': {'$nin': [None, '']},
+        'airlabs_doc.airline_iata': {'$nin': [None, '']},
+        'origin_country': {'$nin': [None, '']},
+    }},
+]))
+
+
+# --------------------------------------
+# COLLECTION OPENSKY_UNMATCHED
+# --------------------------------------
+
+# live_api.unmatched_callsigns.load_unmatched_callsigns
+test_index("load_unmatched_callsigns", explain_find(db, MONGO_COL_OPENSKY_UNMATCHED, {"expires_at": {"$gt": datetime.now(timezone.utc)}, "misses": {"$gte": 3}}))
+
+
+# --------------------------------------
+# COLLECTION DATA_AGGREGATED
+# --------------------------------------
+
+# get_data.get_data_statistics_filtered (aéroport de départ)
+test_index("get_data_statistics_filtered (dep_iata)", explain_find(db, MONGO_COL_DATA_AGGREGATED, {
+    "count": {"$gt": 1}, "time_start": {"$gte": day_start, "$lt": now}, "dep_iata": {"$in": ["CDG", "ORY"]},
+}))
+
+# get_data.get_data_statistics_filtered (ville / pays : aéroports de départ ou d'arrivée)
+test_index("get_data_statistics_filtered (city_iata)", explain_find(db, MONGO_COL_DATA_AGGREGATED, {
+    "count": {"$gt": 1}, "time_start": {"$gte": day_start, "$lt": now},
+    "$or": [{"dep_iata": {"$in": ["CDG", "ORY"]}}, {"arr_iata": {"$in": ["CDG", "ORY"]}}],
+}))
+
+# get_data.get_data_statistics_filtered (aéronef)
+test_index("get_data_statistics_filtered (aircraft_icao)", explain_find(db, MONGO_COL_DATA_AGGREGATED, {
+    "count": {"$gt": 1}, "time_start": {"$gte": day_start, "$lt": now}, "aircraft_icao": {"$in": ["A320"]},
+}))
+
+# get_data.get_statistics_time_filter
+test_index("get_statistics_time_filter (time_start)", explain_find(db, MONGO_COL_DATA_AGGREGATED, {}, sort=[("time_start", 1)], limit=1))
+test_index("get_statistics_time_filter (time_end)", explain_find(db, MONGO_COL_DATA_AGGREGATED, {}, sort=[("time_end", -1)], limit=1))
+
+# get_data.get_top_destinations
+test_index("get_top_destinations", explain_aggregate(db, MONGO_COL_DATA_AGGREGATED, [
+    {"$match": {"dep_iata": "CDG", "arr_iata": {"$nin": ["CDG", None]}}},
+    {"$group": {"_id": "$callsign", "arr_airport": {"$addToSet": "$arr_iata"}}},
+]))
+
+# cronjobs.reference_enrichment.backfill_reference_fields
+test_index("backfill_reference_fields", explain_find(db, MONGO_COL_DATA_AGGREGATED, {"reference_enriched": {"$ne": True}}))
+
+
+# RECAP TESTS
+# --------------------------------------
+if not recap_tests():
+    sys.exit(1)
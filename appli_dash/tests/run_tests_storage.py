@@ -0,0 +1,90 @@
+import copy
+import time
+from bson import ObjectId
+from functions_tests_storage import *
+
+########################################################################
+#
+#   Aller-retour du stockage OpenSky (live_api/opensky_storage.py)
+#   Un même appel OpenSky est écrit dans chaque mode de stockage, puis relu
+#   avec OpenskyStorage.find : les modes 'daily' et 'bucket' doivent restituer
+#   les documents du mode 'single' (hors _id, non reconstitué en mode 'bucket')
+#
+#   Les collections de test (préfixe MONGO_COL_STORAGE_TEST) sont supprimées à la fin
+#
+#########################################################################
+
+# Importer le stockage OpenSky et le parsing des state vectors de l'ingestion
+sys.path.append(f"{parent_dir}/live_api")
+sys.path.append(f"{parent_dir}/init_db")
+from opensky_storage import OpenskyStorage
+from opensky_parser import parse_states
+from utilities_live_api import convert_time_unix_utc_to_datetime_fr, convert_time_unix_to_date
+from indexes_mongodb import get_daily_indexes
+
+# Préfixe des collections de test
+MONGO_COL_STORAGE_TEST = "tests_opensky_storage"
+
+db = get_database()
+
+
+def build_snapshot(time_now, airlabs_ids):
+    """
+    Documents OpenSky d'un appel API, tels qu'écrits par l'ingestion
+    Args:
+        time_now (int): Time unix de l'appel API
+        airlabs_ids (dict): Dict callsign -> airlabs_id (vols rapprochés)
+    Returns:
+        array: Liste des documents OpenSky
+    """
+    states = [
+        ["3c6444", "afr1234 ", "France", time_now - 2, time_now - 1, 2.35, 48.85, 10972.8, False, 230.5, 182.3, -0.33, None, 11277.6, "1000", False, 0],
+        ["4ca7b4", "EZY5678", "United Kingdom ", time_now - 5, time_now - 1, -0.45, 51.47, None, True, 0.0, None, None, None, None, None, False, 0],
+        ["3944ef", "  ", "France", time_now, time_now, 5.37, 43.3, 1524.0, False, 120.0, 90.0, 5.2, None, 1600.2, None, False, 0],
+        ["a1b2c3", "RYR42", "Ireland", None, time_now, 4.5, 50.1, 3048.0, False, 180.0, None, 0.0, None, 3100.0, None, False, 0],
+    ]
+    opensky_data = parse_states(states, time_now, convert_time_unix_utc_to_datetime_fr(time_now))
+    for opensky_doc in opensky_data:
+        opensky_doc["airlabs_id"] = airlabs_ids.get(opensky_doc["callsign"])
+        opensky_doc["time_date"] = convert_time_unix_to_date(opensky_doc["time"])
+    return opensky_data
+
+
+# Appels OpenSky : deux heures de la veille et l'heure en cours (plusieurs documents bucket
+# et plusieurs collections journalières par callsign)
+now = int(time.time())
+now = now - now % 60
+airlabs_ids = {"AFR1234": ObjectId(), "RYR42": ObjectId()}
+snapshots = [build_snapshot(time_call, airlabs_ids) for time_call in [now - 86400, now - 86400 + 3600, now - 300, now]]
+time_start = now - 2 * 86400
+
+storages = {layout: OpenskyStorage(db, MONGO_COL_STORAGE_TEST, layout, get_daily_indexes(MONGO_COL_STORAGE_TEST)) for layout in ["single", "daily", "bucket"]}
+
+try:
+    for layout, storage in storages.items():
+        for snapshot in snapshots:
+            storage.insert_many(copy.deepcopy(snapshot))
+
+    # Requêtes des lecteurs du stockage OpenSky
+    queries = {
+        "tous les documents": {"time": {"$gte": time_start}},
+        "get_flight_positions": {"callsign": {"$in": ["AFR1234", "EZY5678"]}, "time": {"$gte": now - 3600, "$lt": now + 1}},
+        "aggregate (vols rapprochés)": {"on_ground": False, "airlabs_id": {"$in": list(airlabs_ids.values())}},
+        "documents non rapprochés": {"airlabs_id": None},
+    }
+    for query_name, query in queries.items():
+        expected = storages["single"].find(query, time_start, now)
+        for layout in ["daily", "bucket"]:
+            test_round_trip(f"{layout} - {query_name}", expected, storages[layout].find(query, time_start, now))
+
+finally:
+    # Suppression des collections de test
+    for name in db.list_collection_names():
+        if name.startswith(MONGO_COL_STORAGE_TEST):
+            db.drop_collection(name)
+
+
+# RECAP TESTS
+# --------------------------------------
+if not recap_tests():
+    sys.exit(1)
@@ -76,18 +76,8 @@ def get_static_table(keys_api, key_sql, table, dataStatic):
     if len(lists) == 2:
         list_api = list(set(lists[0] + lists[1]))
 
-    engine = get_connection()
-    sql = f'''
-    SELECT * FROM {table};
-    '''
-    with engine.connect() as conn:
-        query = conn.execute(text(sql))
-    df = pd.DataFrame(query.fetchall())
-    df = df[df[key_sql].isin(list_api)]
-    df = df.reset_index(drop=True)
-    df = df.dropna(subset=[key_sql]).drop_duplicates(subset=[key_sql]).reset_index(drop=True)
-    df = df.set_index(key_sql, drop=False)
-    return df.to_dict('index')
+    rows = reference_cache.get_many(table, key_sql, list_api)
+    return {row[key_sql]: dict(row) for row in rows.values()}
 
 
 # Traitement affichage tooltip aéroports
@@ -559,32 +549,17 @@ def create_markers():
     Création des markers aéroports sur la MAP STAT
     """
 
-    AIRPORT_NAME_INDEX = 0
-    AIRPORT_IATA_INDEX = 1
-    AIRPORT_LATITUDE_INDEX = 2
-    AIRPORT_LONGITUDE_INDEX = 3
-
-    engine = connection_mysql()
-    sql = """
-            SELECT airport_name, airport_iata, airport_latitude, airport_longitude FROM airports 
-            WHERE airport_latitude BETWEEN 35.93302587741835 AND 71.40896420697621
-            AND airport_longitude BETWEEN -11.360649771804841 AND 32.017698096436696 
-            ORDER BY airport_name;
-        """
-
-    with engine.connect() as conn:
-        query = conn.execute(text(sql))
-        airports = query.all()
+    airports = get_airports_map_stat()
 
     markers = []
     icon_url = "assets/img/dot.svg"
 
     for airport in airports:
 
-        name = airport[AIRPORT_NAME_INDEX]
-        iata = airport[AIRPORT_IATA_INDEX]
-        latitude = airport[AIRPORT_LATITUDE_INDEX]
-        longitude = airport[AIRPORT_LONGITUDE_INDEX]
+        name = airport['airport_name']
+        iata = airport['airport_iata']
+        latitude = airport['airport_latitude']
+        longitude = airport['airport_longitude']
 
         html_icon_content = f"""
             <div data-callsign="{iata}">
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+import sys
+import random
+import string
+import time
+from pathlib import Path
+
+# Ajout du path du projet
+parent_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(f"{parent_dir}/live_api")
+
+# Importer le module de rapprochement OpenSky <-> Airlabs
+from flights_matcher import match_flights, format_match_stats
+
+# Tailles des jeux de données synthétiques
+SIZES = [10000, 50000]
+# Au-delà de cette taille, l'ancien rapprochement O(n²) n'est pas mesuré
+MAX_SIZE_LEGACY = 10000
+# Part des vols OpenSky présents dans Airlabs
+MATCH_RATIO = 0.6
+
+
+def generate_flights(nb_flights, seed=42):
+    """
+    Génère des vols OpenSky et Airlabs synthétiques
+    Args:
+        nb_flights (int): Nb de vols OpenSky à générer
+        seed (int, optional): Graine du générateur aléatoire
+    Returns:
+        tuple: (liste de dict OpenSky, liste de dict Airlabs)
+    """
+    rng = random.Random(seed)
+    opensky_data = []
+    airlabs_data = []
+    for i in range(nb_flights):
+        callsign = f"{''.join(rng.choices(string.ascii_uppercase, k=3))}{i}"
+        icao_24 = f"{i:06X}"
+        opensky_data.append({"callsign": callsign, "icao_24": icao_24, "latitude": 48.0, "longitude": 2.0})
+        if rng.random() < MATCH_RATIO:
+            airlabs_data.append({"flight_icao": callsign, "hex": icao_24, "dep_iata": "CDG", "arr_iata": "NCE"})
+    rng.shuffle(airlabs_data)
+    return opensky_data, airlabs_data
+
+
+def legacy_match(opensky_data, airlabs_data):
+    """
+    Ancien rapprochement par parcours de listes (init_mongo.init_data)
+    """
+    callsigns_opensky = list(set([dic['callsign'] for dic in opensky_data]))
+    callsigns_airlabs = list(set([dic['flight_icao'] for dic in airlabs_data if dic['flight_icao'] != "" and dic['flight_icao'] is not None]))
+    callsigns = list(set(callsigns_opensky) & set(callsigns_airlabs))
+    data_opensky = [dic for dic in opensky_data if dic['callsign'] in callsigns]
+    data_airlabs = [dic for dic in airlabs_data if dic['flight_icao'] in callsigns]
+    matches = []
+    for callsign in callsigns:
+        match_airlabs = [dic for dic in data_airlabs if dic['flight_icao'] == callsign][0]
+        match_opensky = [dic for dic in data_opensky if dic['callsign'] == callsign][0]
+        matches.append((match_opensky, match_airlabs))
+    return matches
+
+
+def timeit(function, *args, **kwargs):
+    """ Retourne le résultat et la durée d'exécution (en secondes) d'une fonction """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    for size in SIZES:
+        opensky_data, airlabs_data = generate_flights(size)
+        print(f"\n{size} vols OpenSky / {len(airlabs_data)} vols Airlabs")
+
+        (matches, stats), duration = timeit(match_flights, opensky_data, airlabs_data)
+        print(f" - hash join callsign          : {duration * 1000:9.1f} ms - {format_match_stats(stats)}")
+
+        (matches, stats), duration = timeit(match_flights, opensky_data, airlabs_data, match_hex=True)
+        print(f" - hash join callsign + hex    : {duration * 1000:9.1f} ms - {stats['matched']} vols rapprochés")
+
+        if size <= MAX_SIZE_LEGACY:
+            legacy_matches, duration = timeit(legacy_match, opensky_data, airlabs_data)
+            print(f" - parcours de listes (O(n²))  : {duration * 1000:9.1f} ms - {len(legacy_matches)} vols rapprochés")
+        else:
+            print(f" - parcours de listes (O(n²))  : non mesuré au-delà de {MAX_SIZE_LEGACY} vols")
@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+import sys
+import random
+import string
+import time
+import numpy as np
+from pathlib import Path
+
+# Ajout du path du projet
+parent_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(f"{parent_dir}/live_api")
+
+# Importer le parsing des state vectors OpenSky et la zone de l'appel API
+from opensky_parser import parse_states
+import properties as pr
+
+# Tailles des jeux de données synthétiques
+SIZES = [5000, 20000, 100000]
+# Nb de mesures par parsing (meilleure durée retenue)
+REPEAT = 5
+# Part des state vectors sans callsign ou sans position (écartés par le parsing)
+INVALID_RATIO = 0.1
+# Zone de l'appel API
+BBOX = (pr.la_min, pr.la_max, pr.lon_min, pr.lon_max)
+
+# Parsing en colonnes NumPy, comparé au parsing par ligne de l'ingestion (opensky_parser.parse_states)
+#   Constat : ~2,5x plus lent (conversion en tableau object et reconstruction des dicts pour MongoDB),
+#   non retenu pour l'ingestion
+
+# Champs des documents OpenSky (ordre des clés des documents enregistrés)
+OPENSKY_FIELDS = [
+    "time", "datatime", "airlabs_id", "icao_24", "callsign", "origin_country", "time_position", "last_contact",
+    "longitude", "latitude", "baro_altitude", "geo_altitude", "velocity", "cap", "vertical_rate", "on_ground",
+]
+
+# Index des champs dans un state vector OpenSky
+STATE_INDEXES = {
+    "icao_24": 0, "callsign": 1, "origin_country": 2, "time_position": 3, "last_contact": 4, "longitude": 5,
+    "latitude": 6, "baro_altitude": 7, "on_ground": 8, "velocity": 9, "cap": 10, "vertical_rate": 11,
+    "geo_altitude": 13,
+}
+
+
+def generate_states(nb_states, seed=42):
+    """
+    Génère des state vectors OpenSky synthétiques (format de la réponse /states/all)
+    Args:
+        nb_states (int): Nb de state vectors à générer
+        seed (int, optional): Graine du générateur aléatoire
+    Returns:
+        array: Liste de state vectors (17 champs)
+    """
+    rng = random.Random(seed)
+    states = []
+    for i in range(nb_states):
+        callsign = f"{''.join(rng.choices(string.ascii_uppercase, k=3))}{i}".lower().ljust(8)
+        longitude = rng.uniform(pr.lon_min - 1, pr.lon_max + 1)
+        latitude = rng.uniform(pr.la_min - 1, pr.la_max + 1)
+        if rng.random() < INVALID_RATIO:
+            # Callsign absent, position absente ou nulle
+            invalid = rng.choice(["callsign", "position", "zero"])
+            callsign = rng.choice([None, ""]) if invalid == "callsign" else callsign
+            longitude = None if invalid == "position" else 0.0 if invalid == "zero" else longitude
+        states.append([
+            f"{i:06x}", callsign, "France ", 1684000000 + i, 1684000000 + i, longitude, latitude,
+            rng.uniform(0, 12000), rng.random() < 0.05, rng.uniform(0, 300), rng.choice([None, rng.uniform(0, 360)]),
+            rng.uniform(-20, 20), None, rng.uniform(0, 12000), "1000", False, 0,
+        ])
+    return states
+
+
+def format_strings(values, upper=True):
+    """
+    Nettoie une colonne de chaînes (strip, upper), les valeurs vides ou nulles deviennent None
+    Args:
+        values (ndarray): Colonne de type object
+        upper (bool, optional): Passage en majuscules (True par défaut)
+    Returns:
+        ndarray: Colonne de type object
+    """
+    result = np.full(len(values), None, dtype=object)
+    present = values.astype(bool)
+    if present.any():
+        strings = np.char.strip(values[present].astype(str))
+        result[present] = np.char.upper(strings) if upper else strings
+    return result
+
+
+def parse_states_columnar(states, time_now, datetime_fr, bbox=None):
+    """
+    Transforme les state vectors OpenSky en documents à partir de colonnes NumPy
+        Les filtres (callsign, longitude / latitude, zone) et le nettoyage des chaînes sont vectorisés,
+        les dicts ne sont construits que pour les state vectors conservés
+        Documents identiques à ceux de parse_states (opensky_parser)
+    Args:
+        states (array): State vectors renvoyés par l'API OpenSky
+        time_now (int): Time unix de l'appel API
+        datetime_fr (str): Datetime de l'appel API au format FR
+        bbox (tuple, optional): Zone (la_min, la_max, lon_min, lon_max), sans filtre si None
+    Returns:
+        array: Liste des documents OpenSky
+    """
+    if len(states) == 0:
+        return []
+
+    # Tableau (type object) d'un state vector par ligne, un champ par colonne
+    states = np.array(states, dtype=object)
+
+    # Filtre vectorisé : callsign renseigné, longitude et latitude renseignées et non nulles
+    longitude = states[:, STATE_INDEXES["longitude"]].astype(float)
+    latitude = states[:, STATE_INDEXES["latitude"]].astype(float)
+    mask = states[:, STATE_INDEXES["callsign"]].astype(bool) & (np.nan_to_num(longitude) != 0) & (np.nan_to_num(latitude) != 0)
+    if bbox is not None:
+        la_min, la_max, lon_min, lon_max = bbox
+        mask &= (latitude >= la_min) & (latitude <= la_max) & (longitude >= lon_min) & (longitude <= lon_max)
+    states = states[mask]
+
+    # Colonnes des state vectors conservés
+    columns = {field: states[:, index] for field, index in STATE_INDEXES.items()}
+    columns["icao_24"] = format_strings(columns["icao_24"])
+    columns["callsign"] = format_strings(columns["callsign"])
+    columns["origin_country"] = format_strings(columns["origin_country"], upper=False)
+    columns["cap"] = np.where(np.equal(columns["cap"], None), 0, columns["cap"])
+
+    # Construction des documents MongoDB (valeurs Python natives)
+    datatime = datetime_fr if time_now else None
+    return [{
+        "time": time_now,
+        "datatime": datatime,
+        "airlabs_id": None,
+        "icao_24": icao_24,
+        "callsign": callsign,
+        "origin_country": origin_country,
+        "time_position": time_position,
+        "last_contact": last_contact,
+        "longitude": longitude,
+        "latitude": latitude,
+        "baro_altitude": baro_altitude,
+        "geo_altitude": geo_altitude,
+        "velocity": velocity,
+        "cap": cap,
+        "vertical_rate": vertical_rate,
+        "on_ground": on_ground,
+    } for icao_24, callsign, origin_country, time_position, last_contact, longitude, latitude, baro_altitude,
+        geo_altitude, velocity, cap, vertical_rate, on_ground in zip(*[columns[field].tolist() for field in OPENSKY_FIELDS[3:]])]
+
+
+def timeit(function, *args, **kwargs):
+    """ Retourne le résultat et la meilleure durée d'exécution (en secondes) d'une fonction """
+    durations = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        durations.append(time.perf_counter() - start)
+    return result, min(durations)
+
+
+if __name__ == "__main__":
+    time_now = 1684000000
+    datetime_fr = "2023-05-13 19:46:40"
+    for size in SIZES:
+        states = generate_states(size)
+        print(f"\n{size} state vectors OpenSky")
+
+        rows, duration_rows = timeit(parse_states, states, time_now, datetime_fr, BBOX)
+        print(f" - parsing par ligne (dicts)    : {duration_rows * 1000:9.1f} ms - {len(rows)} documents")
+
+        columnar, duration_columnar = timeit(parse_states_columnar, states, time_now, datetime_fr, BBOX)
+        print(f" - parsing en colonnes (NumPy)  : {duration_columnar * 1000:9.1f} ms - {len(columnar)} documents"
+              f" (x{duration_rows / duration_columnar:.1f})")
+
+        if columnar != rows:
+            raise AssertionError("Les documents des deux parsings sont différents")
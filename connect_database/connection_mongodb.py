@@ -1,5 +1,7 @@
 import os
-from pymongo import MongoClient
+import threading
+import time
+from pymongo import MongoClient, monitoring
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -10,15 +12,184 @@ MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME")
 MONGO_USER = os.environ.get("MONGO_USER")
 MONGO_PASS = os.environ.get("MONGO_PASS")
 
-# Retourne l'objet sqlalchemy engine
+# Configuration du pool de connexions
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 50))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+# Durée (en secondes) pendant laquelle le dernier test de connexion reste valable
+MONGO_HEALTH_CHECK_INTERVAL = float(os.environ.get("MONGO_HEALTH_CHECK_INTERVAL", 30))
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Compteurs du pool de connexions MongoDB (connexions empruntées, temps d'attente)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failed = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        # Le début et la fin d'un emprunt sont émis par le même thread
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failed += 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, 'started', None)
+        wait_time = time.perf_counter() - started if started is not None else 0.0
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def get_stats(self):
+        """
+        Retourne les compteurs du pool
+        Returns:
+            dict: Statistiques du pool de connexions
+        """
+        with self._lock:
+            return {
+                'checked_out': self.checked_out,
+                'checkouts': self.checkouts,
+                'checkout_failed': self.checkout_failed,
+                'connections_created': self.connections_created,
+                'connections_closed': self.connections_closed,
+                'wait_time_avg_ms': round(self.wait_time_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_time_max_ms': round(self.wait_time_max * 1000, 3),
+            }
+
+
+class PooledMongoClient(MongoClient):
+    """
+    MongoClient partagé par tous les appels d'un même processus
+        close() ne ferme pas le client partagé, les fonctions appelantes
+        fermant leur connexion après chaque usage : utiliser close_connection()
+    """
+
+    def close(self):
+        pass
+
+    def close_pool(self):
+        super().close()
+
+
+# Client partagé du processus
+_client = None
+_client_pid = None
+_pool_listener = None
+_last_health_check = None
+_client_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """
+    Après un fork (workers gunicorn ou Airflow), le processus enfant
+    ne réutilise pas le client ni le verrou du processus parent
+    """
+    global _client, _client_pid, _pool_listener, _last_health_check, _client_lock
+    _client = None
+    _client_pid = None
+    _pool_listener = None
+    _last_health_check = None
+    _client_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# Retourne le client MongoDB partagé du processus
 def get_connection():
-    client = MongoClient(
-        f"mongodb://{MONGO_USER}:{MONGO_PASS}@{MONGO_HOST}:{MONGO_PORT}/{MONGO_DB_NAME}",
-        serverSelectionTimeoutMS = 2000
-    )
-    try:
-        client.server_info()
-        return client
-
-    except Exception as ex:
-        print(f"\nErreur de connexion à la database MongoDB : \n{ex}\n")
\ No newline at end of file
+    global _client, _client_pid, _pool_listener, _last_health_check
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _pool_listener = PoolStatsListener()
+            _client = PooledMongoClient(
+                f"mongodb://{MONGO_USER}:{MONGO_PASS}@{MONGO_HOST}:{MONGO_PORT}/{MONGO_DB_NAME}",
+                serverSelectionTimeoutMS = 2000,
+                maxPoolSize = MONGO_MAX_POOL_SIZE,
+                minPoolSize = MONGO_MIN_POOL_SIZE,
+                event_listeners = [_pool_listener],
+                connect = False
+            )
+            _client_pid = os.getpid()
+            _last_health_check = None
+        client = _client
+
+    # Test de connexion, mis en cache pendant MONGO_HEALTH_CHECK_INTERVAL secondes
+    last_check = _last_health_check
+    if last_check is None or time.monotonic() - last_check > MONGO_HEALTH_CHECK_INTERVAL:
+        try:
+            client.admin.command('ping')
+            _last_health_check = time.monotonic()
+
+        except Exception as ex:
+            print(f"\nErreur de connexion à la database MongoDB : \n{ex}\n")
+            return None
+
+    return client
+
+
+# Ferme le client MongoDB partagé du processus
+def close_connection():
+    global _client, _client_pid, _pool_listener, _last_health_check
+
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close_pool()
+        _client = None
+        _client_pid = None
+        _pool_listener = None
+        _last_health_check = None
+
+
+# Retourne les statistiques du pool de connexions MongoDB
+def get_pool_stats():
+    stats = {
+        'pid': os.getpid(),
+        'max_pool_size': MONGO_MAX_POOL_SIZE,
+        'min_pool_size': MONGO_MIN_POOL_SIZE,
+        'health_check_age_s': round(time.monotonic() - _last_health_check, 1) if _last_health_check is not None else None,
+    }
+    if _pool_listener is not None:
+        stats.update(_pool_listener.get_stats())
+    return stats
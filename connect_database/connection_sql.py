@@ -1,5 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -10,13 +13,97 @@ SQL_DB_NAME=os.environ.get("SQL_DB_NAME")
 SQL_USER=os.environ.get("SQL_USER")
 SQL_PASS=os.environ.get("SQL_PASS")
 
-# Retourne l'objet sqlalchemy engine 
+# Configuration du pool de connexions
+SQL_POOL_SIZE=int(os.environ.get("SQL_POOL_SIZE", 5))
+SQL_MAX_OVERFLOW=int(os.environ.get("SQL_MAX_OVERFLOW", 10))
+SQL_POOL_TIMEOUT=float(os.environ.get("SQL_POOL_TIMEOUT", 30))
+SQL_POOL_RECYCLE=int(os.environ.get("SQL_POOL_RECYCLE", 3600))
+SQL_POOL_PRE_PING=os.environ.get("SQL_POOL_PRE_PING", "1") == "1"
+
+# Compteurs du pool (conservés si le pool est recréé par SQLAlchemy)
+_stats_lock = threading.Lock()
+_stats = {
+    'checkouts': 0,
+    'checkout_time_total': 0.0,
+    'checkout_time_max': 0.0,
+    'overflow_checkouts': 0,
+    'overflow_max': 0,
+    'timeouts': 0,
+}
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool mesurant la latence d'emprunt d'une connexion et l'usage de l'overflow
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            with _stats_lock:
+                _stats['timeouts'] += 1
+            raise
+        checkout_time = time.perf_counter() - start
+        overflow = self._overflow
+        with _stats_lock:
+            _stats['checkouts'] += 1
+            _stats['checkout_time_total'] += checkout_time
+            _stats['checkout_time_max'] = max(_stats['checkout_time_max'], checkout_time)
+            if overflow > 0:
+                _stats['overflow_checkouts'] += 1
+                _stats['overflow_max'] = max(_stats['overflow_max'], overflow)
+        return connection
+
+
+# Engine partagé du processus
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+
+# Retourne l'objet sqlalchemy engine (un seul engine par processus)
 def get_connection():
+    global _engine, _engine_pid
+
     try:
-        engine = create_engine(
-            url=f"mysql+pymysql://{SQL_USER}:{SQL_PASS}@{SQL_HOST}:{SQL_PORT}/{SQL_DB_NAME}"
-        )
-        return engine
+        with _engine_lock:
+            # Après un fork, le processus enfant crée son propre engine
+            if _engine is None or _engine_pid != os.getpid():
+                _engine = create_engine(
+                    url=f"mysql+pymysql://{SQL_USER}:{SQL_PASS}@{SQL_HOST}:{SQL_PORT}/{SQL_DB_NAME}",
+                    poolclass=TimedQueuePool,
+                    pool_size=SQL_POOL_SIZE,
+                    max_overflow=SQL_MAX_OVERFLOW,
+                    pool_timeout=SQL_POOL_TIMEOUT,
+                    pool_recycle=SQL_POOL_RECYCLE,
+                    pool_pre_ping=SQL_POOL_PRE_PING
+                )
+                _engine_pid = os.getpid()
+            return _engine
 
     except Exception as ex:
         print(f"\nErreur de connexion : \n{ex}\n")
+
+
+# Retourne les statistiques du pool de connexions SQL
+def get_pool_stats():
+    with _stats_lock:
+        stats = {
+            'pid': os.getpid(),
+            'pool_size': SQL_POOL_SIZE,
+            'max_overflow': SQL_MAX_OVERFLOW,
+            'checkouts': _stats['checkouts'],
+            'checkout_time_avg_ms': round(_stats['checkout_time_total'] / _stats['checkouts'] * 1000, 3) if _stats['checkouts'] else 0.0,
+            'checkout_time_max_ms': round(_stats['checkout_time_max'] * 1000, 3),
+            'overflow_checkouts': _stats['overflow_checkouts'],
+            'overflow_max': _stats['overflow_max'],
+            'timeouts': _stats['timeouts'],
+        }
+    engine = _engine
+    if engine is not None and _engine_pid == os.getpid():
+        stats['checked_out'] = engine.pool.checkedout()
+        stats['checked_in'] = engine.pool.checkedin()
+        stats['overflow'] = max(engine.pool.overflow(), 0)
+    return stats
@@ -0,0 +1,171 @@
+import os
+import time
+from reference_enrichment import backfill_reference_fields
+from flight_aggregates import AGGREGATION_METADATA_ID, bump_aggregation_version
+from dotenv import load_dotenv
+load_dotenv()
+
+# Collection des données agrégées
+MONGO_COL_DATA_AGGREGATED = os.environ.get("MONGO_COL_DATA_AGGREGATED", "data_aggregated")
+
+
+def get_watermark(collection_metadata):
+    """
+    Retourne le watermark de l'agrégation : temps jusqu'auquel les documents OpenSky sont réconciliés
+    Args:
+        collection_metadata (Collection): Collection des métadonnées
+    Returns:
+        int: Temps unix du watermark (None si aucune réconciliation n'a été faite)
+    """
+    document = collection_metadata.find_one({"_id": AGGREGATION_METADATA_ID}, {"watermark": 1})
+    return document.get("watermark") if document is not None else None
+
+
+def get_upper_bound(collection_airlabs):
+    """
+    Retourne la borne haute de l'agrégation : temps du dernier appel Airlabs
+        Les documents OpenSky antérieurs ont été rapprochés (airlabs_id renseigné)
+        ou supprimés par cet appel : leur agrégation est définitive
+    Args:
+        collection_airlabs (Collection): Collection Airlabs
+    Returns:
+        int: Temps unix du dernier appel Airlabs (None si la collection est vide)
+    """
+    document = collection_airlabs.find_one({}, {"time": 1}, sort=[("time", -1)])
+    return document["time"] if document is not None else None
+
+
+def build_aggregation_pipeline(match, collection_airlabs_name, when_matched):
+    """
+    Construit la pipeline d'agrégation des documents OpenSky par vol (airlabs_id)
+        Les résultats sont fusionnés dans data_aggregated par MongoDB ($merge)
+    Args:
+        match (dict): Filtre des documents OpenSky (ajouté aux filtres on_ground / airlabs_id)
+        collection_airlabs_name (str): Nom de la collection Airlabs
+        when_matched (str): Action $merge sur les documents existants
+            ("merge" : champs recalculés remplacés, enrichissement conservé ; "replace")
+    Returns:
+        array: Pipeline d'agrégation
+    """
+    return [
+        {"$match": {"on_ground": False, "airlabs_id": {"$nin": [None, ""]}, **match}},
+        { "$project": {
+            "airlabs_id": 1,
+            "time": 1,
+            "datatime": 1,
+            "callsign": 1,
+        }},
+        { "$sort":{ "airlabs_id" : 1, "time": 1} },
+        { "$group": {
+                "_id": "$airlabs_id",
+                "callsign": { "$first": "$callsign" },
+                "time_start": { "$first" : "$time" },
+                "datetime_start": { "$first" : "$datatime" },
+                "time_end": { "$last" : "$time" },
+                "datetime_end": { "$last" : "$datatime" },
+                "count": { "$sum": 1}
+            }
+        },
+        {"$lookup": {
+            "from": collection_airlabs_name,
+            "localField": "_id",
+            "foreignField": "_id",
+            "as": "airlabs_doc"
+        }},
+        {"$unwind": "$airlabs_doc"},
+        { "$project": {
+            "callsign": 1,
+            "time_start": 1,
+            "time_start_date": {"$toDate": {"$multiply": ["$time_start", 1000]}},
+            "datetime_start": 1,
+            "time_end": 1,
+            "datetime_end": 1,
+            "count": 1,
+            "airline_iata": "$airlabs_doc.airline_iata",
+            "airline_number": "$airlabs_doc.flight_number",
+            "arr_iata": "$airlabs_doc.arr_iata",
+            "arr_icao": "$airlabs_doc.arr_icao",
+            "dep_iata": "$airlabs_doc.dep_iata",
+            "dep_icao": "$airlabs_doc.dep_icao",
+            "aircraft_flag": "$airlabs_doc.flag",
+            "aircraft_reg_number": "$airlabs_doc.reg_number",
+            "aircraft_icao": "$airlabs_doc.aircraft_icao",
+        }},
+        {"$merge": {
+            "into": MONGO_COL_DATA_AGGREGATED,
+            "on": "_id",
+            "whenMatched": when_matched,
+            "whenNotMatched": "insert"
+        }}
+    ]
+
+
+def aggregate(db, opensky_storage, collection_airlabs_name, collection_metadata_name, references=None, full=False, batch_size=1000):
+    """
+    Réconcilie la collection data_aggregated avec les documents OpenSky
+        Les agrégats sont mis à jour en continu par l'ingestion OpenSky ($min / $max / $inc) ;
+        ce job les recalcule exactement (historique rapproché par Airlabs, écritures concurrentes) :
+        - mode incrémental : vols ayant des documents OpenSky entre le watermark et le
+          dernier appel Airlabs, recalculés sur tout leur historique
+        - mode complet : tous les vols
+        Les nouveaux documents sont enrichis par les tables de référence, puis le watermark
+        et la version des données agrégées sont mis à jour
+    Args:
+        db (Database): Base de données MongoDB
+        opensky_storage (OpenskyStorage): Stockage des documents OpenSky (collection unique ou journalières)
+        collection_airlabs_name (str): Nom de la collection Airlabs
+        collection_metadata_name (str): Nom de la collection des métadonnées
+        references (dict, optional): Tables de référence renvoyées par load_references
+            (documents non enrichis si None)
+        full (bool, optional): Recalcul complet (False par défaut)
+        batch_size (int, optional): Nb d'opérations par lot de l'enrichissement (1000 par défaut)
+    Returns:
+        dict: Statistiques de l'agrégation
+    """
+    start = time.perf_counter()
+    collection_metadata = db[collection_metadata_name]
+
+    watermark = None if full else get_watermark(collection_metadata)
+    upper_bound = get_upper_bound(db[collection_airlabs_name])
+    stats = {'mode': 'full' if full else 'incremental', 'watermark': watermark, 'upper_bound': upper_bound, 'flights': None, 'enriched': 0}
+
+    if upper_bound is None:
+        stats['duration_s'] = round(time.perf_counter() - start, 2)
+        return stats
+
+    if watermark is None:
+        pipeline = build_aggregation_pipeline({}, collection_airlabs_name, "replace")
+    else:
+        # Vols ayant reçu des documents depuis le watermark (définitivement rapprochés par Airlabs)
+        flights = opensky_storage.distinct("airlabs_id", {
+            "time": {"$gt": watermark, "$lte": upper_bound},
+            "on_ground": False,
+            "airlabs_id": {"$nin": [None, ""]},
+        }, watermark, upper_bound)
+        stats['flights'] = len(flights)
+        # Aucun nouveau vol : la version des données agrégées est inchangée
+        if len(flights) == 0:
+            collection_metadata.update_one({"_id": AGGREGATION_METADATA_ID}, {"$set": {"watermark": upper_bound}}, upsert=True)
+            stats['duration_s'] = round(time.perf_counter() - start, 2)
+            return stats
+        pipeline = build_aggregation_pipeline({"airlabs_id": {"$in": flights}}, collection_airlabs_name, "merge")
+
+    opensky_storage.aggregate(pipeline, allowDiskUse=True)
+
+    if references is not None:
+        stats['enriched'] = backfill_reference_fields(db[MONGO_COL_DATA_AGGREGATED], references, batch_size=batch_size)
+
+    # Nouveau watermark et nouvelle version des données agrégées (invalide le cache des statistiques)
+    bump_aggregation_version(collection_metadata, watermark=upper_bound)
+
+    stats['duration_s'] = round(time.perf_counter() - start, 2)
+    return stats
+
+
+def format_aggregation_stats(stats):
+    """ Résumé lisible des statistiques d'agrégation """
+    return (
+        f"réconciliation {stats['mode']} : documents OpenSky de {stats['watermark']} à {stats['upper_bound']}, "
+        f"{stats['flights'] if stats['flights'] is not None else 'tous les'} vols recalculés, "
+        f"{stats['enriched']} documents enrichis en {stats['duration_s']}s"
+    )
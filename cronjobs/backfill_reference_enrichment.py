@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+import sys
+from pathlib import Path
+import os
+import time
+
+# Ajout du path du projet
+parent_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(f"{parent_dir}/connect_database")
+sys.path.append(f"{parent_dir}/live_api")
+
+# Importer le fichier de connexion à MongoDB
+from connection_mongodb import get_connection
+# Importer le fichier de connexion à MySQL
+from connection_sql import get_connection as connection_mysql
+# Importer l'enrichissement des données agrégées par les tables de référence
+from reference_enrichment import load_references, backfill_reference_fields
+# Importer la publication des versions des données agrégées
+from flight_aggregates import bump_aggregation_version
+
+# Enrichissement des documents existants de la collection data_aggregated
+#   python backfill_reference_enrichment.py        : documents pas encore enrichis
+#   python backfill_reference_enrichment.py --all  : tous les documents (après modification des tables de référence)
+
+# CREDENTIALS
+MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME")
+MONGO_COL_METADATA = os.environ.get("MONGO_COL_METADATA", "metadata")
+MONGO_COL_DATA_AGGREGATED = os.environ.get("MONGO_COL_DATA_AGGREGATED", "data_aggregated")
+MONGO_BULK_BATCH_SIZE = int(os.environ.get("MONGO_BULK_BATCH_SIZE", 1000))
+
+all_documents = "--all" in sys.argv[1:]
+
+# Se connecter à MongoDB
+client = get_connection()
+db = client[MONGO_DB_NAME]
+
+start = time.perf_counter()
+references = load_references(connection_mysql())
+nb_documents = backfill_reference_fields(db[MONGO_COL_DATA_AGGREGATED], references, all_documents, MONGO_BULK_BATCH_SIZE)
+print(f"{nb_documents} documents enrichis dans la collection {MONGO_COL_DATA_AGGREGATED} en {time.perf_counter() - start:.2f}s")
+
+if nb_documents > 0:
+    # Publication d'une nouvelle version des données agrégées (invalide le cache des statistiques)
+    bump_aggregation_version(db[MONGO_COL_METADATA])
+
+# Fermeture de la connexion à MongoDB
+client.close()
@@ -3,6 +3,8 @@ import os
 import pandas as pd
 import numpy as np
 import re
+import time
+import pytz
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 from time import sleep
@@ -12,7 +14,7 @@ from connect_database.connection_mongodb import get_connection as connect_mongod
 from connect_database.connection_mysql import get_connection as connect_mysql
 from live_api.fetch_airlabs_data import query_airlabs_api
 from live_api.fetch_opensky_data import query_opensky_api
-from live_api.fetch_airlabs_data import lauch_script as lauch_script_airlabs
+from live_api.opensky_storage import OpenskyStorage
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -20,55 +22,61 @@ load_dotenv()
 MONGO_DATABASE = os.environ.get("MONGO_INITDB_DATABASE")
 MONGO_COL_OPENSKY = os.environ.get("MONGO_COL_OPENSKY")
 MONGO_COL_AIRLABS = os.environ.get("MONGO_COL_AIRLABS")
+MONGO_COL_OPENSKY_LATEST = os.environ.get("MONGO_COL_OPENSKY_LATEST", "opensky_latest")
 MONGO_COL_DATA_AGGREGATED = os.environ.get("MONGO_COL_DATA_AGGREGATED")
 
+# Mode de stockage des documents OpenSky ('single', 'daily' ou 'bucket')
+OPENSKY_STORAGE_LAYOUT = os.environ.get("OPENSKY_STORAGE_LAYOUT", "single")
 
-def check_data(collection_name):
+# Âge maximal (en secondes) de l'état courant des vols pour l'affichage initial de la map
+LIVE_MAP_INITIAL_MAX_AGE = float(os.environ.get("LIVE_MAP_INITIAL_MAX_AGE", 3600))
+
+
+def get_data_initial_mongodb():
     """
-    Checks si la collection possède des données
+    Récupère l'état courant des vols stocké dans MongoDB (collection opensky_latest),
+    avec les données Airlabs dénormalisées
+        (uniquement les vols avec une correspondance Airlabs)
+    Returns:
+        Array: Liste de dict des données initiales (vide si aucun enregistrement récent)
     """
     client = connect_mongodb()
+    if client is None:
+        return []
     db = client[MONGO_DATABASE]
-    collection = db[collection_name]
-    test = collection.find_one()
+    collection_latest = db[MONGO_COL_OPENSKY_LATEST]
+
+    # Date du dernier appel OpenSky
+    last_document = collection_latest.find_one({}, {'_id': 0, 'time': 1}, sort=[('time', -1)])
+    if last_document is None or time.time() - last_document['time'] > LIVE_MAP_INITIAL_MAX_AGE:
+        client.close()
+        return []
+
+    results = list(collection_latest.find({"airlabs_id": {"$ne": None}}, {"_id": 0, "airlabs_id": 0, "time_date": 0, "stored_position": 0, "airlabs_doc.time_date": 0}))
     client.close()
-    if test:
-        return True
-    return False
+    return results
 
 
 def get_data_initial():
     """
     S'effectue lors de l'ouverture de la page de la map Dash
     Récupère les données initiales depuis MongoDB pour la page de la map Dash
-        -> les donnéees qui matchent entre data Airlabs et dernier enregistrement OpenSky
+        -> état courant des vols (opensky_latest) qui ont une correspondance Airlabs
+        Les APIs OpenSky et Airlabs ne sont appelées (sans écriture en base) que si MongoDB
+        ne contient aucun enregistrement récent
     Returns:
         Array: Liste de dict des données initiales
     """
 
-    # Connexion à MongoDB
-    client = connect_mongodb()
-    db = client[MONGO_DATABASE]
+    results = get_data_initial_mongodb()
+    if len(results) > 0:
+        return results
 
-    check_opensky = check_data(MONGO_COL_OPENSKY)
-    if not check_opensky:
-        opensky_data = query_opensky_api()
-        client = connect_mongodb()
-        db = client[MONGO_DATABASE]
-        collection = db[MONGO_COL_OPENSKY]
-        collection.insert_many(opensky_data)
-        client.close()
-        sleep(5)
-        lauch_script_airlabs()
+    print("MAP LIVE - Aucun enregistrement récent dans MongoDB, appel des APIs")
 
-    else:
-        opensky_collection = db[MONGO_COL_OPENSKY]
-        # Recherche du "time" le plus récent
-        max_time_result = opensky_collection.find().sort("time", -1).limit(1)
-        max_time = max_time_result[0]["time"]
-
-        # Recherche des documents avec "time" = max_time
-        opensky_data = list(opensky_collection.find({"time": max_time}))
+    # Appel API OpenSky
+    opensky_data = query_opensky_api()
+    sleep(1)
 
     # Appel API Airlabs
     airlabs_data = query_airlabs_api()
@@ -90,7 +98,6 @@ def get_data_initial():
     return results
 
 
-
 def get_data_dynamic_updated(old_data):
     """
     Quand refresh de la page map Dash, appel à l'API OpenSky
@@ -214,7 +221,7 @@ def get_data_statistics(date_data=None):
     db = client[MONGO_DATABASE]
     data = db['data_aggregated']
 
-    cursor = data.find()
+    cursor = data.find({}, {'time_start_date': 0})
     df_temp = pd.DataFrame(list(cursor))
     df_temp = df_temp.dropna(subset=['count']).reset_index(drop=True)
     df_temp['count'] = df_temp['count'].astype(int)
@@ -240,15 +247,41 @@ def get_data_statistics(date_data=None):
         cond3 = df_temp['time_end'] < max_time
         df_temp = df_temp[cond1 & cond2 & cond3].reset_index(drop=True)
 
-    df = get_sql_data(df_temp)
-    df['datetime_start'] = pd.to_datetime(df['datetime_start'])
-    df['datetime_end'] = pd.to_datetime(df['datetime_end'])
+    df = enrich_data_statistics(df_temp)
 
     if date_data is None:
         last_day = df['datetime_start'].max().date()
         condition = df['datetime_start'].dt.date < last_day
         df = df[condition].reset_index(drop=True)
 
+    return df
+
+
+def enrich_data_statistics(df_temp):
+    """
+    Ajoute les données des tables de référence aux enregistrements agrégés et convertit les dates
+        Les documents enrichis par le DAG d'agrégation (reference_enriched) ne sont pas joints
+        aux tables MySQL : seuls les documents antérieurs passent par get_sql_data
+    Args:
+        df_temp (DataFrame): Enregistrements de la collection data_aggregated
+    Returns:
+        DataFrame: Dataframe des données statistiques
+    """
+    if 'reference_enriched' in df_temp.columns:
+        enriched = df_temp['reference_enriched'] == True
+        df = df_temp[enriched]
+        if not enriched.all():
+            # Les colonnes de référence absentes des documents non enrichis sont ajoutées par la jointure
+            df_raw = df_temp[~enriched].dropna(axis=1, how='all')
+            for col in ['dep_iata', 'arr_iata', 'airline_iata', 'aircraft_icao']:
+                if col not in df_raw.columns:
+                    df_raw = df_raw.assign(**{col: None})
+            df = pd.concat([df, get_sql_data(df_raw)], ignore_index=True)
+        df = df.drop('reference_enriched', axis=1).reset_index(drop=True)
+    else:
+        df = get_sql_data(df_temp)
+    df['datetime_start'] = pd.to_datetime(df['datetime_start'])
+    df['datetime_end'] = pd.to_datetime(df['datetime_end'])
     df = df.astype({
         'dep_airport_latitude': 'float64',
         'dep_airport_longitude': 'float64',
@@ -604,44 +637,64 @@ def get_datas(dep_airport):
 
     return airports_with_coordinates
 
+def get_paris_day_bounds(day_date=None):
+    """
+    Retourne les bornes (temps unix) d'une journée à l'heure de Paris
+    Args:
+        day_date (str, optional): Date au format YYYY-MM-DD (jour en cours par défaut)
+    Returns:
+        tuple: (temps unix du début de la journée, temps unix du début du lendemain)
+    """
+    paris_tz = pytz.timezone("Europe/Paris")
+    if day_date is None:
+        day = datetime.now(paris_tz).date()
+    else:
+        day = datetime.strptime(day_date, "%Y-%m-%d").date()
+    start = paris_tz.localize(datetime(day.year, day.month, day.day))
+    next_day = day + timedelta(days=1)
+    end = paris_tz.localize(datetime(next_day.year, next_day.month, next_day.day))
+    return int(start.timestamp()), int(end.timestamp())
+
 # Retourne toutes les positions (latitude et longitude) du vol pendant la journée en cours
 def get_flight_positions(flight_number, api=False):
     """
-    Retourne les positions du vol donné par le numéro de vol en entré
+    Retourne les positions du jour (heure de Paris) du vol donné par son numéro de vol
+        Lecture par OpenskyStorage, quel que soit le mode de stockage (OPENSKY_STORAGE_LAYOUT) :
+        $match sur (callsign, time), $lookup des données Airlabs pour l'API
+    Args:
+        flight_number (str): Callsign du vol
+        api (bool, optional): Positions détaillées avec données Airlabs (False par défaut)
+    Returns:
+        Array: Liste de dict des positions triées par date
     """
 
-    day_date = datetime.now().strftime("%Y-%m-%d")
-    day_date_after = (datetime.now() + timedelta(days= 1)).strftime('%Y-%m-%d')
+    time_start, time_end = get_paris_day_bounds()
 
     client = connect_mongodb()
     db = client[MONGO_DATABASE]
-    datas_collection = db[MONGO_COL_OPENSKY]
+    opensky_storage = OpenskyStorage(db, MONGO_COL_OPENSKY, OPENSKY_STORAGE_LAYOUT)
+
+    pipeline = [
+        {'$match': {'callsign': flight_number, 'time': {'$gte': time_start, '$lt': time_end}}},
+        {'$sort': {'time': 1}},
+    ]
 
-    airplane_datas = datas_collection.find({'callsign': flight_number, 'datatime': {'$gte': day_date, '$lte': day_date_after}}).sort("datatime", 1)
     if api:
-        cleaned_airplane_datas = []
-        for airplane in airplane_datas:
-
-            client = connect_mongodb()
-            db = client[MONGO_DATABASE]
-            airlabs_col = db[MONGO_COL_AIRLABS]
-
-            if airplane['airlabs_id'] is not None:
-                airlabs_data = airlabs_col.find_one({'_id': airplane['airlabs_id']}, {'_id': 0, 'flag': 1, 'arr_iata': 1, 'flight_iata': 1, 
-                                                                                      'dep_iata': 1, 'airline_iata': 1})
-                airplane.update(airlabs_data)
-
-            airplane.pop('_id')
-            airplane.pop('airlabs_id')
-            airplane.pop('time_position')
-            airplane.pop('time')
-            airplane.pop('last_contact')
-            airplane.pop('icao_24')
-            
-            cleaned_airplane_datas.append(airplane)
-
-        return list(cleaned_airplane_datas)
-    airplane_positions = [{'latitude': airplane ['latitude'], 'longitude': airplane['longitude']} for airplane in airplane_datas]
+        pipeline += [
+            {'$lookup': {
+                'from': MONGO_COL_AIRLABS,
+                'localField': 'airlabs_id',
+                'foreignField': '_id',
+                'pipeline': [{'$project': {'_id': 0, 'flag': 1, 'arr_iata': 1, 'flight_iata': 1, 'dep_iata': 1, 'airline_iata': 1}}],
+                'as': 'airlabs_doc'
+            }},
+            {'$replaceRoot': {'newRoot': {'$mergeObjects': ['$$ROOT', {'$ifNull': [{'$first': '$airlabs_doc'}, {}]}]}}},
+            {'$project': {'_id': 0, 'airlabs_doc': 0, 'airlabs_id': 0, 'time_position': 0, 'time': 0, 'time_date': 0, 'last_contact': 0, 'icao_24': 0}},
+        ]
+    else:
+        pipeline.append({'$project': {'_id': 0, 'latitude': 1, 'longitude': 1}})
+
+    airplane_positions = list(opensky_storage.aggregate(pipeline, time_start, time_end))
 
     client.close()
 
@@ -939,57 +992,59 @@ def get_value_pk_airports(pk_value):
 ##########################################################
 
 def get_flights_api(callsign=None, dep_airport=None, arr_airport=None, airline_company=None, origin_country=None):
+    """
+    Retourne les vols en cours (état courant des vols, collection opensky_latest)
+        Les filtres sont appliqués par MongoDB ($match) sur les champs dénormalisés :
+        si au moins un filtre est renseigné, les autres champs filtrables doivent être renseignés
+    Args:
+        callsign (str, optional): Callsign du vol
+        dep_airport (str, optional): Code IATA de l'aéroport de départ
+        arr_airport (str, optional): Code IATA de l'aéroport d'arrivée
+        airline_company (str, optional): Code IATA de la compagnie
+        origin_country (str, optional): Pays d'origine de l'appareil
+    Returns:
+        Array: Liste de dict des vols ('404' si aucun vol ne correspond aux filtres)
+    """
 
     client = connect_mongodb()
     db = client[MONGO_DATABASE]
-    opensky_col = db[MONGO_COL_OPENSKY]
-    airlabs_col = db[MONGO_COL_AIRLABS]
-
-    flights_aggr = []
+    latest_col = db[MONGO_COL_OPENSKY_LATEST]
+
+    # Champs filtrables du document de l'état courant
+    filters = {
+        'callsign': callsign,
+        'airlabs_doc.dep_iata': dep_airport,
+        'airlabs_doc.arr_iata': arr_airport,
+        'airlabs_doc.airline_iata': airline_company,
+        'origin_country': origin_country,
+    }
+    is_filtered = any(filters.values())
 
-    last_time = opensky_col.find().sort("datatime", -1)[0]['datatime']
-    flights_dyn = opensky_col.find({"datatime": last_time})
-    
-    for flight in flights_dyn:
-        if flight['airlabs_id'] is not None:
-            flight_stat = airlabs_col.find({'_id': flight['airlabs_id']})[0]
-            flight_dict = {
-                'flight_number': flight_stat['flight_number'],
-                'depart_airport': flight_stat['dep_iata'],
-                'arrival_airport': flight_stat['arr_iata'],
-                'airline_company': flight_stat['airline_iata'],
-                'origin_country_code': flight_stat['flag']
-            }
-            flight.update(flight_dict)
-        
-        flight.pop('_id')
-        flight.pop('airlabs_id')
-        flight.pop('icao_24')
-        flight.pop('time')
-        flight.pop('last_contact')
-        flight.pop('time_position')
+    match = {}
+    if is_filtered:
+        match['airlabs_id'] = {'$ne': None}
+        for field, value in filters.items():
+            match[field] = value if value is not None else {'$nin': [None, '']}
 
-        flights_aggr.append(flight)
+    pipeline = [
+        {'$match': match},
+        {'$addFields': {
+            'flight_number': '$airlabs_doc.flight_number',
+            'depart_airport': '$airlabs_doc.dep_iata',
+            'arrival_airport': '$airlabs_doc.arr_iata',
+            'airline_company': '$airlabs_doc.airline_iata',
+            'origin_country_code': '$airlabs_doc.flag'
+        }},
+        {'$project': {
+            '_id': 0, 'airlabs_id': 0, 'airlabs_doc': 0, 'icao_24': 0,
+            'time': 0, 'time_date': 0, 'last_contact': 0, 'time_position': 0, 'stored_position': 0
+        }}
+    ]
+    flights_aggr = list(latest_col.aggregate(pipeline))
 
     client.close()
 
-    test_flight_by_filter = lambda flight_value, filter_value: flight_value == filter_value if filter_value is not None else flight_value
-    
-    if callsign or dep_airport or arr_airport or airline_company or origin_country:
-        filtered_flights = [flight for flight in flights_aggr if
-            (test_flight_by_filter(flight.get('depart_airport'), dep_airport))
-            and
-            (test_flight_by_filter(flight.get('arrival_airport'), arr_airport))
-            and
-            (test_flight_by_filter(flight.get('airline_company'), airline_company))
-            and
-            (test_flight_by_filter(flight.get('origin_country'), origin_country))
-            and
-            (test_flight_by_filter(flight.get('callsign'), callsign))]
-        
-        if not filtered_flights:
-            return '404'
-        
-        return filtered_flights
-        
-    return flights_aggr
\ No newline at end of file
+    if is_filtered and not flights_aggr:
+        return '404'
+
+    return flights_aggr
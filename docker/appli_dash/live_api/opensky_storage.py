@@ -0,0 +1,288 @@
+import re
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne
+
+
+# Modes de stockage des documents OpenSky
+#   single : une seule collection (rétention par index TTL)
+#   daily  : une collection par jour UTC (<collection>_YYYYMMDD, rétention par suppression des collections)
+#   bucket : un document par (callsign, heure, airlabs_id) dans <collection>_buckets, positions
+#            en tableaux parallèles (rétention par index TTL)
+STORAGE_LAYOUTS = ["single", "daily", "bucket"]
+
+# Champs d'une position OpenSky enregistrés en tableaux dans les documents bucket
+#   (time, datatime et time_date sont recalculés à la lecture à partir de time)
+BUCKET_POINT_FIELDS = [
+    "time", "icao_24", "origin_country", "time_position", "last_contact", "longitude", "latitude",
+    "baro_altitude", "geo_altitude", "velocity", "cap", "vertical_rate", "on_ground",
+]
+
+# Champs communs à toutes les positions d'un document bucket
+BUCKET_FIELDS = ["callsign", "airlabs_id"]
+
+# Stages de reconstitution des documents OpenSky (un document par position) à partir des documents bucket
+BUCKET_POINTS_STAGES = [
+    {"$unwind": {"path": "$time", "includeArrayIndex": "point_index"}},
+    {"$replaceWith": {
+        **{field: f"${field}" for field in BUCKET_FIELDS},
+        "time": "$time",
+        "datatime": {"$dateToString": {
+            "date": {"$toDate": {"$multiply": ["$time", 1000]}},
+            "format": "%Y-%m-%d %H:%M:%S",
+            "timezone": "Europe/Paris"
+        }},
+        "time_date": {"$toDate": {"$multiply": ["$time", 1000]}},
+        **{field: {"$arrayElemAt": [f"${field}", "$point_index"]} for field in BUCKET_POINT_FIELDS if field != "time"},
+    }},
+]
+
+
+def get_bucket_filter(match):
+    """
+    Filtre des documents bucket pouvant contenir des positions correspondant au filtre d'une position
+        (champs communs repris tels quels, plage de temps traduite en chevauchement [time_start, time_end])
+    Args:
+        match (dict): Filtre d'une position OpenSky
+    Returns:
+        dict: Filtre des documents bucket
+    """
+    bucket_filter = {field: match[field] for field in BUCKET_FIELDS if field in match}
+    time_filter = match.get("time")
+    if isinstance(time_filter, dict):
+        for operator in ["$gt", "$gte"]:
+            if operator in time_filter:
+                bucket_filter["time_end"] = {operator: time_filter[operator]}
+        for operator in ["$lt", "$lte"]:
+            if operator in time_filter:
+                bucket_filter["time_start"] = {operator: time_filter[operator]}
+    elif time_filter is not None:
+        bucket_filter["time_start"] = {"$lte": time_filter}
+        bucket_filter["time_end"] = {"$gte": time_filter}
+    return bucket_filter
+
+
+def build_bucket_operations(documents):
+    """
+    Construit les écritures des documents bucket d'un appel OpenSky
+        Un UpdateOne (upsert) par position : ajout aux tableaux du bucket (callsign, heure, airlabs_id)
+    Args:
+        documents (array): Documents OpenSky du dernier appel API
+    Returns:
+        array: Liste des opérations UpdateOne de la collection <collection>_buckets
+    """
+    operations = []
+    for document in documents:
+        hour = document["time"] - document["time"] % 3600
+        operations.append(UpdateOne(
+            {"callsign": document["callsign"], "hour": hour, "airlabs_id": document.get("airlabs_id")},
+            {
+                "$push": {field: document.get(field) for field in BUCKET_POINT_FIELDS},
+                "$min": {"time_start": document["time"]},
+                "$max": {"time_end": document["time"]},
+                "$inc": {"count": 1},
+                # Date BSON de l'heure du bucket (rétention par index TTL)
+                "$setOnInsert": {"time_date": datetime.fromtimestamp(hour, timezone.utc)},
+            },
+            upsert=True
+        ))
+    return operations
+
+
+class OpenskyStorage:
+    """
+    Couche de lecture / écriture des documents OpenSky, indépendante du mode de stockage
+        En mode daily, les écritures sont réparties dans les collections des jours concernés
+        et les lectures sont distribuées sur les collections de la plage de temps ($unionWith)
+        En mode bucket, les lectures reconstituent un document par position (BUCKET_POINTS_STAGES)
+    Args:
+        db (Database): Base de données MongoDB
+        collection_name (str): Nom de la collection OpenSky (préfixe des collections journalières / bucket)
+        layout (str, optional): Mode de stockage, 'single', 'daily' ou 'bucket' ('single' par défaut)
+        daily_indexes (array, optional): Index des nouvelles collections journalières, liste de (clés, options)
+            (indexes_mongodb.get_daily_indexes), obligatoires pour écrire en mode daily
+    """
+
+    def __init__(self, db, collection_name, layout="single", daily_indexes=None):
+        if layout not in STORAGE_LAYOUTS:
+            raise ValueError(f"Mode de stockage OpenSky inconnu : {layout} (valeurs possibles : {', '.join(STORAGE_LAYOUTS)})")
+        self.db = db
+        self.collection_name = collection_name
+        self.layout = layout
+        self.daily_indexes = daily_indexes
+        self._daily_pattern = re.compile(rf"^{re.escape(collection_name)}_(\d{{8}})$")
+
+    def get_collection_name(self, time_unix):
+        """ Nom de la collection d'un document selon son time unix """
+        if self.layout == "single":
+            return self.collection_name
+        if self.layout == "bucket":
+            return f"{self.collection_name}_buckets"
+        return f"{self.collection_name}_{datetime.fromtimestamp(time_unix, timezone.utc).strftime('%Y%m%d')}"
+
+    def get_daily_collections(self):
+        """
+        Collections journalières existantes
+        Returns:
+            dict: Dict jour (YYYYMMDD) -> nom de la collection, trié par jour
+        """
+        days = {}
+        for name in self.db.list_collection_names():
+            match = self._daily_pattern.match(name)
+            if match is not None:
+                days[match.group(1)] = name
+        return dict(sorted(days.items()))
+
+    def get_collection_names(self, time_start=None, time_end=None):
+        """
+        Collections couvrant une plage de temps
+        Args:
+            time_start (int, optional): Borne basse (time unix), sans borne si None
+            time_end (int, optional): Borne haute (time unix), sans borne si None
+        Returns:
+            array: Noms des collections, triés par jour
+        """
+        if self.layout != "daily":
+            return [self.get_collection_name(time_start)]
+        day_start = datetime.fromtimestamp(time_start, timezone.utc).strftime('%Y%m%d') if time_start is not None else None
+        day_end = datetime.fromtimestamp(time_end, timezone.utc).strftime('%Y%m%d') if time_end is not None else None
+        return [
+            name for day, name in self.get_daily_collections().items()
+            if (day_start is None or day >= day_start) and (day_end is None or day <= day_end)
+        ]
+
+    def is_empty(self):
+        """ Vérifie l'absence de documents OpenSky dans toutes les collections """
+        return all(self.db[name].find_one({}, {"_id": 1}) is None for name in self.get_collection_names())
+
+    def insert_many(self, documents, batch_size=1000):
+        """
+        Insère les documents dans la collection de leur jour (un insert non ordonné par collection)
+            Les index du manifest (daily_indexes) sont créés sur les nouvelles collections journalières
+            En mode bucket, les positions sont ajoutées aux documents bucket par lots (bulk_write)
+        Args:
+            documents (array): Documents OpenSky (champ time renseigné)
+            batch_size (int, optional): Nb d'opérations par lot en mode bucket (1000 par défaut)
+        Returns:
+            int: Nb de documents insérés
+        """
+        if self.layout == "bucket":
+            operations = build_bucket_operations(documents)
+            collection = self.db[self.get_collection_name(None)]
+            for i in range(0, len(operations), batch_size):
+                collection.bulk_write(operations[i:i + batch_size], ordered=False)
+            return len(documents)
+
+        if self.layout == "daily" and self.daily_indexes is None:
+            raise ValueError("Index des collections journalières OpenSky non définis (daily_indexes)")
+
+        documents_by_collection = {}
+        for document in documents:
+            documents_by_collection.setdefault(self.get_collection_name(document["time"]), []).append(document)
+
+        existing = set(self.db.list_collection_names()) if self.layout == "daily" else set()
+        for name, collection_documents in documents_by_collection.items():
+            if self.layout == "daily" and name not in existing:
+                for keys, options in self.daily_indexes:
+                    self.db[name].create_index(keys, **options)
+            self.db[name].insert_many(collection_documents, ordered=False)
+        return len(documents)
+
+    def aggregate(self, pipeline, time_start=None, time_end=None, **kwargs):
+        """
+        Agrégation sur les collections de la plage de temps
+            Le premier stage ($match) est appliqué à chaque collection, les suivants
+            au résultat de l'union des collections
+            En mode bucket, le $match est précédé de la sélection des documents bucket
+            et de la reconstitution des positions
+        Args:
+            pipeline (array): Pipeline d'agrégation commençant par un $match
+            time_start (int, optional): Borne basse (time unix) de la plage de temps
+            time_end (int, optional): Borne haute (time unix) de la plage de temps
+            **kwargs: Options de Collection.aggregate (allowDiskUse...)
+        Returns:
+            CommandCursor | array: Résultats de l'agrégation (liste vide si aucune collection)
+        """
+        names = self.get_collection_names(time_start, time_end)
+        if len(names) == 0:
+            return []
+        match, stages = pipeline[0], pipeline[1:]
+        if self.layout == "bucket":
+            bucket_match = {"$match": get_bucket_filter(match["$match"])}
+            return self.db[names[0]].aggregate([bucket_match, *BUCKET_POINTS_STAGES, match, *stages], **kwargs)
+        union = [{"$unionWith": {"coll": name, "pipeline": [match]}} for name in names[1:]]
+        return self.db[names[0]].aggregate([match, *union, *stages], **kwargs)
+
+    def find(self, query, time_start=None, time_end=None):
+        """
+        Documents OpenSky (un document par position) correspondant au filtre, quel que soit le mode de stockage
+            En mode bucket, les documents reconstitués n'ont pas d'_id (les positions ne sont pas
+            des documents MongoDB) et datatime / time_date sont recalculés à partir de time
+            (valeurs identiques à celles écrites par l'ingestion, cf. appli_dash/tests/run_tests_storage.py)
+        Args:
+            query (dict): Filtre des positions
+            time_start (int, optional): Borne basse (time unix) de la plage de temps
+            time_end (int, optional): Borne haute (time unix) de la plage de temps
+        Returns:
+            array: Liste des documents OpenSky
+        """
+        return list(self.aggregate([{"$match": query}], time_start, time_end))
+
+    def distinct(self, key, query, time_start=None, time_end=None):
+        """ Valeurs distinctes d'un champ sur les collections de la plage de temps """
+        if self.layout == "bucket":
+            cursor = self.aggregate([{"$match": query}, {"$group": {"_id": f"${key}"}}], time_start, time_end)
+            return [document["_id"] for document in cursor]
+        values = set()
+        for name in self.get_collection_names(time_start, time_end):
+            values.update(self.db[name].distinct(key, query))
+        return list(values)
+
+    def bulk_write(self, operations, batch_size=1000, time_start=None, time_end=None):
+        """
+        Envoie les opérations par lots non ordonnés sur les collections de la plage de temps
+        Args:
+            operations (array): Liste des opérations pymongo
+            batch_size (int, optional): Nb d'opérations par lot (1000 par défaut)
+            time_start (int, optional): Borne basse (time unix) de la plage de temps, sans borne si None
+            time_end (int, optional): Borne haute (time unix) de la plage de temps, sans borne si None
+        Returns:
+            int: Nb de lots envoyés
+        """
+        nb_batches = 0
+        for name in self.get_collection_names(time_start, time_end):
+            for i in range(0, len(operations), batch_size):
+                self.db[name].bulk_write(operations[i:i + batch_size], ordered=False)
+                nb_batches += 1
+        return nb_batches
+
+    def delete_many(self, query, time_start=None, time_end=None):
+        """
+        Supprime les documents correspondant au filtre dans les collections de la plage de temps
+        Args:
+            query (dict): Filtre des documents
+            time_start (int, optional): Borne basse (time unix) de la plage de temps, sans borne si None
+            time_end (int, optional): Borne haute (time unix) de la plage de temps, sans borne si None
+        Returns:
+            int: Nb de documents supprimés
+        """
+        return sum(self.db[name].delete_many(query).deleted_count for name in self.get_collection_names(time_start, time_end))
+
+    def drop_expired(self, retention_days, now=None):
+        """
+        Supprime les collections journalières antérieures à la durée de rétention (mode daily uniquement)
+        Args:
+            retention_days (int): Durée de rétention en jours (jour en cours non compris)
+            now (datetime, optional): Date de référence (maintenant par défaut)
+        Returns:
+            array: Noms des collections supprimées
+        """
+        if self.layout != "daily":
+            return []
+        now = now or datetime.now(timezone.utc)
+        day_limit = (now - timedelta(days=retention_days)).strftime('%Y%m%d')
+        dropped = []
+        for day, name in self.get_daily_collections().items():
+            if day < day_limit:
+                self.db.drop_collection(name)
+                dropped.append(name)
+        return dropped
@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+from connection_mongodb import get_connection as connexion_mongodb
+from connection_mysql import get_connection as connexion_mysql
+from reference_enrichment import load_references, backfill_reference_fields
+from flight_aggregates import bump_aggregation_version
+import os
+import time
+
+
+# CREDENTIALS
+MONGO_DATABASE = os.environ.get("MONGO_INITDB_DATABASE")
+MONGO_COL_METADATA = os.environ.get("MONGO_COL_METADATA", "metadata")
+MONGO_COL_DATA_AGGREGATED = os.environ.get("MONGO_COL_DATA_AGGREGATED", "data_aggregated")
+MONGO_BULK_BATCH_SIZE = int(os.environ.get("MONGO_BULK_BATCH_SIZE", 1000))
+
+def backfill_data(all_documents=False):
+    """
+    Enrichit les documents existants de la collection data_aggregated
+    Args:
+        all_documents (bool, optional): Enrichir aussi les documents déjà enrichis (False par défaut)
+    """
+    # Se connecter à MongoDB
+    client = connexion_mongodb()
+    db = client[MONGO_DATABASE]
+
+    start = time.perf_counter()
+    references = load_references(connexion_mysql())
+    nb_documents = backfill_reference_fields(db[MONGO_COL_DATA_AGGREGATED], references, all_documents, MONGO_BULK_BATCH_SIZE)
+    print(f"{nb_documents} documents enrichis dans la collection {MONGO_COL_DATA_AGGREGATED} en {time.perf_counter() - start:.2f}s")
+
+    if nb_documents > 0:
+        # Publication d'une nouvelle version des données agrégées (invalide le cache des statistiques)
+        bump_aggregation_version(db[MONGO_COL_METADATA])
+
+    # Fermeture de la connexion à MongoDB
+    client.close()
@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine
+import os
+import threading
+from dotenv import load_dotenv
+load_dotenv()
+
+# Credentials Database SQL
+SQL_HOST=os.environ.get("SQL_HOST")
+SQL_PORT=os.environ.get("SQL_PORT")
+MYSQL_DATABASE=os.environ.get("MYSQL_DATABASE")
+MYSQL_USER=os.environ.get("MYSQL_ROOT_USERNAME")
+MYSQL_PASSWORD=os.environ.get("MYSQL_ROOT_PASSWORD")
+
+# Engine partagé du processus
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+
+# Retourne l'objet sqlalchemy engine (un seul engine par processus)
+def get_connection():
+    global _engine, _engine_pid
+
+    try:
+        with _engine_lock:
+            # Après un fork, le processus enfant crée son propre engine
+            if _engine is None or _engine_pid != os.getpid():
+                _engine = create_engine(
+                    url=f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{SQL_HOST}:{SQL_PORT}/{MYSQL_DATABASE}",
+                    pool_pre_ping=True
+                )
+                _engine_pid = os.getpid()
+            return _engine
+
+    except Exception as ex:
+        print(f"\nErreur de connexion : \n{ex}\n")
@@ -2,8 +2,14 @@ import os
 import requests
 import time
 from requests.exceptions import ConnectionError
+from bson import ObjectId
+from pymongo import InsertOne, UpdateMany
 from connection_mongodb import get_connection as connect_mongodb
-from utilities_live_api import convert_time_unix_utc_to_datetime_fr
+from utilities_live_api import convert_time_unix_utc_to_datetime_fr, convert_time_unix_to_date
+from flights_matcher import match_flights, format_match_stats
+from opensky_latest import build_latest_reconciliation_operations
+from unmatched_callsigns import build_unmatched_operations
+from opensky_storage import OpenskyStorage
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -13,8 +19,24 @@ KEY_AIRLABS_API = os.environ.get("KEY_AIRLABS_API_CRONJOB")
 MONGO_DATABASE = os.environ.get("MONGO_INITDB_DATABASE")
 MONGO_COL_OPENSKY = os.environ.get("MONGO_COL_OPENSKY")
 MONGO_COL_AIRLABS = os.environ.get("MONGO_COL_AIRLABS")
+MONGO_COL_OPENSKY_LATEST = os.environ.get("MONGO_COL_OPENSKY_LATEST", "opensky_latest")
+MONGO_COL_OPENSKY_UNMATCHED = os.environ.get("MONGO_COL_OPENSKY_UNMATCHED", "opensky_unmatched")
 ROOT_AIRLABS_URL = os.environ.get("ROOT_AIRLABS_URL")
 
+# Taille des lots d'écriture (bulk_write)
+MONGO_BULK_BATCH_SIZE = int(os.environ.get("MONGO_BULK_BATCH_SIZE", 1000))
+
+# Durée de validité (en secondes) du cache négatif des callsigns non rapprochés par Airlabs
+OPENSKY_UNMATCHED_TTL = int(os.environ.get("OPENSKY_UNMATCHED_TTL", 6 * 3600))
+
+# Marge (en secondes) avant le run Airlabs précédent des documents OpenSky à rapprocher
+# (documents d'un appel OpenSky en cours pendant ce run, insérés après sa suppression des documents non rapprochés)
+AIRLABS_RECONCILIATION_MARGIN = 3600
+
+# Stockage des documents OpenSky ('single' : une collection, 'daily' : une collection par jour,
+# 'bucket' : un document par callsign et par heure)
+OPENSKY_STORAGE_LAYOUT = os.environ.get("OPENSKY_STORAGE_LAYOUT", "single")
+
 # SURFACE WITH LONGITUDE & LATITUDE (SQUARE)
 la_min = 35.93302587741835
 la_max = 71.40896420697621
@@ -76,63 +98,136 @@ def query_airlabs_api():
     return airlabs_data
 
 
-def lauch_script():
+def build_reconciliation_operations(matches):
+    """
+    Construit l'ensemble des opérations d'écriture d'un run de rapprochement
+        - un InsertOne par document Airlabs (identifiant généré côté client)
+        - un UpdateMany par callsign pour renseigner airlabs_id dans OpenSky
+        - un UpdateOne par callsign pour dénormaliser le vol Airlabs dans l'état courant
+    Args:
+        matches (array): Liste de tuples (doc OpenSky, doc Airlabs) renvoyée par match_flights
+    Returns:
+        tuple: (opérations collection Airlabs, opérations collection OpenSky,
+                opérations collection de l'état courant)
+    """
+
+    airlabs_operations = []
+    opensky_operations = []
+    airlabs_docs_by_callsign = {}
+
+    for opensky_doc, airlabs_match in matches:
+        airlabs_doc = airlabs_match.copy()
+        airlabs_doc["_id"] = ObjectId()
+        airlabs_operations.append(InsertOne(airlabs_doc))
+
+        # Mettre à jour les document opensky avec le champ airlabs_id
+        opensky_operations.append(UpdateMany(
+            {"callsign": opensky_doc["callsign"], "airlabs_id": {"$type": "null"}},
+            {"$set": {"airlabs_id": airlabs_doc["_id"]}}
+        ))
+        airlabs_docs_by_callsign[opensky_doc["callsign"]] = airlabs_doc
+
+    latest_operations = build_latest_reconciliation_operations(airlabs_docs_by_callsign)
+
+    return airlabs_operations, opensky_operations, latest_operations
+
+
+def get_last_airlabs_time(collection_airlabs):
+    """
+    Retourne le temps du dernier run Airlabs (avant l'insertion du run en cours)
+        Les documents OpenSky antérieurs ont été rapprochés ou supprimés par ce run
+    Args:
+        collection_airlabs (Collection): Collection Airlabs
+    Returns:
+        int: Temps unix du dernier run Airlabs (None si la collection est vide)
+    """
+    document = collection_airlabs.find_one({}, {"time": 1}, sort=[("time", -1)])
+    return document["time"] if document is not None else None
+
+
+def bulk_write_batches(collection, operations, batch_size=MONGO_BULK_BATCH_SIZE):
+    """
+    Envoie les opérations par lots non ordonnés de taille batch_size
+    Args:
+        collection (Collection): Collection MongoDB cible
+        operations (array): Liste des opérations pymongo
+        batch_size (int, optional): Nb d'opérations par lot (MONGO_BULK_BATCH_SIZE par défaut)
+    Returns:
+        int: Nb de lots envoyés
+    """
+
+    nb_batches = 0
+    for i in range(0, len(operations), batch_size):
+        collection.bulk_write(operations[i:i + batch_size], ordered=False)
+        nb_batches += 1
+    return nb_batches
+
+
+def lauch_script(batch_size=MONGO_BULK_BATCH_SIZE):
     """
     Script de traitement et d'enregistrement des résultats de l'API
-    Principe: Vérifier dans collection Opensky si correspondance avec callsign
+    Principe: Vérifier dans l'état courant des vols si correspondance avec callsign
         - si oui: mise à jour document OpenSky avec identifiant Airlabs et
             enregistrement du document Airlabs
         - si non: suppression du document de la collection OpenSky
+    Les insertions Airlabs et mises à jour OpenSky sont envoyées par lots (bulk_write)
+    Args:
+        batch_size (int, optional): Nb d'opérations par lot (MONGO_BULK_BATCH_SIZE par défaut)
     """
 
     # Récupération data API
     airlabs_data = query_airlabs_api()
     print(f"Airlabs data : {len(airlabs_data)}")
 
+    # Date BSON de l'appel (rétention par index TTL)
+    for airlabs_doc in airlabs_data:
+        airlabs_doc["time_date"] = convert_time_unix_to_date(airlabs_doc["time"])
+
     # Connexion MongoDB
     client = connect_mongodb()
     db = client[MONGO_DATABASE]
-    collection_opensky = db[MONGO_COL_OPENSKY]
+    opensky_storage = OpenskyStorage(db, MONGO_COL_OPENSKY, OPENSKY_STORAGE_LAYOUT)
     collection_airlabs = db[MONGO_COL_AIRLABS]
-
-    # Création d'un dictionnaire basé sur 'flight_icao' pour accélérer la recherche de correspondances
-    airlabs_dict = {airlab["flight_icao"]: airlab for airlab in airlabs_data}
-
-    # Récupération du time du dernier appel API Airlabs 
-    max_time_airlabs_result = collection_airlabs.find().sort("time", -1).limit(1)
-    max_time_airlabs = max_time_airlabs_result[0]["time"]
-    print(f"Max time Airlabs : {max_time_airlabs}")
-
-    # Filtrer les documents opensky avec des 'callsign' correspondant aux 'flight_icao' de 'airlabs_data'
-    opensky_matching_callsigns = collection_opensky.find({
-        "airlabs_id": None,
-        "time": {"$gt": max_time_airlabs},
-        "callsign": {"$in": list(airlabs_dict.keys())}
-    }).sort("callsign")
-
-    # Parmi les documents qui matchent :
-    list_opensky = list(opensky_matching_callsigns)
-    callsigns = list(set([dic['callsign'] for dic in list_opensky]))
-    print(f"Nb Callsigns qui matchent : {len(callsigns)}")
-
-    nb_doc = 0
-    for callsign in callsigns:
-        match = airlabs_dict[callsign]
-        match_copy = match.copy()
-        airlabs_id = collection_airlabs.insert_one(match_copy).inserted_id
-        nb_doc += 1
-
-        # Mettre à jour les document opensky avec le champ airlabs_id
-        # {"callsign": callsign, "time": {"$gt": max_time_airlabs}},
-        collection_opensky.update_many(
-            {"callsign": callsign, "airlabs_id": None},
-            {"$set": {"airlabs_id": airlabs_id}}
-        )
-
-    print(f"Nb documents Airlabs insérés : {nb_doc}")
-    # Supprimer les documents opensky sans airlabs_id
-    collection_opensky.delete_many({"airlabs_id": {"$in": [None, ""]}})
+    collection_latest = db[MONGO_COL_OPENSKY_LATEST]
+    collection_unmatched = db[MONGO_COL_OPENSKY_UNMATCHED]
+
+    # Vols en cours sans airlabs_id, lus dans l'état courant (un document par callsign)
+    opensky_unmatched = list(collection_latest.find(
+        {"airlabs_id": None},
+        {"_id": 0, "callsign": 1, "icao_24": 1}
+    ))
+
+    # Rapprochement en mémoire des callsigns OpenSky et des vols Airlabs
+    matches, stats = match_flights(opensky_unmatched, airlabs_data)
+    print(f"Rapprochement : {format_match_stats(stats)}")
+
+    # Seules les collections OpenSky journalières depuis le run Airlabs précédent contiennent
+    # des documents non rapprochés (les précédents ont été rapprochés ou supprimés par ce run)
+    last_airlabs_time = get_last_airlabs_time(collection_airlabs)
+    time_start = last_airlabs_time - AIRLABS_RECONCILIATION_MARGIN if last_airlabs_time is not None else None
+
+    # Envoi des opérations par lots : les documents Airlabs d'abord,
+    # pour qu'un airlabs_id présent dans OpenSky référence toujours un document existant
+    airlabs_operations, opensky_operations, latest_operations = build_reconciliation_operations(matches)
+    nb_batches = bulk_write_batches(collection_airlabs, airlabs_operations, batch_size)
+    nb_batches += opensky_storage.bulk_write(opensky_operations, batch_size, time_start)
+    nb_batches += bulk_write_batches(collection_latest, latest_operations, batch_size)
+    print(f"Nb documents Airlabs insérés : {len(airlabs_operations)} ({nb_batches} lot(s))")
+
+    # Cache négatif : les callsigns non rapprochés ne sont plus historisés par l'ingestion
+    # OpenSky jusqu'à expiration (TTL), les callsigns rapprochés en sont retirés
+    matched_callsigns = {opensky_doc["callsign"] for opensky_doc, _ in matches}
+    unmatched_operations = build_unmatched_operations(
+        [opensky_doc["callsign"] for opensky_doc in opensky_unmatched if opensky_doc["callsign"] not in matched_callsigns],
+        OPENSKY_UNMATCHED_TTL
+    )
+    bulk_write_batches(collection_unmatched, unmatched_operations, batch_size)
+    if len(matched_callsigns) > 0:
+        collection_unmatched.delete_many({"_id": {"$in": list(matched_callsigns)}})
+    print(f"Nb callsigns non rapprochés mis en cache : {len(unmatched_operations)}")
+
+    # Supprimer les documents opensky sans airlabs_id (index partiel airlabs_id null)
+    opensky_storage.delete_many({"airlabs_id": {"$type": "null"}}, time_start)
 
     # on ferme la connexion
     client.close()
-
@@ -0,0 +1,35 @@
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+
+# Credentials
+MONGO_COL_OPENSKY = os.environ.get("MONGO_COL_OPENSKY", "opensky")
+MONGO_COL_AIRLABS = os.environ.get("MONGO_COL_AIRLABS", "airlabs")
+MONGO_COL_DATA_AGGREGATED = os.environ.get("MONGO_COL_DATA_AGGREGATED", "data_aggregated")
+
+# Champs de date BSON (index TTL de rétention) : collection -> (champ time unix, champ date)
+DATE_FIELDS = {
+    MONGO_COL_OPENSKY: ("time", "time_date"),
+    MONGO_COL_AIRLABS: ("time", "time_date"),
+    MONGO_COL_DATA_AGGREGATED: ("time_start", "time_start_date"),
+}
+
+
+def migrate_dates(db):
+    """
+    Renseigne les champs de date BSON des documents existants à partir du time unix (idempotent)
+        Mise à jour côté serveur ($toDate), seuls les documents sans date sont modifiés
+    Args:
+        db (Database): Base de données MongoDB
+    Returns:
+        dict: Dict collection -> nb de documents mis à jour
+    """
+    report = {}
+    for collection_name, (time_field, date_field) in DATE_FIELDS.items():
+        result = db[collection_name].update_many(
+            {date_field: {"$exists": False}, time_field: {"$type": "number"}},
+            [{"$set": {date_field: {"$toDate": {"$multiply": [f"${time_field}", 1000]}}}}]
+        )
+        report[collection_name] = result.modified_count
+    return report
@@ -4,6 +4,12 @@ import json
 from connection_mongodb import get_connection as connect_mongodb
 from cron_opensky import query_opensky_api
 from cron_airlabs import query_airlabs_api
+from flights_matcher import match_flights, format_match_stats
+from opensky_latest import update_latest
+from opensky_storage import OpenskyStorage
+from indexes_mongodb import ensure_indexes, get_daily_indexes
+from dates_mongodb import migrate_dates
+from bson import ObjectId
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -13,6 +19,8 @@ MONGO_DATABASE = os.environ.get("MONGO_INITDB_DATABASE")
 MONGO_COL_STATS = os.environ.get("MONGO_COL_DATA_AGGREGATED")
 MONGO_COL_OPENSKY = os.environ.get("MONGO_COL_OPENSKY")
 MONGO_COL_AIRLABS = os.environ.get("MONGO_COL_AIRLABS")
+MONGO_COL_OPENSKY_LATEST = os.environ.get("MONGO_COL_OPENSKY_LATEST", "opensky_latest")
+OPENSKY_STORAGE_LAYOUT = os.environ.get("OPENSKY_STORAGE_LAYOUT", "single")
 
 def init_data():
 
@@ -20,6 +28,11 @@ def init_data():
     client = connect_mongodb()
     db = client[MONGO_DATABASE]
 
+    # Index des collections (manifest des index, idempotent)
+    report = ensure_indexes(db)
+    for collection_name, result in report.items():
+        print(f"Index de la collection {collection_name} : {len(result['created'])} créés, {len(result['dropped'])} supprimés")
+
     # Test statistics_data
     # --------------------
 
@@ -51,41 +64,56 @@ def init_data():
     # ---------------------------------
 
     # opensky_data
-    collection_opensky = db[MONGO_COL_OPENSKY]
+    opensky_storage = OpenskyStorage(db, MONGO_COL_OPENSKY, OPENSKY_STORAGE_LAYOUT, get_daily_indexes(MONGO_COL_OPENSKY))
     collection_airlabs = db[MONGO_COL_AIRLABS]
+    collection_latest = db[MONGO_COL_OPENSKY_LATEST]
 
-    if collection_opensky.find_one() is None or collection_airlabs.find_one() is None:
+    if opensky_storage.is_empty() or collection_airlabs.find_one() is None:
         print(f"Au moins une des collections openSky ou Airlabs est vide")
-        collection_opensky.delete_many({})
+        opensky_storage.delete_many({})
         collection_airlabs.delete_many({})
+        collection_latest.delete_many({})
 
         # Appel opensky
         opensky_data = query_opensky_api()
-        callsigns_opensky = list(set([dic['callsign'] for dic in opensky_data]))
 
         # Appel airlabs
         airlabs_data = query_airlabs_api()
-        callsigns_airlabs = list(set([dic['flight_icao'] for dic in airlabs_data if dic['flight_icao'] != "" and dic['flight_icao'] is not None]))
-
-        # On ne garde que les callsigns communs aux deux listes
-        callsigns = list(set(callsigns_opensky) & set(callsigns_airlabs))
 
-        data_opensky = [dic for dic in opensky_data if dic['callsign'] in callsigns]
-        data_airlabs = [dic for dic in airlabs_data if dic['flight_icao'] in callsigns]
+        # On ne garde que les callsigns communs aux deux appels
+        matches, stats = match_flights(opensky_data, airlabs_data)
+        print(f"Rapprochement : {format_match_stats(stats)}")
 
+        coll_airlabs = []
         coll_opensky = []
-        for callsign in callsigns:
-            match_airlabs = [dic for dic in data_airlabs if dic['flight_icao'] == callsign][0]
-            match_copy = match_airlabs.copy()
-            airlabs_id = collection_airlabs.insert_one(match_copy).inserted_id
-
-            match_opensky = [dic for dic in data_opensky if dic['callsign'] == callsign][0]
-            match_copy = match_opensky.copy()
-            match_copy['airlabs_id'] = airlabs_id
-            coll_opensky.append(match_copy)
-        
-        collection_opensky.insert_many(coll_opensky)
+        latest_matches = {}
+        for opensky_doc, airlabs_doc in matches:
+            airlabs_copy = airlabs_doc.copy()
+            airlabs_copy['_id'] = ObjectId()
+            coll_airlabs.append(airlabs_copy)
+
+            opensky_copy = opensky_doc.copy()
+            opensky_copy['airlabs_id'] = airlabs_copy['_id']
+            coll_opensky.append(opensky_copy)
+
+            latest_matches[opensky_copy['callsign']] = {
+                'airlabs_id': airlabs_copy['_id'],
+                'airlabs_doc': airlabs_doc.copy()
+            }
+
+        if len(coll_opensky) > 0:
+            collection_airlabs.insert_many(coll_airlabs, ordered=False)
+            opensky_storage.insert_many(coll_opensky)
         print(f"{len(coll_opensky)} documents insérés dans les collections OpenSky et Airlabs")
+
+        # Etat courant des vols (un document par callsign)
+        nb_latest, _ = update_latest(collection_latest, coll_opensky, latest_matches)
+        print(f"{nb_latest} documents insérés dans la collection {MONGO_COL_OPENSKY_LATEST}")
+
+    # Dates BSON des documents insérés (rétention par index TTL)
+    report = migrate_dates(db)
+    for collection_name, nb_documents in report.items():
+        print(f"{nb_documents} documents datés dans la collection {collection_name}")
     
     
     # Fermer la connexion à MongoDB
@@ -0,0 +1,30 @@
+#!/usr/bin/python3
+from connection_mongodb import get_connection as connexion_mongodb
+from dates_mongodb import migrate_dates
+from indexes_mongodb import ensure_indexes
+import os
+
+
+# CREDENTIALS
+MONGO_DATABASE = os.environ.get("MONGO_INITDB_DATABASE")
+
+def migrate_data():
+    """
+    Renseigne les dates BSON des documents existants puis crée les index TTL de rétention
+        Les documents de plus de MONGO_RETENTION_DAYS jours sont ensuite supprimés par MongoDB
+    """
+    # Se connecter à MongoDB
+    client = connexion_mongodb()
+    db = client[MONGO_DATABASE]
+
+    report = migrate_dates(db)
+    for collection_name, nb_documents in report.items():
+        print(f"{nb_documents} documents datés dans la collection {collection_name}")
+
+    report = ensure_indexes(db, drop_unknown=False)
+    for collection_name, result in report.items():
+        if result['created']:
+            print(f"Index créés dans la collection {collection_name} : {', '.join(result['created'])}")
+
+    # Fermeture de la connexion à MongoDB
+    client.close()
@@ -0,0 +1,110 @@
+from pymongo import ReplaceOne, UpdateOne
+
+
+def load_latest_state(collection_latest):
+    """
+    Charge l'état courant des vols en une seule requête (un document par callsign)
+        - correspondances Airlabs des vols rapprochés
+        - dernières positions historisées (comparées aux nouvelles positions par filter_unchanged_positions)
+    Args:
+        collection_latest (Collection): Collection de l'état courant des vols (opensky_latest)
+    Returns:
+        tuple: (dict callsign -> {'airlabs_id', 'airlabs_doc'} des vols rapprochés,
+            dict callsign -> {'time_position', 'latitude', 'longitude'} de la dernière position historisée)
+    """
+    cursor = collection_latest.find(
+        {},
+        {"_id": 0, "callsign": 1, "airlabs_id": 1, "airlabs_doc": 1, "stored_position": 1}
+    )
+    latest_matches = {}
+    stored_positions = {}
+    for doc in cursor:
+        if doc.get("airlabs_id") is not None:
+            latest_matches[doc["callsign"]] = {key: doc.get(key) for key in ["callsign", "airlabs_id", "airlabs_doc"]}
+        if doc.get("stored_position") is not None:
+            stored_positions[doc["callsign"]] = doc["stored_position"]
+    return latest_matches, stored_positions
+
+
+def get_position(opensky_doc):
+    """ Position d'un document OpenSky comparée d'un appel à l'autre (time_position, latitude, longitude) """
+    return {field: opensky_doc.get(field) for field in ["time_position", "latitude", "longitude"]}
+
+
+def build_latest_document(opensky_doc, latest_match=None, stored_position=None):
+    """
+    Construit le document de l'état courant d'un vol
+        (dernière position OpenSky + données Airlabs dénormalisées + dernière position historisée)
+    Args:
+        opensky_doc (dict): Document OpenSky du dernier appel API
+        latest_match (dict, optional): Correspondance Airlabs de l'état courant précédent
+        stored_position (dict, optional): Dernière position historisée du vol (None si aucune)
+    Returns:
+        dict: Document de la collection opensky_latest
+    """
+    latest_doc = {key: value for key, value in opensky_doc.items() if key != "_id"}
+    latest_doc["stored_position"] = stored_position
+    if latest_match is not None:
+        latest_doc["airlabs_id"] = latest_match.get("airlabs_id")
+        latest_doc["airlabs_doc"] = latest_match.get("airlabs_doc")
+    else:
+        latest_doc.setdefault("airlabs_id", None)
+        latest_doc.setdefault("airlabs_doc", None)
+    return latest_doc
+
+
+def update_latest(collection_latest, opensky_data, latest_matches, batch_size=1000, stored_positions=None):
+    """
+    Met à jour l'état courant des vols après un appel OpenSky
+        - un document par callsign, remplacé (upsert) par la position du dernier appel
+        - dernière position historisée conservée à part (stored_position)
+        - suppression des callsigns absents du dernier appel
+    Args:
+        collection_latest (Collection): Collection de l'état courant des vols (opensky_latest)
+        opensky_data (array): Documents OpenSky du dernier appel API (même 'time')
+        latest_matches (dict): Correspondances renvoyées par load_latest_state
+        batch_size (int, optional): Nb d'opérations par lot (1000 par défaut)
+        stored_positions (dict, optional): Dernières positions historisées renvoyées par get_stored_positions
+            (None : toutes les positions du dernier appel sont historisées)
+    Returns:
+        tuple: (nb de vols mis à jour, nb de vols supprimés)
+    """
+    if len(opensky_data) == 0:
+        return 0, 0
+
+    # Un seul document par callsign (le dernier rencontré est conservé)
+    latest_docs = {}
+    for opensky_doc in opensky_data:
+        callsign = opensky_doc["callsign"]
+        stored_position = get_position(opensky_doc) if stored_positions is None else stored_positions.get(callsign)
+        latest_docs[callsign] = build_latest_document(opensky_doc, latest_matches.get(callsign), stored_position)
+
+    operations = [ReplaceOne({"callsign": callsign}, latest_doc, upsert=True) for callsign, latest_doc in latest_docs.items()]
+    for i in range(0, len(operations), batch_size):
+        collection_latest.bulk_write(operations[i:i + batch_size], ordered=False)
+
+    # Les vols absents du dernier appel ne font plus partie de l'état courant
+    run_time = opensky_data[0]["time"]
+    deleted = collection_latest.delete_many({"time": {"$ne": run_time}}).deleted_count
+
+    return len(operations), deleted
+
+
+def build_latest_reconciliation_operations(airlabs_docs_by_callsign):
+    """
+    Construit les mises à jour de l'état courant après rapprochement avec Airlabs
+    Args:
+        airlabs_docs_by_callsign (dict): Dict callsign -> document Airlabs inséré (avec _id)
+    Returns:
+        array: Liste des opérations UpdateOne de la collection opensky_latest
+    """
+    operations = []
+    for callsign, airlabs_doc in airlabs_docs_by_callsign.items():
+        operations.append(UpdateOne(
+            {"callsign": callsign, "airlabs_id": None},
+            {"$set": {
+                "airlabs_id": airlabs_doc["_id"],
+                "airlabs_doc": {key: value for key, value in airlabs_doc.items() if key != "_id"}
+            }}
+        ))
+    return operations
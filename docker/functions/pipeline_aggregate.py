@@ -1,82 +1,40 @@
 #!/usr/bin/python3
-from datetime import datetime, timedelta
-import sys
 from connection_mongodb import get_connection as connexion_mongodb
-from pathlib import Path
-from pprint import pprint
+from connection_mysql import get_connection as connexion_mysql
+from reference_enrichment import load_references
+from aggregation_pipeline import aggregate, format_aggregation_stats
+from opensky_storage import OpenskyStorage
 import os
 
 
 # CREDENTIALS
-KEY_AIRLABS_API = os.environ.get("KEY_AIRLABS_API")
 MONGO_DATABASE = os.environ.get("MONGO_INITDB_DATABASE")
 MONGO_COL_OPENSKY = os.environ.get("MONGO_COL_OPENSKY")
 MONGO_COL_AIRLABS = os.environ.get("MONGO_COL_AIRLABS")
-
-def aggregate_data():
+MONGO_COL_METADATA = os.environ.get("MONGO_COL_METADATA", "metadata")
+OPENSKY_STORAGE_LAYOUT = os.environ.get("OPENSKY_STORAGE_LAYOUT", "single")
+MONGO_BULK_BATCH_SIZE = int(os.environ.get("MONGO_BULK_BATCH_SIZE", 1000))
+
+def aggregate_data(full=False):
+    """
+    Agrège les documents OpenSky dans la collection data_aggregated
+    Args:
+        full (bool, optional): Recalcul complet au lieu des seuls documents postérieurs au watermark (False par défaut)
+    """
     # Se connecter à MongoDB
     client = connexion_mongodb()
     db = client[MONGO_DATABASE]
 
-    opensky = db[MONGO_COL_OPENSKY]
-
-    # Pipeline d'aggregation des données
-    pipeline = [
-        {"$match": {"on_ground": False}},
-        { "$project": {
-            "airlabs_id": 1,
-            "time": 1,
-            "datatime": 1,
-            "callsign": 1,
-        }},
-        { "$sort":{ "airlabs_id" : 1} },
-        { "$group": {
-                "_id": "$airlabs_id",
-                "callsign": { "$first": "$callsign" },
-                "time_start": { "$first" : "$time" },
-                "datetime_start": { "$first" : "$datatime" },
-                "time_end": { "$last" : "$time" },
-                "datetime_end": { "$last" : "$datatime" },
-                "count": { "$sum": 1}
-            }
-        },
-        {"$lookup": {
-            "from": "airlabs",
-            "localField": "_id",
-            "foreignField": "_id",
-            "as": "airlabs_doc"
-        }},
-        {"$unwind": "$airlabs_doc"},
-        { "$project": {
-            "airlabs_id": 1,
-            "callsign": 1,
-            "time_start": 1,
-            "datetime_start": 1,
-            "time_end": 1,
-            "datetime_end": 1,
-            "count": 1,
-            "airline_iata": "$airlabs_doc.airline_iata",
-            "airline_number": "$airlabs_doc.flight_number",
-            "arr_iata": "$airlabs_doc.arr_iata",
-            "arr_icao": "$airlabs_doc.arr_icao",
-            "dep_iata": "$airlabs_doc.dep_iata",
-            "dep_icao": "$airlabs_doc.dep_icao",
-            "aircraft_flag": "$airlabs_doc.flag",
-            "aircraft_reg_number": "$airlabs_doc.reg_number",
-            "aircraft_icao": "$airlabs_doc.aircraft_icao",
-        }}
-    ]
-
-    results = opensky.aggregate(pipeline)
+    # Chargement des tables de référence MySQL (sans MySQL, les documents sont enrichis à la lecture)
+    try:
+        references = load_references(connexion_mysql())
+    except Exception as ex:
+        print(f"\nErreur de chargement des tables de référence, documents non enrichis : \n{ex}\n")
+        references = None
 
-    # Insertion des résultats de la pipeline dans la collection data_aggregated
-    data_aggregated = db["data_aggregated"]
-    for result in results:
-        data_aggregated.replace_one(
-            {"_id": result["_id"]},
-            result,
-            upsert=True
-        )
+    opensky_storage = OpenskyStorage(db, MONGO_COL_OPENSKY, OPENSKY_STORAGE_LAYOUT)
+    stats = aggregate(db, opensky_storage, MONGO_COL_AIRLABS, MONGO_COL_METADATA, references, full, MONGO_BULK_BATCH_SIZE)
+    print(f"AGGREGATE - {format_aggregation_stats(stats)}")
 
     # Fermeture de la connexion à MongoDB
     client.close()
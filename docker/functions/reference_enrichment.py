@@ -0,0 +1,101 @@
+from datetime import date, datetime
+from decimal import Decimal
+from pymongo import UpdateOne
+from sqlalchemy import text
+
+
+# Tables de référence dénormalisées dans data_aggregated : table MySQL -> clé de jointure
+REFERENCE_KEYS = {
+    'aircrafts': 'aircraft_icao',
+    'airlines': 'airline_iata',
+    'view_airports': 'airport_iata',
+}
+
+
+def to_bson_value(value):
+    """ Convertit une valeur MySQL en valeur stockable par MongoDB (Decimal, date) """
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def load_references(engine):
+    """
+    Charge les tables de référence MySQL utilisées pour enrichir les données agrégées
+    Args:
+        engine (Engine): Engine sqlalchemy de la base MySQL
+    Returns:
+        dict: Dict table -> (colonnes, index {clé de jointure: ligne})
+    """
+    references = {}
+    with engine.connect() as conn:
+        for table, key in REFERENCE_KEYS.items():
+            query = conn.execute(text(f'SELECT * FROM {table};'))
+            columns = list(query.keys())
+            index = {}
+            for row in query.fetchall():
+                row = {column: to_bson_value(value) for column, value in zip(columns, row)}
+                # Comme la jointure de l'appli Dash : la première ligne rencontrée est conservée
+                if row[key] is not None and row[key] not in index:
+                    index[row[key]] = row
+            references[table] = (columns, index)
+    return references
+
+
+def get_reference_fields(document, references):
+    """
+    Construit les champs de référence d'un document agrégé
+        (mêmes colonnes que la jointure get_sql_data de l'appli Dash :
+        aéronef, compagnie, aéroports de départ et d'arrivée préfixés dep_ / arr_)
+    Args:
+        document (dict): Document de la collection data_aggregated
+        references (dict): Tables de référence renvoyées par load_references
+    Returns:
+        dict: Champs de référence (None si absents des tables de référence)
+    """
+    fields = {}
+    for table, mongo_key in [('aircrafts', 'aircraft_icao'), ('airlines', 'airline_iata')]:
+        columns, index = references[table]
+        row = index.get(document.get(mongo_key), {})
+        for column in columns:
+            if column != REFERENCE_KEYS[table]:
+                fields[column] = row.get(column)
+
+    columns, index = references['view_airports']
+    for mongo_key in ['dep_iata', 'arr_iata']:
+        prefix = mongo_key.split('_')[0]
+        row = index.get(document.get(mongo_key), {})
+        for column in columns:
+            if column != REFERENCE_KEYS['view_airports']:
+                fields[f"{prefix}_{column}"] = row.get(column)
+
+    fields['reference_enriched'] = True
+    return fields
+
+
+def backfill_reference_fields(collection, references, all_documents=False, batch_size=1000):
+    """
+    Enrichit les documents existants de la collection data_aggregated
+    Args:
+        collection (Collection): Collection data_aggregated
+        references (dict): Tables de référence renvoyées par load_references
+        all_documents (bool, optional): Enrichir aussi les documents déjà enrichis (False par défaut)
+        batch_size (int, optional): Nb d'opérations par lot (1000 par défaut)
+    Returns:
+        int: Nb de documents enrichis
+    """
+    query = {} if all_documents else {"reference_enriched": {"$ne": True}}
+    projection = {"aircraft_icao": 1, "airline_iata": 1, "dep_iata": 1, "arr_iata": 1}
+
+    nb_documents = 0
+    operations = []
+    for document in collection.find(query, projection):
+        operations.append(UpdateOne({"_id": document["_id"]}, {"$set": get_reference_fields(document, references)}))
+        if len(operations) == batch_size:
+            nb_documents += collection.bulk_write(operations, ordered=False).matched_count
+            operations = []
+    if len(operations) > 0:
+        nb_documents += collection.bulk_write(operations, ordered=False).matched_count
+    return nb_documents
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 import pytz
 
 def convert_time_unix_utc_to_datetime_fr(time_unix_utc):
@@ -16,3 +16,15 @@ def convert_time_unix_utc_to_datetime_fr(time_unix_utc):
     datetime_fr = local_datetime.strftime('%Y-%m-%d %H:%M:%S')
 
     return datetime_fr
+
+
+def convert_time_unix_to_date(time_unix_utc):
+    """
+    Convertit un timestamp Unix en datetime UTC (enregistré par MongoDB en type Date)
+        Champ utilisé par les index TTL de rétention des données
+    Args:
+        time_unix_utc (int): Timestamp Unix
+    Returns:
+        datetime: Datetime UTC
+    """
+    return datetime.fromtimestamp(time_unix_utc, timezone.utc)
@@ -1,19 +1,26 @@
+// Création des collections uniquement : les index (dont les index TTL de rétention, MONGO_RETENTION_DAYS)
+// sont créés par le DAG d'initialisation à partir du manifest des index (functions/indexes_mongodb.py)
+
 // Connexion à la base de données
 var db = db.getSiblingDB('liveAirlines');
 
 // Création collection AirL
 db.createCollection("airlabs");
-const airlabs = db.getCollection("airlabs");
-airlabs.createIndex({ time: -1, flight_icao: 1 });
-airlabs.createIndex({ flight_icao: 1 });
 
 // Création collection Opensky
 db.createCollection("opensky");
-const opensky = db.getCollection("opensky");
-opensky.createIndex({ time: -1, airlab_id: 1 });
-opensky.createIndex({ callsign: 1 });
-opensky.createIndex({ airlab_id: 1 });
 
+// Création collection opensky_buckets (stockage OpenSky 'bucket', OPENSKY_STORAGE_LAYOUT)
+db.createCollection("opensky_buckets");
+
+// Création collection opensky_latest (état courant des vols, un document par callsign)
+db.createCollection("opensky_latest");
+
+// Création collection opensky_unmatched (cache négatif des callsigns non rapprochés par Airlabs)
+db.createCollection("opensky_unmatched");
+
+// Création collection ingestion_runs (rapports des runs d'ingestion OpenSky)
+db.createCollection("ingestion_runs");
 
 // Création collection data_aggregated
 db.createCollection("data_aggregated");
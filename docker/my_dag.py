@@ -16,9 +16,10 @@ sys.path.append(functions_dir)
 
 from cron_airlabs import lauch_script as mongo_airlabs
 from cron_opensky import lauch_script as mongo_opensky
-from clean_mongodb import clean_data as clean_mongo
+from migrate_dates import migrate_data as migrate_dates_mongo
 from pipeline_aggregate import aggregate_data as aggregate_mongo
 from init_mongo import init_data as init_mongo_data
+from backfill_reference_enrichment import backfill_data as backfill_reference
 
 start_date = datetime.utcnow()
 
@@ -88,28 +89,61 @@ dag_aggregate_data = DAG(
     description='Pipeline d\'agrégration des données',
     doc_md="""## Pipeline d'agrégration des données
 
-    Appel une fois par jour ; à 1h30
+    Les agrégats par vol sont mis à jour à chaque appel OpenSky ($min / $max / $inc).
+    Réconciliation incrémentale toutes les 10 minutes :
+    * vols ayant des documents OpenSky postérieurs au watermark et antérieurs au dernier appel Airlabs
+    * recalcul exact de ces vols et fusion dans data_aggregated par MongoDB ($merge)
+
+    Recalcul complet : déclenchement manuel avec la configuration {"full": true}
     """,
     tags=['projet', 'datascientest', 'data_aggregated'],
-    schedule_interval='22 1 * * *',
+    schedule_interval='*/10 * * * *',
     default_args={
         'owner': 'airflow',
         'start_date': days_ago(0)
     },
+    # Un seul run à la fois : deux runs sur le même watermark compteraient deux fois les mêmes documents
+    max_active_runs=1,
     catchup=False
 )
 
-dag_clean_data = DAG(
-    dag_id='dag_clean_data',
-    description='Suppression des données de plus de 7 jours',
-    doc_md="""## Suppression des anciennes données
+dag_migrate_dates = DAG(
+    dag_id='dag_migrate_dates',
+    description='Migration des documents existants vers les dates BSON',
+    doc_md="""## Migration des documents existants vers les dates BSON
 
-    * Durée de rétention des data de 7 jours
+    La rétention des données (MONGO_RETENTION_DAYS, 7 jours par défaut) est assurée
+    par les index TTL de MongoDB sur les champs time_date (OpenSky, Airlabs)
+    et time_start_date (data_aggregated)
 
-    Appel une fois par jour ; à 2h30
+    Déclenchement manuel uniquement, une fois sur une base créée avant l'ajout de ces champs :
+    * dates BSON des documents existants
+    * création des index TTL
     """,
     tags=['projet', 'datascientest', 'data_cleaned'],
-    schedule_interval='22 0 * * *',
+    schedule_interval=None,
+    default_args={
+        'owner': 'airflow',
+        'start_date': days_ago(0)
+    },
+    catchup=False
+)
+
+
+dag_backfill_reference = DAG(
+    dag_id='dag_backfill_reference',
+    description='Enrichissement des données agrégées existantes',
+    doc_md="""## Enrichissement des données agrégées existantes
+
+    Ajout des données des tables de référence MySQL (aéronef, compagnie, aéroports)
+    aux documents de la collection data_aggregated
+
+    Déclenchement manuel uniquement :
+    * sans configuration : documents pas encore enrichis
+    * configuration {"all": true} : tous les documents (après modification des tables de référence)
+    """,
+    tags=['projet', 'datascientest', 'data_aggregated'],
+    schedule_interval=None,
     default_args={
         'owner': 'airflow',
         'start_date': days_ago(0)
@@ -134,17 +168,19 @@ def mongo_airlabs_task():
         initialization_data()
     mongo_airlabs()
 
-def clean_mongo_task():
-    test = Variable.get("init_data", None)
-    if test is None:
-        initialization_data()
-    clean_mongo()
+def migrate_dates_task():
+    migrate_dates_mongo()
 
-def aggregate_mongo_task():
+def aggregate_mongo_task(**context):
     test = Variable.get("init_data", None)
     if test is None:
         initialization_data()
-    aggregate_mongo()
+    conf = context['dag_run'].conf or {}
+    aggregate_mongo(full=bool(conf.get('full', False)))
+
+def backfill_reference_task(**context):
+    conf = context['dag_run'].conf or {}
+    backfill_reference(all_documents=bool(conf.get('all', False)))
 
 
 
@@ -196,15 +232,24 @@ task_aggregate = PythonOperator(
     dag=dag_aggregate_data
 )
 
-# DAG CLEAN - Tâche 1 : Suppression des anciennes données
-task_clean = PythonOperator(
-    task_id='task_clean',
-    python_callable=clean_mongo_task,
+# DAG MIGRATE - Tâche 1 : Dates BSON des documents existants et index TTL
+task_migrate_dates = PythonOperator(
+    task_id='task_migrate_dates',
+    python_callable=migrate_dates_task,
     retries=3,
     retry_delay=timedelta(seconds=10),
-    doc = '''Suppression des anciennes données''',
+    doc = '''Dates BSON des documents existants et index TTL''',
     pool_slots=1,
-    dag=dag_clean_data
+    dag=dag_migrate_dates
 )
 
-
+# DAG BACKFILL - Tâche 1 : Enrichissement des données agrégées existantes
+task_backfill_reference = PythonOperator(
+    task_id='task_backfill_reference',
+    python_callable=backfill_reference_task,
+    retries=3,
+    retry_delay=timedelta(seconds=10),
+    doc = '''Enrichissement des données agrégées existantes''',
+    pool_slots=1,
+    dag=dag_backfill_reference
+)
@@ -0,0 +1,35 @@
+import sys
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+load_dotenv()
+
+# Ajout du path du projet
+parent_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(f"{parent_dir}/connect_database")
+
+# Importer le fichier de connexion à MongoDB
+from connection_mongodb import get_connection
+
+# Importer le manifest des index MongoDB
+from indexes_mongodb import ensure_indexes
+
+# Application du manifest des index sur la base existante (idempotent)
+#   python ensure_indexes.py             : création des index manquants, suppression des index hors manifest
+#   python ensure_indexes.py --keep      : création des index manquants uniquement
+
+# Credentials
+MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME")
+
+drop_unknown = "--keep" not in sys.argv[1:]
+
+client = get_connection()
+db = client[MONGO_DB_NAME]
+
+report = ensure_indexes(db, drop_unknown=drop_unknown)
+for collection_name, result in report.items():
+    print(f"Collection {collection_name} :")
+    print(f" - index créés : {', '.join(result['created']) if result['created'] else 'aucun'}")
+    print(f" - index supprimés : {', '.join(result['dropped']) if result['dropped'] else 'aucun'}")
+
+client.close()
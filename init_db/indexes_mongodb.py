@@ -0,0 +1,184 @@
+import os
+import re
+from pymongo import ASCENDING as asc
+from pymongo import DESCENDING as desc
+from dotenv import load_dotenv
+load_dotenv()
+
+
+# Credentials
+MONGO_COL_OPENSKY = os.environ.get("MONGO_COL_OPENSKY", "opensky")
+MONGO_COL_AIRLABS = os.environ.get("MONGO_COL_AIRLABS", "airlabs")
+MONGO_COL_OPENSKY_LATEST = os.environ.get("MONGO_COL_OPENSKY_LATEST", "opensky_latest")
+MONGO_COL_OPENSKY_UNMATCHED = os.environ.get("MONGO_COL_OPENSKY_UNMATCHED", "opensky_unmatched")
+# Documents OpenSky regroupés par (callsign, heure, airlabs_id) (stockage OpenSky 'bucket')
+MONGO_COL_OPENSKY_BUCKETS = f"{MONGO_COL_OPENSKY}_buckets"
+MONGO_COL_DATA_AGGREGATED = os.environ.get("MONGO_COL_DATA_AGGREGATED", "data_aggregated")
+MONGO_COL_INGESTION_RUNS = os.environ.get("MONGO_COL_INGESTION_RUNS", "ingestion_runs")
+
+# Durée de rétention des données (index TTL sur les dates BSON)
+MONGO_RETENTION_SECONDS = int(os.environ.get("MONGO_RETENTION_DAYS", 7)) * 86400
+
+# Manifest des index MongoDB : collection -> liste de (clés, options)
+#   Toute requête fréquente doit être servie par un de ces index
+#   (vérification : appli_dash/tests/run_tests_indexes.py)
+INDEX_MANIFEST = {
+    MONGO_COL_OPENSKY: [
+        # Fenêtres de temps (réconciliation des agrégats, rétention)
+        ([("time", desc), ("airlabs_id", asc)], {}),
+        # Positions du jour d'un vol, rapprochement Airlabs par callsign
+        ([("callsign", asc), ("time", asc)], {}),
+        # Recalcul des agrégats d'un vol, suppression des documents non rapprochés
+        ([("airlabs_id", asc), ("time", asc)], {}),
+        # Documents non rapprochés uniquement (index partiel) : rapprochement Airlabs par callsign,
+        # suppression des documents restés sans airlabs_id
+        ([("airlabs_id", asc), ("callsign", asc)], {"partialFilterExpression": {"airlabs_id": {"$type": "null"}}}),
+        # Rétention
+        ([("time_date", asc)], {"expireAfterSeconds": MONGO_RETENTION_SECONDS}),
+    ],
+    MONGO_COL_OPENSKY_BUCKETS: [
+        # Ajout des positions d'un appel OpenSky (upsert)
+        ([("callsign", asc), ("hour", asc), ("airlabs_id", asc)], {}),
+        # Positions du jour d'un vol
+        ([("callsign", asc), ("time_end", asc)], {}),
+        # Recalcul des agrégats d'un vol
+        ([("airlabs_id", asc), ("time_start", asc)], {}),
+        # Fenêtres de temps (réconciliation des agrégats)
+        ([("time_end", asc)], {}),
+        # Documents non rapprochés uniquement (index partiel)
+        ([("airlabs_id", asc), ("callsign", asc)], {"partialFilterExpression": {"airlabs_id": {"$type": "null"}}}),
+        # Rétention
+        ([("time_date", asc)], {"expireAfterSeconds": MONGO_RETENTION_SECONDS}),
+    ],
+    MONGO_COL_AIRLABS: [
+        # Dernier appel Airlabs
+        ([("time", desc), ("flight_icao", asc)], {}),
+        ([("flight_icao", asc)], {}),
+        # Rétention
+        ([("time_date", asc)], {"expireAfterSeconds": MONGO_RETENTION_SECONDS}),
+    ],
+    MONGO_COL_OPENSKY_LATEST: [
+        # Un document par callsign
+        ([("callsign", asc)], {"unique": True}),
+        # Dernier appel OpenSky, suppression des vols absents du dernier appel
+        ([("time", asc)], {}),
+        # Vols rapprochés / non rapprochés
+        ([("airlabs_id", asc)], {}),
+        # Filtres de /api/v1/flights
+        ([("airlabs_doc.airline_iata", asc)], {}),
+        ([("airlabs_doc.dep_iata", asc)], {}),
+        ([("airlabs_doc.arr_iata", asc)], {}),
+    ],
+    MONGO_COL_OPENSKY_UNMATCHED: [
+        # Cache négatif des callsigns non rapprochés : suppression à la date d'expiration
+        ([("expires_at", asc)], {"expireAfterSeconds": 0}),
+    ],
+    MONGO_COL_INGESTION_RUNS: [
+        # Rapports des runs d'ingestion OpenSky (rétention)
+        ([("time_date", asc)], {"expireAfterSeconds": MONGO_RETENTION_SECONDS}),
+    ],
+    MONGO_COL_DATA_AGGREGATED: [
+        # Bornes temporelles des données statistiques
+        ([("time_start", asc)], {}),
+        ([("time_end", asc)], {}),
+        # Filtres de /api/v1/statistic_data et aéroports les plus desservis (Map Stat)
+        ([("callsign", asc), ("time_start", asc)], {}),
+        ([("dep_iata", asc), ("time_start", asc)], {}),
+        ([("arr_iata", asc), ("time_start", asc)], {}),
+        ([("airline_iata", asc), ("time_start", asc)], {}),
+        ([("aircraft_icao", asc), ("time_start", asc)], {}),
+        # Documents à enrichir par les tables de référence
+        ([("reference_enriched", asc)], {}),
+        # Rétention (date de début du vol)
+        ([("time_start_date", asc)], {"expireAfterSeconds": MONGO_RETENTION_SECONDS}),
+    ],
+}
+
+
+def get_index_name(keys):
+    """ Nom par défaut MongoDB d'un index (ex : callsign_1_time_1) """
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+# Options comparées entre un index existant et sa définition dans le manifest
+INDEX_OPTIONS = {"unique": False, "expireAfterSeconds": None, "partialFilterExpression": None}
+
+
+def is_same_index(info, keys, options):
+    """ Vérifie qu'un index existant (index_information) correspond à sa définition """
+    if list(info["key"]) != list(keys):
+        return False
+    return all(info.get(option, default) == options.get(option, default) for option, default in INDEX_OPTIONS.items())
+
+
+def get_daily_indexes(collection_name):
+    """
+    Index des collections journalières d'une collection (<collection>_YYYYMMDD, stockage OpenSky 'daily') :
+    index du manifest de la collection, hors index TTL (rétention par suppression des collections)
+    Args:
+        collection_name (str): Nom de la collection du manifest
+    Returns:
+        array: Liste de (clés, options)
+    """
+    return [(keys, options) for keys, options in INDEX_MANIFEST.get(collection_name, []) if "expireAfterSeconds" not in options]
+
+
+def get_manifest_collections(db):
+    """
+    Collections auxquelles s'applique le manifest des index
+        Les collections journalières (<collection>_YYYYMMDD, stockage OpenSky 'daily') reçoivent
+        les index de leur collection, hors index TTL (rétention par suppression des collections)
+    Args:
+        db (Database): Base de données MongoDB
+    Returns:
+        dict: Dict nom de collection -> liste de (clés, options)
+    """
+    collection_names = db.list_collection_names()
+    collections = dict(INDEX_MANIFEST)
+    for collection_name in INDEX_MANIFEST:
+        pattern = re.compile(rf"^{re.escape(collection_name)}_\d{{8}}$")
+        for name in collection_names:
+            if pattern.match(name):
+                collections[name] = get_daily_indexes(collection_name)
+    return collections
+
+
+def ensure_indexes(db, drop_unknown=True):
+    """
+    Applique le manifest des index (idempotent)
+        - création des index absents
+        - suppression des index absents du manifest (drop_unknown), hors _id_
+    Args:
+        db (Database): Base de données MongoDB
+        drop_unknown (bool, optional): Supprimer les index absents du manifest (True par défaut)
+    Returns:
+        dict: Dict collection -> {'created': [...], 'dropped': [...]}
+    """
+    report = {}
+    collection_names = db.list_collection_names()
+    for collection_name, indexes in get_manifest_collections(db).items():
+        collection = db[collection_name]
+        existing = collection.index_information() if collection_name in collection_names else {}
+        expected = {get_index_name(keys): (keys, options) for keys, options in indexes}
+        created = []
+        dropped = []
+
+        # Index existants absents du manifest, ou de même nom mais de définition différente
+        for name, info in existing.items():
+            if name == "_id_":
+                continue
+            if name in expected:
+                if is_same_index(info, *expected[name]):
+                    continue
+            elif not drop_unknown:
+                continue
+            collection.drop_index(name)
+            dropped.append(name)
+
+        for name, (keys, options) in expected.items():
+            if name not in existing or name in dropped:
+                collection.create_index(keys, name=name, **options)
+                created.append(name)
+
+        report[collection_name] = {'created': created, 'dropped': dropped}
+    return report
@@ -1,8 +1,6 @@
 import sys
 import os
 from pathlib import Path
-from pymongo import ASCENDING as asc
-from pymongo import DESCENDING as desc
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -13,6 +11,9 @@ sys.path.append(f"{parent_dir}/connect_database")
 # Importer le fichier de connexion à MongoDB
 from connection_mongodb import get_connection
 
+# Importer le manifest des index MongoDB
+from indexes_mongodb import ensure_indexes
+
 # Ajout du path des appels API
 sys.path.append(f"{parent_dir}/live_api")
 # Importer la fonction d'appel à l'API airlabs
@@ -68,14 +69,10 @@ def create_db(db_name):
     opensky_collection = db[MONGO_COL_OPENSKY]
     airlabs_collection = db[MONGO_COL_AIRLABS]
 
-    # Créer les index de la collection OpenSky
-    opensky_collection.create_index([("time", desc), ("airlab_id", asc)])
-    opensky_collection.create_index("callsign")
-    opensky_collection.create_index("airlab_id")
-
-    # Créer les index de la collection AirLabs
-    airlabs_collection.create_index([("time", desc), ("flight_icao", asc)])
-    airlabs_collection.create_index("flight_icao")
+    # Créer les index des collections (manifest des index)
+    report = ensure_indexes(db)
+    for collection_name, result in report.items():
+        print(f"Index de la collection {collection_name} : {len(result['created'])} créés")
 
     for collection in [opensky_collection, airlabs_collection]:
         print(f"\nTest CRUD sur la collection {collection}")
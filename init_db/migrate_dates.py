@@ -0,0 +1,37 @@
+import sys
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+load_dotenv()
+
+# Ajout du path du projet
+parent_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(f"{parent_dir}/connect_database")
+
+# Importer le fichier de connexion à MongoDB
+from connection_mongodb import get_connection
+
+# Importer la migration des dates et le manifest des index MongoDB
+from dates_mongodb import migrate_dates
+from indexes_mongodb import ensure_indexes
+
+# Migration des documents existants vers les dates BSON (idempotent)
+#   python migrate_dates.py : dates BSON des documents existants, puis création des index TTL de rétention
+#   Les documents de plus de MONGO_RETENTION_DAYS jours sont ensuite supprimés par MongoDB
+
+# Credentials
+MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME")
+
+client = get_connection()
+db = client[MONGO_DB_NAME]
+
+report = migrate_dates(db)
+for collection_name, nb_documents in report.items():
+    print(f"{nb_documents} documents datés dans la collection {collection_name}")
+
+report = ensure_indexes(db, drop_unknown=False)
+for collection_name, result in report.items():
+    if result['created']:
+        print(f"Index créés dans la collection {collection_name} : {', '.join(result['created'])}")
+
+client.close()
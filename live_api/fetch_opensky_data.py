@@ -6,7 +6,13 @@ import time
 import requests
 from requests.auth import HTTPBasicAuth
 from pathlib import Path
-from utilities_live_api import convert_time_unix_utc_to_datetime_fr
+from utilities_live_api import convert_time_unix_utc_to_datetime_fr, convert_time_unix_to_date
+from opensky_latest import load_latest_state, update_latest
+from opensky_storage import OpenskyStorage
+from unmatched_callsigns import load_unmatched_callsigns, filter_unmatched_documents
+from position_changes import filter_unchanged_positions, get_stored_positions
+from opensky_parser import parse_states
+from flight_aggregates import build_aggregate_operations, get_aggregate_days, bump_aggregation_version
 from pprint import pprint
 from dotenv import load_dotenv
 load_dotenv()
@@ -14,10 +20,14 @@ load_dotenv()
 # Ajout du path du projet
 parent_dir = str(Path(__file__).resolve().parent.parent)
 sys.path.append(f"{parent_dir}/connect_database")
+sys.path.append(f"{parent_dir}/init_db")
 
 # Importer le fichier de connexion à MongoDB
 from connection_mongodb import get_connection
 
+# Importer les index des collections OpenSky journalières (manifest des index)
+from indexes_mongodb import get_daily_indexes
+
 # CREDENTIALS
 USER_OPENSKY_API = os.environ.get("USER_OPENSKY_API")
 PASS_OPENSKY_API = os.environ.get("PASS_OPENSKY_API")
@@ -26,6 +36,27 @@ PASS_OPENSKY_API_CRONJOB = os.environ.get("PASS_OPENSKY_API_CRONJOB")
 MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME")
 MONGO_COL_OPENSKY = os.environ.get("MONGO_COL_OPENSKY")
 MONGO_COL_AIRLABS = os.environ.get("MONGO_COL_AIRLABS")
+MONGO_COL_OPENSKY_LATEST = os.environ.get("MONGO_COL_OPENSKY_LATEST", "opensky_latest")
+MONGO_COL_OPENSKY_UNMATCHED = os.environ.get("MONGO_COL_OPENSKY_UNMATCHED", "opensky_unmatched")
+MONGO_COL_DATA_AGGREGATED = os.environ.get("MONGO_COL_DATA_AGGREGATED", "data_aggregated")
+MONGO_COL_METADATA = os.environ.get("MONGO_COL_METADATA", "metadata")
+MONGO_COL_INGESTION_RUNS = os.environ.get("MONGO_COL_INGESTION_RUNS", "ingestion_runs")
+
+# Taille des lots d'écriture (bulk_write)
+MONGO_BULK_BATCH_SIZE = int(os.environ.get("MONGO_BULK_BATCH_SIZE", 1000))
+
+# Stockage des documents OpenSky ('single' : une collection, 'daily' : une collection par jour,
+# 'bucket' : un document par callsign et par heure)
+OPENSKY_STORAGE_LAYOUT = os.environ.get("OPENSKY_STORAGE_LAYOUT", "single")
+
+# Durée de rétention (en jours) des collections OpenSky journalières
+MONGO_RETENTION_DAYS = int(os.environ.get("MONGO_RETENTION_DAYS", 7))
+
+# Nb de runs Airlabs successifs sans rapprochement au-delà duquel les positions d'un callsign ne sont plus historisées
+OPENSKY_UNMATCHED_MIN_MISSES = int(os.environ.get("OPENSKY_UNMATCHED_MIN_MISSES", 3))
+
+# Seuil de déplacement (en degrés) en dessous duquel une position n'est pas historisée (négatif : désactivé)
+OPENSKY_POSITION_THRESHOLD = float(os.environ.get("OPENSKY_POSITION_THRESHOLD", 0.0001))
 
 
 def query_opensky_api(cron=False):
@@ -70,24 +101,7 @@ def query_opensky_api(cron=False):
         response_data = response.json()
         if 'states' in response_data:
             states = response_data["states"]
-            opensky_data = [{
-                "time": time_now,
-                "datatime": datetime_fr if time_now else None,
-                "airlabs_id": None,
-                "icao_24": state[0].strip().upper() if state[0] else None,
-                "callsign": state[1].strip().upper() if state[1] else None,
-                "origin_country": state[2].strip() if state[2] else None,
-                "time_position": state[3],
-                "last_contact": state[4],
-                "longitude": state[5],
-                "latitude": state[6],
-                "baro_altitude": state[7],
-                "geo_altitude": state[13],
-                "velocity": state[9],
-                "cap": state[10] if state[10] is not None else 0,
-                "vertical_rate": state[11],
-                "on_ground": state[8],
-            } for state in states if state[1] and state[5] and state[6]]
+            opensky_data = parse_states(states, time_now, datetime_fr, bbox=(pr.la_min, pr.la_max, pr.lon_min, pr.lon_max))
             return opensky_data
 
         else:
@@ -102,39 +116,106 @@ def lauch_script(init=False, cron=False):
         Principe: Vérifier dans l'enregistrement précédent la présence d'une 
             correspondance avec Airlab (Airlab_id):
                 - si oui: on ajoute cette valeur au nouveau document
+        La correspondance callsign -> airlabs_id est chargée en une seule requête
+        depuis l'état courant des vols (opensky_latest) puis appliquée en mémoire
+        L'état courant est ensuite mis à jour (un document par callsign)
+        Les agrégats par vol (data_aggregated) sont mis à jour à chaque appel
     Args:
-        init (bool, otionnal): Ne pas appliquer les traitements lors du premier
-            appel à l'API lors de la création de la base (False par défaut)
+        init (bool, otionnal): Premier appel à l'API lors de la création de la base
+            (False par défaut, l'état courant est alors vide)
         cron (bool, optional): Utilisation d'un compte API différent pour 
             le cronjob (True par défaut).
+    Returns:
+        dict: Rapport de durée (en secondes) de chaque étape du script
     """
 
+    timings = {}
+    start = time.perf_counter()
+
     # Récupération data API
     opensky_data = query_opensky_api(cron=cron)
+    timings['api'] = time.perf_counter() - start
 
     # Connexion MongoDB
     client = get_connection()
     db = client[MONGO_DB_NAME]
-    collection_opensky = db[MONGO_COL_OPENSKY]
-
-    # Ne pas appliquer lors de la création de la base de données
-    if init is False:
-
-        # Recherche du "time" le plus récent
-        max_time_result = collection_opensky.find().sort("time", -1).limit(1)
-        max_time = max_time_result[0]["time"]
-
-        # Vérifier si le callsign est déjà présent dans l'enregistrement précédent
-        for opensky_doc in opensky_data:
-            callsign = opensky_doc["callsign"]
-            match = collection_opensky.find_one({"time": max_time, "callsign": callsign})
-
-            # si oui, on récupère la valeur de airlabs_id
-            if match and match["airlabs_id"]:
-                opensky_doc["airlabs_id"] = match["airlabs_id"]
-
-    # On insère les documents dans la collection OpenSky
-    collection_opensky.insert_many(opensky_data)
+    opensky_storage = OpenskyStorage(db, MONGO_COL_OPENSKY, OPENSKY_STORAGE_LAYOUT, get_daily_indexes(MONGO_COL_OPENSKY))
+    collection_latest = db[MONGO_COL_OPENSKY_LATEST]
+
+    # Correspondances callsign -> airlabs_id et dernières positions historisées
+    # de l'état courant des vols (1 seule requête)
+    step = time.perf_counter()
+    latest_matches, previous_positions = load_latest_state(collection_latest)
+
+    # Si le callsign est présent dans l'état courant, on récupère la valeur de airlabs_id
+    for opensky_doc in opensky_data:
+        latest_match = latest_matches.get(opensky_doc["callsign"])
+        if latest_match is not None:
+            opensky_doc["airlabs_id"] = latest_match["airlabs_id"]
+
+    # Les callsigns du cache négatif (non rapprochés par les OPENSKY_UNMATCHED_MIN_MISSES derniers runs Airlabs)
+    # ne sont pas historisés : ils restent dans l'état courant et seront de nouveau soumis au rapprochement
+    unmatched_callsigns = load_unmatched_callsigns(db[MONGO_COL_OPENSKY_UNMATCHED], OPENSKY_UNMATCHED_MIN_MISSES)
+    opensky_history, nb_unmatched = filter_unmatched_documents(opensky_data, unmatched_callsigns)
+
+    # Positions inchangées depuis la dernière position historisée (avions au sol, transpondeurs sans
+    # nouvelle position) : non historisées, l'état courant est mis à jour avec toutes les positions
+    opensky_history, nb_unchanged = filter_unchanged_positions(opensky_history, previous_positions, OPENSKY_POSITION_THRESHOLD)
+    timings['match'] = time.perf_counter() - step
+
+    # On insère les documents dans la collection OpenSky (un seul insert non ordonné)
+    # avec la date BSON de l'appel (rétention par index TTL)
+    step = time.perf_counter()
+    for opensky_doc in opensky_history:
+        opensky_doc["time_date"] = convert_time_unix_to_date(opensky_doc["time"])
+    if len(opensky_history) > 0:
+        opensky_storage.insert_many(opensky_history, MONGO_BULK_BATCH_SIZE)
+    # Stockage journalier : rétention par suppression des collections expirées
+    dropped = opensky_storage.drop_expired(MONGO_RETENTION_DAYS)
+    timings['insert'] = time.perf_counter() - step
+
+    # Mise à jour de l'état courant des vols (un document par callsign)
+    step = time.perf_counter()
+    nb_latest, nb_latest_deleted = update_latest(
+        collection_latest, opensky_data, latest_matches, MONGO_BULK_BATCH_SIZE, get_stored_positions(opensky_history, previous_positions)
+    )
+    timings['latest'] = time.perf_counter() - step
+
+    # Mise à jour des agrégats par vol : données statistiques à jour du dernier appel
+    # (positions historisées uniquement, comme la réconciliation des agrégats)
+    step = time.perf_counter()
+    aggregate_operations = build_aggregate_operations(opensky_history, latest_matches)
+    for i in range(0, len(aggregate_operations), MONGO_BULK_BATCH_SIZE):
+        db[MONGO_COL_DATA_AGGREGATED].bulk_write(aggregate_operations[i:i + MONGO_BULK_BATCH_SIZE], ordered=False)
+    # Nouvelle version des statistiques des jours des vols mis à jour uniquement
+    if len(aggregate_operations) > 0:
+        bump_aggregation_version(db[MONGO_COL_METADATA], days=get_aggregate_days(db[MONGO_COL_DATA_AGGREGATED], opensky_history))
+    timings['aggregates'] = time.perf_counter() - step
+    timings['total'] = time.perf_counter() - start
+
+    # Rapport du run : écritures évitées (positions non rapprochées ou inchangées)
+    run_time = int(time.time())
+    db[MONGO_COL_INGESTION_RUNS].insert_one({
+        "source": "opensky",
+        "time": run_time,
+        "time_date": convert_time_unix_to_date(run_time),
+        "nb_received": len(opensky_data),
+        "nb_inserted": len(opensky_history),
+        "nb_unmatched_skipped": nb_unmatched,
+        "nb_unchanged_skipped": nb_unchanged,
+        "timings": timings,
+    })
+
+    if len(dropped) > 0:
+        print(f"OPENSKY - Collections expirées supprimées : {', '.join(dropped)}")
+    print(f"OPENSKY - Etat courant : {nb_latest} vols mis à jour, {nb_latest_deleted} vols supprimés")
+    print(f"OPENSKY - Données agrégées : {len(aggregate_operations)} vols mis à jour")
+    print(
+        f"OPENSKY - {len(opensky_history)} documents insérés ({nb_unmatched} non rapprochés et {nb_unchanged} inchangés écartés) en {timings['total']:.3f}s "
+        f"(api: {timings['api']:.3f}s, match: {timings['match']:.3f}s, insert: {timings['insert']:.3f}s, latest: {timings['latest']:.3f}s, aggregates: {timings['aggregates']:.3f}s)"
+    )
 
     # On ferme la connexion
     client.close()
+
+    return timings
@@ -0,0 +1,125 @@
+import time
+from pymongo import UpdateOne
+from utilities_live_api import convert_time_unix_to_date, convert_time_unix_utc_to_datetime_fr
+
+
+# Identifiant du document de métadonnées des données agrégées (version, watermark)
+AGGREGATION_METADATA_ID = "data_aggregated"
+
+# Champs Airlabs des données agrégées : champ data_aggregated -> champ du document Airlabs
+AIRLABS_AGGREGATED_FIELDS = {
+    "airline_iata": "airline_iata",
+    "airline_number": "flight_number",
+    "arr_iata": "arr_iata",
+    "arr_icao": "arr_icao",
+    "dep_iata": "dep_iata",
+    "dep_icao": "dep_icao",
+    "aircraft_flag": "flag",
+    "aircraft_reg_number": "reg_number",
+    "aircraft_icao": "aircraft_icao",
+}
+
+
+def is_aggregated_document(opensky_doc):
+    """ Vérifie qu'un document OpenSky est agrégé (vol rapproché, hors avions au sol) """
+    return opensky_doc.get("airlabs_id") not in [None, ""] and opensky_doc.get("on_ground") is False
+
+
+def build_aggregate_operations(opensky_data, latest_matches):
+    """
+    Construit les mises à jour des agrégats par vol (data_aggregated) après un appel OpenSky
+        Un UpdateOne (upsert) par vol rapproché (airlabs_id), hors avions au sol :
+        - $min / $max des temps de début (et date BSON de rétention) et de fin, $inc du nb d'enregistrements
+        - callsign, date de début et champs Airlabs renseignés à la création du document
+    Args:
+        opensky_data (array): Documents OpenSky du dernier appel API
+        latest_matches (dict): Correspondances renvoyées par load_latest_state
+    Returns:
+        array: Liste des opérations UpdateOne de la collection data_aggregated
+    """
+    flights = {}
+    for opensky_doc in opensky_data:
+        if not is_aggregated_document(opensky_doc):
+            continue
+        airlabs_id = opensky_doc["airlabs_id"]
+
+        flight = flights.get(airlabs_id)
+        if flight is None:
+            latest_match = latest_matches.get(opensky_doc["callsign"]) or {}
+            flights[airlabs_id] = {
+                "first": opensky_doc,
+                "last": opensky_doc,
+                "count": 1,
+                "airlabs_doc": latest_match.get("airlabs_doc") or {},
+            }
+        else:
+            if opensky_doc["time"] < flight["first"]["time"]:
+                flight["first"] = opensky_doc
+            if opensky_doc["time"] >= flight["last"]["time"]:
+                flight["last"] = opensky_doc
+            flight["count"] += 1
+
+    operations = []
+    for airlabs_id, flight in flights.items():
+        on_insert = {
+            "callsign": flight["first"]["callsign"],
+            "datetime_start": flight["first"].get("datatime"),
+        }
+        for field, airlabs_field in AIRLABS_AGGREGATED_FIELDS.items():
+            if airlabs_field in flight["airlabs_doc"]:
+                on_insert[field] = flight["airlabs_doc"][airlabs_field]
+
+        operations.append(UpdateOne(
+            {"_id": airlabs_id},
+            {
+                "$min": {"time_start": flight["first"]["time"], "time_start_date": convert_time_unix_to_date(flight["first"]["time"])},
+                "$max": {"time_end": flight["last"]["time"]},
+                "$inc": {"count": flight["count"]},
+                # Les appels OpenSky sont chronologiques : le dernier enregistrement est la fin du vol
+                "$set": {"datetime_end": flight["last"].get("datatime")},
+                "$setOnInsert": on_insert,
+            },
+            upsert=True
+        ))
+    return operations
+
+
+def get_aggregate_days(collection_aggregated, opensky_data):
+    """
+    Jours des vols mis à jour par un appel OpenSky (date de début du vol à l'heure de Paris)
+        A appeler après l'écriture des agrégats : time_start est alors le début du vol
+        (un vol commencé la veille met à jour les statistiques de la veille)
+    Args:
+        collection_aggregated (Collection): Collection des données agrégées
+        opensky_data (array): Documents OpenSky du dernier appel API
+    Returns:
+        array: Jours (YYYY-MM-DD) triés
+    """
+    airlabs_ids = list({opensky_doc["airlabs_id"] for opensky_doc in opensky_data if is_aggregated_document(opensky_doc)})
+    if len(airlabs_ids) == 0:
+        return []
+    cursor = collection_aggregated.find({"_id": {"$in": airlabs_ids}}, {"_id": 0, "time_start": 1})
+    return sorted({convert_time_unix_utc_to_datetime_fr(doc["time_start"]).split(' ')[0] for doc in cursor if doc.get("time_start") is not None})
+
+
+def bump_aggregation_version(collection_metadata, days=None, **fields):
+    """
+    Publie une nouvelle version des données agrégées (invalide le cache des statistiques)
+        - sans days : version globale (toutes les dates)
+        - avec days : version des jours mis à jour uniquement (la version globale est inchangée)
+    Args:
+        collection_metadata (Collection): Collection des métadonnées
+        days (array, optional): Jours (YYYY-MM-DD) mis à jour, ex : renvoyés par get_aggregate_days
+        **fields: Champs enregistrés avec la version (ex : watermark)
+    """
+    if days is None:
+        increments = {"version": 1}
+    elif len(days) == 0:
+        return
+    else:
+        increments = {f"day_versions.{day}": 1 for day in days}
+    collection_metadata.update_one(
+        {"_id": AGGREGATION_METADATA_ID},
+        {"$inc": increments, "$set": {**fields, "updated_at": int(time.time())}},
+        upsert=True
+    )
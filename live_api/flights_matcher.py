@@ -0,0 +1,115 @@
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+# Rapprochement complémentaire sur le code hexadécimal de l'appareil (icao_24 <-> hex)
+MATCH_ON_HEX = os.environ.get("MATCH_ON_HEX", "0") == "1"
+
+
+def normalize_key(value):
+    """
+    Normalise une clé de rapprochement (callsign, flight_icao, icao_24, hex)
+    Args:
+        value (str): Valeur à normaliser
+    Returns:
+        str: Valeur sans espaces et en majuscules (None si vide)
+    """
+    if value is None:
+        return None
+    value = str(value).strip().upper()
+    return value if value != "" else None
+
+
+def match_flights(opensky_data, airlabs_data, match_hex=MATCH_ON_HEX):
+    """
+    Rapproche les documents OpenSky et Airlabs par jointure de hachage (temps linéaire)
+        - jointure principale : callsign OpenSky <-> flight_icao Airlabs
+        - jointure optionnelle : icao_24 OpenSky <-> hex Airlabs, pour les callsigns
+          sans correspondance sur flight_icao et les documents Airlabs non encore rapprochés
+        En cas de doublons, le dernier document rencontré est conservé
+    Args:
+        opensky_data (array): Liste de dict OpenSky (clés 'callsign' et 'icao_24')
+        airlabs_data (array): Liste de dict Airlabs (clés 'flight_icao' et 'hex')
+        match_hex (bool, optional): Activer la jointure sur icao_24 / hex
+            (variable d'environnement MATCH_ON_HEX par défaut)
+    Returns:
+        tuple: (liste de tuples (doc OpenSky, doc Airlabs) - un par callsign OpenSky,
+                dict des statistiques de rapprochement)
+    """
+
+    # Index des documents Airlabs
+    airlabs_by_callsign = {}
+    airlabs_by_hex = {}
+    for airlabs_doc in airlabs_data:
+        flight_icao = normalize_key(airlabs_doc.get('flight_icao'))
+        if flight_icao is not None:
+            airlabs_by_callsign[flight_icao] = airlabs_doc
+        if match_hex:
+            hex_code = normalize_key(airlabs_doc.get('hex'))
+            if hex_code is not None:
+                airlabs_by_hex[hex_code] = airlabs_doc
+
+    # Un seul document OpenSky par callsign
+    opensky_by_callsign = {}
+    for opensky_doc in opensky_data:
+        callsign = normalize_key(opensky_doc.get('callsign'))
+        if callsign is not None:
+            opensky_by_callsign[callsign] = opensky_doc
+
+    matches = []
+    matched_airlabs = set()
+    nb_matched_callsign = 0
+    nb_matched_hex = 0
+
+    # Jointure principale sur le callsign
+    unmatched_callsigns = []
+    for callsign, opensky_doc in opensky_by_callsign.items():
+        airlabs_doc = airlabs_by_callsign.get(callsign)
+        if airlabs_doc is not None:
+            nb_matched_callsign += 1
+            matches.append((opensky_doc, airlabs_doc))
+            matched_airlabs.add(id(airlabs_doc))
+        else:
+            unmatched_callsigns.append(callsign)
+
+    # Jointure sur icao_24 / hex, uniquement pour les callsigns sans correspondance et les documents
+    # Airlabs non rapprochés (un document Airlabs n'est attribué qu'à un seul vol OpenSky)
+    if match_hex:
+        for callsign in unmatched_callsigns:
+            opensky_doc = opensky_by_callsign[callsign]
+            airlabs_doc = airlabs_by_hex.get(normalize_key(opensky_doc.get('icao_24')))
+            if airlabs_doc is not None and id(airlabs_doc) not in matched_airlabs:
+                nb_matched_hex += 1
+                matches.append((opensky_doc, airlabs_doc))
+                matched_airlabs.add(id(airlabs_doc))
+
+    nb_airlabs = len({id(doc) for doc in airlabs_by_callsign.values()} | {id(doc) for doc in airlabs_by_hex.values()})
+    stats = {
+        'opensky': len(opensky_by_callsign),
+        'airlabs': nb_airlabs,
+        'matched': len(matches),
+        'matched_callsign': nb_matched_callsign,
+        'matched_hex': nb_matched_hex,
+        'unmatched_opensky': len(opensky_by_callsign) - len(matches),
+        'unmatched_airlabs': nb_airlabs - len(matched_airlabs),
+        'match_rate': round(len(matches) / len(opensky_by_callsign), 4) if len(opensky_by_callsign) > 0 else 0.0,
+    }
+
+    return matches, stats
+
+
+def format_match_stats(stats):
+    """
+    Formate les statistiques de rapprochement pour affichage dans les logs
+    Args:
+        stats (dict): Statistiques renvoyées par match_flights
+    Returns:
+        str: Résumé des statistiques
+    """
+    return (
+        f"{stats['matched']} vols rapprochés sur {stats['opensky']} callsigns OpenSky "
+        f"et {stats['airlabs']} vols Airlabs ({stats['match_rate']:.1%}) - "
+        f"callsign: {stats['matched_callsign']}, hex: {stats['matched_hex']}, "
+        f"OpenSky sans correspondance: {stats['unmatched_opensky']}, "
+        f"Airlabs sans correspondance: {stats['unmatched_airlabs']}"
+    )
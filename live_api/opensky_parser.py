@@ -0,0 +1,38 @@
+def is_in_bbox(longitude, latitude, bbox):
+    """ Vérifie qu'une position est dans la zone (la_min, la_max, lon_min, lon_max), bornes comprises """
+    la_min, la_max, lon_min, lon_max = bbox
+    return la_min <= latitude <= la_max and lon_min <= longitude <= lon_max
+
+
+def parse_states(states, time_now, datetime_fr, bbox=None):
+    """
+    Transforme les state vectors OpenSky en documents (un dict par state vector)
+        Seuls les state vectors avec callsign, longitude et latitude sont conservés
+        (parsing en colonnes NumPy plus lent, cf. benchmarks/bench_opensky_parser.py)
+    Args:
+        states (array): State vectors renvoyés par l'API OpenSky
+        time_now (int): Time unix de l'appel API
+        datetime_fr (str): Datetime de l'appel API au format FR
+        bbox (tuple, optional): Zone (la_min, la_max, lon_min, lon_max), sans filtre si None
+    Returns:
+        array: Liste des documents OpenSky
+    """
+    return [{
+        "time": time_now,
+        "datatime": datetime_fr if time_now else None,
+        "airlabs_id": None,
+        "icao_24": state[0].strip().upper() if state[0] else None,
+        "callsign": state[1].strip().upper() if state[1] else None,
+        "origin_country": state[2].strip() if state[2] else None,
+        "time_position": state[3],
+        "last_contact": state[4],
+        "longitude": state[5],
+        "latitude": state[6],
+        "baro_altitude": state[7],
+        "geo_altitude": state[13],
+        "velocity": state[9],
+        "cap": state[10] if state[10] is not None else 0,
+        "vertical_rate": state[11],
+        "on_ground": state[8],
+    } for state in states if state[1] and state[5] and state[6]
+        and (bbox is None or is_in_bbox(state[5], state[6], bbox))]
@@ -0,0 +1,64 @@
+from opensky_latest import get_position
+
+
+def is_unchanged_position(opensky_doc, previous, threshold):
+    """
+    Vérifie si une position est identique à la dernière position historisée du vol
+        - même time_position (transpondeur sans nouvelle position)
+        - ou déplacement inférieur au seuil en latitude et en longitude (avion à l'arrêt)
+        La comparaison porte sur la dernière position historisée et non sur la dernière position reçue :
+        un lent déplacement est historisé dès que le déplacement cumulé dépasse le seuil
+    Args:
+        opensky_doc (dict): Document OpenSky du dernier appel API
+        previous (dict): Dernière position historisée du même callsign (None si absente)
+        threshold (float): Seuil de déplacement en degrés
+    Returns:
+        bool: True si la position n'a pas changé
+    """
+    if previous is None:
+        return False
+    if opensky_doc.get("time_position") is not None and opensky_doc.get("time_position") == previous.get("time_position"):
+        return True
+    if previous.get("latitude") is None or previous.get("longitude") is None:
+        return False
+    return (
+        abs(opensky_doc["latitude"] - previous["latitude"]) <= threshold
+        and abs(opensky_doc["longitude"] - previous["longitude"]) <= threshold
+    )
+
+
+def filter_unchanged_positions(opensky_data, previous_positions, threshold):
+    """
+    Retire des documents OpenSky à historiser les positions inchangées depuis la dernière position historisée
+        L'état courant reste mis à jour avec toutes les positions
+    Args:
+        opensky_data (array): Documents OpenSky du dernier appel API
+        previous_positions (dict): Dernières positions historisées renvoyées par load_latest_state
+        threshold (float): Seuil de déplacement en degrés (négatif : aucune position retirée)
+    Returns:
+        tuple: (documents à insérer dans la collection OpenSky, nb de positions inchangées écartées)
+    """
+    if threshold < 0 or len(previous_positions) == 0:
+        return opensky_data, 0
+
+    opensky_history = [
+        opensky_doc for opensky_doc in opensky_data
+        if not is_unchanged_position(opensky_doc, previous_positions.get(opensky_doc["callsign"]), threshold)
+    ]
+    return opensky_history, len(opensky_data) - len(opensky_history)
+
+
+def get_stored_positions(opensky_history, previous_positions):
+    """
+    Dernières positions historisées après un appel OpenSky (enregistrées dans l'état courant)
+        Positions des documents historisés, positions précédentes conservées pour les autres callsigns
+    Args:
+        opensky_history (array): Documents OpenSky insérés dans la collection OpenSky
+        previous_positions (dict): Dernières positions historisées renvoyées par load_latest_state
+    Returns:
+        dict: Dict callsign -> {'time_position', 'latitude', 'longitude'}
+    """
+    stored_positions = dict(previous_positions)
+    for opensky_doc in opensky_history:
+        stored_positions[opensky_doc["callsign"]] = get_position(opensky_doc)
+    return stored_positions
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne
+
+
+def load_unmatched_callsigns(collection_unmatched, min_misses=1):
+    """
+    Charge le cache négatif des callsigns non rapprochés par Airlabs (une seule requête)
+        Seuls les callsigns non rapprochés par au moins min_misses runs Airlabs successifs
+        sont retenus (Airlabs référence souvent les vols avec retard après le décollage)
+        Les documents expirés sont ignorés (la suppression TTL de MongoDB est différée)
+    Args:
+        collection_unmatched (Collection): Collection du cache négatif (opensky_unmatched)
+        min_misses (int, optional): Nb minimal de runs Airlabs sans rapprochement (1 par défaut)
+    Returns:
+        set: Callsigns non rapprochés
+    """
+    cursor = collection_unmatched.find(
+        {"expires_at": {"$gt": datetime.now(timezone.utc)}, "misses": {"$gte": min_misses}},
+        {"_id": 1}
+    )
+    return {doc["_id"] for doc in cursor}
+
+
+def filter_unmatched_documents(opensky_data, unmatched_callsigns):
+    """
+    Retire des documents OpenSky à historiser ceux des callsigns du cache négatif
+        Seuls les documents sans airlabs_id sont retirés : ils seraient supprimés
+        par le prochain run Airlabs
+    Args:
+        opensky_data (array): Documents OpenSky du dernier appel API
+        unmatched_callsigns (set): Callsigns renvoyés par load_unmatched_callsigns
+    Returns:
+        tuple: (documents à insérer dans la collection OpenSky, nb de documents écartés)
+    """
+    if len(unmatched_callsigns) == 0:
+        return opensky_data, 0
+
+    opensky_history = [
+        opensky_doc for opensky_doc in opensky_data
+        if opensky_doc.get("airlabs_id") is not None or opensky_doc["callsign"] not in unmatched_callsigns
+    ]
+    return opensky_history, len(opensky_data) - len(opensky_history)
+
+
+def build_unmatched_operations(callsigns, ttl):
+    """
+    Construit les mises à jour du cache négatif après un run Airlabs
+        Un UpdateOne (upsert) par callsign non rapproché : nb de runs Airlabs sans rapprochement
+        incrémenté, expiration repoussée à ttl secondes (les callsigns rapprochés sont supprimés
+        du cache, le décompte reprend alors à zéro)
+    Args:
+        callsigns (array): Callsigns de l'état courant non rapprochés par le run Airlabs
+        ttl (int): Durée de validité (en secondes) d'une entrée du cache
+    Returns:
+        array: Liste des opérations UpdateOne de la collection opensky_unmatched
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=ttl)
+    return [
+        UpdateOne(
+            {"_id": callsign},
+            {"$set": {"expires_at": expires_at}, "$inc": {"misses": 1}, "$setOnInsert": {"first_missed_at": now}},
+            upsert=True
+        )
+        for callsign in set(callsigns) if callsign
+    ]